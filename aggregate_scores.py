@@ -4,30 +4,38 @@ import pandas as pd
 # Folder containing the CSV lists to aggregate. Update this path as needed.
 DATA_FOLDER = "best_games_of_all_time"
 
-# Collect all ranking CSV files (skip 'about.csv')
-frames = []
+# Fold each ranking CSV (skip 'about.csv') into running per-title totals, so
+# memory grows with the number of distinct games rather than with the rows:
+# title -> [TotalScore, ListsAppeared, first ReleaseDate]
+totals = {}
 for fname in os.listdir(DATA_FOLDER):
     if fname.endswith('.csv') and fname != 'about.csv':
         path = os.path.join(DATA_FOLDER, fname)
-        df = pd.read_csv(path)
-        # Keep only the columns we need and track which file the row came from
-        df = df[['Title', 'Score', 'ReleaseDate']].copy()
-        df['SourceFile'] = fname
-        frames.append(df)
-
-if not frames:
+        # Keep only the columns we need
+        df = pd.read_csv(path, usecols=['Title', 'Score', 'ReleaseDate'])
+        scores = df.groupby('Title', sort=False)['Score'].sum()
+        first_dates = df.drop_duplicates('Title').set_index('Title')['ReleaseDate']
+        for title, score in scores.items():
+            entry = totals.get(title)
+            if entry is None:
+                totals[title] = [score, 1, first_dates[title]]
+            else:
+                # Each file counts once per title, as nunique over source files
+                entry[0] += score
+                entry[1] += 1
+
+if not totals:
     raise SystemExit(f"No ranking CSV files found in {DATA_FOLDER}")
 
-all_games = pd.concat(frames, ignore_index=True)
-
 # Aggregate total score and number of lists each game appears in
 agg = (
-    all_games.groupby('Title')
-    .agg(
-        TotalScore=('Score', 'sum'),
-        ListsAppeared=('SourceFile', 'nunique'),
-        ReleaseYear=('ReleaseDate', lambda x: pd.to_datetime(x.iloc[0]).year),
-    )
+    pd.DataFrame.from_dict(totals, orient='index', columns=['TotalScore', 'ListsAppeared', 'ReleaseDate'])
+    .rename_axis('Title')
+    .sort_index()
+)
+agg['ReleaseYear'] = agg['ReleaseDate'].map(lambda d: pd.to_datetime(d).year)
+agg = (
+    agg.drop(columns=['ReleaseDate'])
     .sort_values(by='TotalScore', ascending=False)
     .reset_index()
 )
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Throughput of the vectorized aggregation kernel against `aggregate_rows`.
+
+The kernel runs on encoded columns (as loaded from the columnar corpus); the
+dict-based function runs on a prefix of the same rows, materialized as dicts
+beforehand so that only aggregation is timed. Results on that prefix are
+checked for equality.
+
+Usage:
+- python benchmarks/bench_aggregate.py                      (10M rows)
+- python benchmarks/bench_aggregate.py --rows 1000000 --baseline-rows 200000
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+
+from synthetic import dict_rows, game_title, synthetic_columns
+
+from aggregate_kernel import aggregate_columns, aggregate_rows_vectorized
+from rebuild_list import aggregate_rows
+
+
+def run_kernel(cols, n: int):
+    n_games = int(cols['game'].max()) + 1
+    titles = [game_title(g) for g in range(n_games)]
+    years = [str(1980 + i) for i in range(45)]
+    return aggregate_columns(cols['game'][:n], cols['score'][:n], cols['source'][:n],
+                             titles, cols['year'][:n] - 1980, years)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark the vectorized aggregation kernel')
+    parser.add_argument('--rows', type=int, default=10_000_000, help='Rows for the kernel run')
+    parser.add_argument('--baseline-rows', type=int, default=1_000_000, help='Rows for the dict-based run')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    cols = synthetic_columns(args.rows, seed=args.seed)
+    n_base = min(args.baseline_rows, args.rows)
+
+    rows = dict_rows(cols, n_base)
+    start = time.perf_counter()
+    expected = aggregate_rows(rows)
+    base_s = time.perf_counter() - start
+    if aggregate_rows_vectorized(rows) != expected or run_kernel(cols, n_base) != expected:
+        raise SystemExit('Mismatch between kernel and aggregate_rows')
+    del rows
+
+    start = time.perf_counter()
+    result = run_kernel(cols, args.rows)
+    kernel_s = time.perf_counter() - start
+
+    base_tp = n_base / base_s
+    kernel_tp = args.rows / kernel_s
+    print(f"aggregate_rows:    {n_base:>12,} rows in {base_s:8.3f}s  {base_tp:14,.0f} rows/s")
+    print(f"aggregate_columns: {args.rows:>12,} rows in {kernel_s:8.3f}s  {kernel_tp:14,.0f} rows/s "
+          f"({len(result):,} games)")
+    print(f"Speedup: {kernel_tp / base_tp:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
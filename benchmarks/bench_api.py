@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Load test of the list API (`scripts/list_api.py`) on localhost.
+
+The service runs in a separate process on the real `list/` data. Keep-alive
+client connections (the `cover_fetch` HTTP client) request a fixed mix of
+manifest, list and game URLs in three modes: plain bodies, gzip bodies and
+conditional requests answered with 304. Latency p50/p99 and requests/sec are
+reported for each mode.
+
+Usage:
+- python benchmarks/bench_api.py
+- python benchmarks/bench_api.py --requests 20000 --connections 32
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import synthetic  # noqa: F401  (puts scripts/ on sys.path)
+
+from corpus_db import CorpusDB, build_db
+from cover_fetch import HttpConnection
+from rebuild_list import list_available_lists, script_root_list_dir
+
+
+def request_paths() -> List[str]:
+    root = script_root_list_dir()
+    themes = [d.name for d in list_available_lists(root) if (d / 'aggregated-list.csv').exists()]
+    db_path = root / '.corpus.sqlite'
+    if not db_path.exists():
+        build_db(root, db_path)
+    with CorpusDB(db_path) as db:
+        game_ids = [r['game_id'] for r in db.query(
+            'SELECT game_id FROM entries WHERE game_id IS NOT NULL GROUP BY game_id ORDER BY COUNT(*) DESC LIMIT 200')]
+    paths = ['/list/_manifest.json']
+    paths += [f'/api/lists/{t}.json' for t in themes]
+    paths += [f'/list/{t}/aggregated-list.csv' for t in themes]
+    paths += [f'/api/games/{gid}.json' for gid in game_ids]
+    return paths
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+async def run_load(port: int, paths: List[str], total: int, connections: int, mode: str) -> Dict[str, float]:
+    etags: Dict[str, str] = {}
+    if mode == 'conditional':
+        conn = await HttpConnection.open('http', '127.0.0.1', port, 10)
+        for path in paths:
+            _, headers, _ = await conn.get(path)
+            etags[path] = headers.get('etag', '')
+        conn.close()
+
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    counter = iter(range(total))
+
+    async def client() -> None:
+        conn = await HttpConnection.open('http', '127.0.0.1', port, 10)
+        try:
+            for i in counter:
+                path = paths[i % len(paths)]
+                headers: Optional[Dict[str, str]] = None
+                if mode == 'gzip':
+                    headers = {'Accept-Encoding': 'gzip'}
+                elif mode == 'conditional':
+                    headers = {'If-None-Match': etags[path]}
+                start = time.perf_counter()
+                status, _, _ = await conn.get(path, headers)
+                latencies.append(time.perf_counter() - start)
+                statuses[status] = statuses.get(status, 0) + 1
+        finally:
+            conn.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(connections)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {'requests': len(latencies), 'seconds': elapsed, 'rps': len(latencies) / elapsed,
+            'p50_ms': percentile(latencies, 0.50) * 1000, 'p99_ms': percentile(latencies, 0.99) * 1000,
+            'statuses': statuses}  # type: ignore[dict-item]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Load test the list API on localhost')
+    parser.add_argument('--requests', type=int, default=10_000, help='Requests per mode')
+    parser.add_argument('--connections', type=int, default=16, help='Concurrent keep-alive connections')
+    args = parser.parse_args()
+
+    paths = request_paths()
+    server = subprocess.Popen([sys.executable, str(synthetic.SCRIPTS_DIR / 'list_api.py'), '--port', '0'],
+                              stdout=subprocess.PIPE, text=True)
+    try:
+        line = server.stdout.readline() if server.stdout else ''
+        if 'http://' not in line:
+            raise SystemExit(f"Server did not start: {line!r}")
+        port = int(line.rsplit(':', 1)[1])
+        print(f"{len(paths)} distinct URLs, {args.connections} connections")
+        for mode in ('plain', 'gzip', 'conditional'):
+            r = asyncio.run(run_load(port, paths, args.requests, args.connections, mode))
+            print(f"{mode:<12} {r['requests']:>7} req in {r['seconds']:6.2f}s  {r['rps']:9.1f} req/s  "
+                  f"p50 {r['p50_ms']:6.2f} ms  p99 {r['p99_ms']:6.2f} ms  statuses {r['statuses']}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == '__main__':
+    main()
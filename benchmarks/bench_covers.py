@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Cover download throughput against a local stand-in for the image host.
+
+A threaded HTTP/1.1 server on localhost serves fake JPEG payloads (optionally
+with added latency and a share of 503 responses). The same set of covers is
+downloaded with the threaded `urllib` path (`--engine threads`) and with the
+asyncio engine, and files/sec are reported for both.
+
+Usage:
+- python benchmarks/bench_covers.py
+- python benchmarks/bench_covers.py --files 4000 --latency 20 --fail-rate 0.02
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+
+from cover_fetch import DownloadOptions, run_downloads  # noqa: E402
+from download_covers import download_threaded, tasks_for_list  # noqa: E402
+
+
+def make_handler(payload: bytes, latency: float, fail_rate: float, seed: int):
+    rng = random.Random(seed)
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body go out in separate writes; like a real CDN, do not
+        # let Nagle + delayed ACK stall every keep-alive response
+        disable_nagle_algorithm = True
+
+        def do_GET(self) -> None:
+            if latency:
+                time.sleep(latency)
+            with lock:
+                fail = rng.random() < fail_rate
+            status, body = (503, b'busy') if fail else (200, payload)
+            self.send_response(status)
+            self.send_header('Content-Type', 'image/jpeg')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args) -> None:
+            pass
+
+    return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark cover download engines on localhost')
+    parser.add_argument('--files', type=int, default=2000, help='Number of cover files to download')
+    parser.add_argument('--size', type=int, default=12_000, help='Payload size in bytes')
+    parser.add_argument('--latency', type=float, default=5.0, help='Server latency per request (ms)')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='Share of 503 responses')
+    parser.add_argument('--parallel', type=int, default=12, help='Threads / async workers')
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0),
+                                 make_handler(b'\xff\xd8' + b'\0' * args.size, args.latency / 1000, args.fail_rate, 0))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}/igdb/image/upload"
+    codes = [f"bench{i:06d}" for i in range((args.files + 1) // 2)]
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            threads_dir, async_dir = Path(tmp) / 'threads', Path(tmp) / 'async'
+
+            start = time.perf_counter()
+            d, _, f = download_threaded(tasks_for_list(codes, ['small', 'big'], threads_dir, base), False, args.parallel)
+            t_threads = time.perf_counter() - start
+
+            options = DownloadOptions(concurrency=args.parallel, backoff=0.01)
+            start = time.perf_counter()
+            stats = run_downloads(tasks_for_list(codes, ['small', 'big'], async_dir, base), options,
+                                  async_dir / '.download-journal.jsonl')
+            t_async = time.perf_counter() - start
+    finally:
+        server.shutdown()
+
+    print(f"threads: {d:>6} files in {t_threads:6.2f}s  {d / t_threads:8.1f} files/s  (failed {f})")
+    print(f"async:   {stats.downloaded:>6} files in {t_async:6.2f}s  {stats.downloaded / t_async:8.1f} files/s  "
+          f"(failed {stats.failed}, retries {stats.retries}, connections {stats.connections})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Peak memory (tracemalloc) of the streaming global aggregation as the number of
+rows grows while the number of distinct games stays fixed.
+
+Rows are produced lazily and grouped in synthetic themes, then folded the way
+`generate_all_aggregates.main` does: one `partial_aggregate` per theme, merged
+into the running global totals. Peak memory should stay flat across row
+counts. `--baseline` also measures the old approach (one list holding every
+row before aggregating) for comparison; keep it to small row counts.
+
+Usage:
+- python benchmarks/bench_memory.py
+- python benchmarks/bench_memory.py --rows 1000000 10000000 50000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+import tracemalloc
+from typing import Dict, Iterator, List
+
+from synthetic import game_title, iter_synthetic_chunks
+
+from generate_all_aggregates import aggregate_rows, compact_partial, finalize, merge_compact, partial_aggregate
+
+
+def iter_theme_rows(chunk) -> Iterator[Dict[str, object]]:
+    for g, s, src, y in zip(chunk['game'].tolist(), chunk['score'].tolist(),
+                            chunk['source'].tolist(), chunk['year'].tolist()):
+        yield {'Title': game_title(g), 'Score': s, 'ReleaseDate': f"{y}-01-01",
+               'SourceFile': f"source{src} - 2024-01-01_00-00-00.csv"}
+
+
+def streaming(n_rows: int, n_games: int, theme_rows: int) -> int:
+    totals: Dict[str, List] = {}
+    for chunk in iter_synthetic_chunks(n_rows, n_games=n_games, chunk_rows=theme_rows):
+        merge_compact(totals, compact_partial(partial_aggregate(iter_theme_rows(chunk))))
+    return len(finalize(totals))
+
+
+def materialized(n_rows: int, n_games: int, theme_rows: int) -> int:
+    all_rows: List[Dict[str, object]] = []
+    for chunk in iter_synthetic_chunks(n_rows, n_games=n_games, chunk_rows=theme_rows):
+        all_rows.extend(iter_theme_rows(chunk))
+    return len(aggregate_rows(all_rows))
+
+
+def measure(fn, *args) -> tuple:
+    tracemalloc.start()
+    start = time.perf_counter()
+    games = fn(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return games, elapsed, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Peak memory of the streaming aggregation')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000, 5_000_000, 10_000_000])
+    parser.add_argument('--games', type=int, default=50_000, help='Distinct games in the corpus')
+    parser.add_argument('--theme-rows', type=int, default=100_000, help='Rows per synthetic theme')
+    parser.add_argument('--baseline', action='store_true', help='Also measure the materialized approach')
+    args = parser.parse_args()
+
+    print(f"{'mode':<13}{'rows':>14}{'games':>10}{'seconds':>10}{'peak MB':>10}")
+    for n in args.rows:
+        modes = [('streaming', streaming)] + ([('materialized', materialized)] if args.baseline else [])
+        for name, fn in modes:
+            games, elapsed, peak = measure(fn, n, args.games, args.theme_rows)
+            print(f"{name:<13}{n:>14,}{games:>10,}{elapsed:>10.1f}{peak / 2**20:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the aggregation and I/O stages on synthetic trees.
+
+Each stage runs in its own worker process on a tree from `layout.py` (scale
+1 = the size of the current data, 10x, 100x, 1000x), so that stages do not
+share memory. For every (scale, stage) the suite records the best and the
+median wall time over `--repeat` runs, the files read, files written and
+directories listed by one run, and memory: `rss_increase_kb`, how far the
+peak RSS of the runs rose above the RSS left by the stage's untimed setup (on
+Linux the kernel's peak is reset after setup; elsewhere a higher peak reached
+during setup hides growth below it), and `peak_rss_kb`, the worker's overall
+peak, setup included.
+
+Stages:
+- `scan`: `list_available_lists` + `pick_sources_for_list` with a cold index
+- `read_picks_rows`: read the chosen CSVs of every theme
+- `load_corpus`: the same CSVs into the compact `corpus_model.Corpus`
+- `aggregate_rows`: aggregate rows already in memory
+- `write_aggregated`: write every theme's `aggregated-list.csv` to a fresh folder
+- `build_cover_map`: `download_covers.build_cover_map_from_sources` per theme
+- `read_rows`: `generate_all_aggregates.read_rows` on the flat layout
+- `generate_all_aggregates`: its `main` on the flat layout (outputs removed first)
+- `generate_all_sources`: `generate_all_sources.py` on the tree
+- `build_site`: `build_site.py` on the tree (every output above in one pass, cold index)
+
+Results can be saved as a JSON baseline and compared with a later run; a
+growth of the median time or of `rss_increase_kb` beyond `--threshold` is
+reported as a regression and the process exits with status 1. Growths
+smaller than `--min-delta-ms` / `--min-delta-kb` are run-to-run noise on
+stages that take a few milliseconds or allocate little, and are not
+reported. Each run is also timed against a fixed reference workload run just
+before it, and times are compared that way: a machine that is slower as a
+whole, as virtual machines often are for a while, is not a regression, and
+neither is a change within the spread between the repeats.
+
+Usage:
+- python benchmarks/bench_suite.py                                  (scales 1 and 10)
+- python benchmarks/bench_suite.py --scales 1 10 100 --save before
+- python benchmarks/bench_suite.py --scales 1 10 100 --compare before --threshold 0.15
+"""
+
+from __future__ import annotations
+
+import argparse
+import builtins
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / 'scripts'))
+
+from layout import generate_layout  # noqa: E402
+
+
+BENCH_DIR = Path(__file__).resolve().parent
+DEFAULT_DATA_DIR = BENCH_DIR / '.data'
+DEFAULT_BASELINE_DIR = BENCH_DIR / 'baselines'
+# Smallest growth reported as a regression, whatever the relative change
+MIN_DELTA = {'median_seconds': 0.005, 'rss_increase_kb': 1024}
+STAGES = ['scan', 'read_picks_rows', 'load_corpus', 'aggregate_rows', 'write_aggregated', 'build_cover_map',
+          'read_rows', 'generate_all_aggregates', 'generate_all_sources', 'build_site']
+
+
+class IoCounter:
+    """Counts files opened for reading / writing and directories listed."""
+
+    def __init__(self) -> None:
+        self.files_read = 0
+        self.files_written = 0
+        self.dirs_listed = 0
+
+    def reset(self) -> None:
+        self.files_read = self.files_written = self.dirs_listed = 0
+
+    def install(self) -> None:
+        real_open, real_listdir, real_scandir, real_replace = io.open, os.listdir, os.scandir, os.replace
+
+        def counting_open(file, mode='r', *args, **kwargs):
+            # Descriptors (os.fdopen) belong to a write counted at os.replace
+            if not isinstance(file, int):
+                if any(c in mode for c in 'wax+'):
+                    self.files_written += 1
+                else:
+                    self.files_read += 1
+            return real_open(file, mode, *args, **kwargs)
+
+        def counting_listdir(path='.'):
+            self.dirs_listed += 1
+            return real_listdir(path)
+
+        def counting_scandir(path='.'):
+            self.dirs_listed += 1
+            return real_scandir(path)
+
+        def counting_replace(src, dst, **kwargs):
+            self.files_written += 1
+            return real_replace(src, dst, **kwargs)
+
+        io.open = builtins.open = counting_open  # type: ignore[assignment]
+        os.listdir, os.scandir, os.replace = counting_listdir, counting_scandir, counting_replace  # type: ignore[assignment]
+
+
+def peak_rss_kb() -> Optional[int]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def proc_status_kb(field: str) -> Optional[int]:
+    """A `/proc/self/status` memory field (VmRSS, VmHWM) in KiB; None off Linux."""
+    try:
+        with open('/proc/self/status', 'r', encoding='ascii') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def reset_peak_rss() -> bool:
+    """Reset the kernel's peak RSS (VmHWM) to the current RSS; False when unsupported."""
+    try:
+        with open('/proc/self/clear_refs', 'w', encoding='ascii') as f:
+            f.write('5')
+    except OSError:
+        return False
+    return True
+
+
+def rss_increase_kb(base_kb: Optional[int], reset: bool) -> Optional[int]:
+    """Growth of the peak RSS over `base_kb`, the RSS after setup.
+
+    With the peak reset after setup this is the stage's own peak; otherwise
+    ru_maxrss still holds any higher peak reached during setup, which hides
+    the stage's growth below it.
+    """
+    peak = proc_status_kb('VmHWM') if reset else peak_rss_kb()
+    if base_kb is None or peak is None:
+        return None
+    return max(0, peak - base_kb)
+
+
+# Each stage: setup(tree) -> state (untimed), run(state) (timed), optional reset(state) before each run
+Stage = Tuple[Callable[[Path], object], Callable[[object], None], Optional[Callable[[object], None]]]
+
+
+def _fresh_index() -> None:
+    import source_index
+    source_index._INDEXES.clear()
+
+
+def _themes(tree: Path) -> List[Path]:
+    from rebuild_list import list_available_lists
+    return list_available_lists(tree / 'list')
+
+
+def _picks(tree: Path):
+    from rebuild_list import pick_sources_for_list
+    return [pick_sources_for_list(d) for d in _themes(tree)]
+
+
+def stage_functions(name: str) -> Stage:
+    import generate_all_aggregates as gaa
+    from rebuild_list import aggregate_rows, pick_sources_for_list, read_picks_rows, write_aggregated
+
+    if name == 'scan':
+        def run_scan(tree) -> None:
+            for d in _themes(tree):
+                pick_sources_for_list(d)
+        return (lambda tree: tree), run_scan, lambda tree: _fresh_index()
+
+    if name == 'read_picks_rows':
+        def run_read(all_picks) -> None:
+            for picks in all_picks:
+                read_picks_rows(picks)
+        return _picks, run_read, None
+
+    if name == 'load_corpus':
+        from corpus_model import Corpus
+
+        def run_load(theme_picks) -> None:
+            corpus = Corpus()
+            for theme, picks in theme_picks:
+                corpus.read_picks(theme, picks)
+            corpus.freeze()
+        return (lambda tree: [(d.name, pick_sources_for_list(d)) for d in _themes(tree)]), run_load, None
+
+    if name == 'aggregate_rows':
+        def setup_aggregate(tree):
+            return [read_picks_rows(p) for p in _picks(tree)]
+
+        def run_aggregate(all_rows) -> None:
+            for rows in all_rows:
+                aggregate_rows(rows)
+        return setup_aggregate, run_aggregate, None
+
+    if name == 'write_aggregated':
+        def setup_write(tree):
+            return {'aggregated': [(d.name, aggregate_rows(read_picks_rows(pick_sources_for_list(d))))
+                                   for d in _themes(tree)], 'out': None}
+
+        def reset_write(state) -> None:
+            if state['out'] is not None:
+                shutil.rmtree(state['out'])
+            state['out'] = Path(tempfile.mkdtemp(prefix='bench-write-'))
+            for theme, _ in state['aggregated']:
+                (state['out'] / theme).mkdir()
+
+        def run_write(state) -> None:
+            for theme, agg_rows in state['aggregated']:
+                write_aggregated(state['out'] / theme, agg_rows)
+        return setup_write, run_write, reset_write
+
+    if name == 'build_cover_map':
+        from download_covers import build_cover_map_from_sources
+
+        def setup_covers(tree):
+            themes = _themes(tree)
+            for d in themes:
+                pick_sources_for_list(d)  # warm the index: time the CSV pass only
+            return themes
+
+        def run_covers(themes) -> None:
+            for d in themes:
+                build_cover_map_from_sources(d)
+        return setup_covers, run_covers, None
+
+    if name == 'read_rows':
+        def run_read_rows(tree) -> None:
+            for folder in gaa.theme_folders(str(tree / 'flat')):
+                gaa.read_rows(folder)
+        return (lambda tree: tree), run_read_rows, None
+
+    if name == 'generate_all_aggregates':
+        def reset_gaa(tree) -> None:
+            flat = tree / 'flat'
+            for path in [flat / 'aggregated-list.csv', *flat.glob('*/aggregated-list.csv')]:
+                path.unlink(missing_ok=True)
+
+        return (lambda tree: tree), (lambda tree: gaa.main(['--base-dir', str(tree / 'flat')])), reset_gaa
+
+    if name == 'generate_all_sources':
+        import generate_all_sources as gas
+
+        def run_sources(tree) -> None:
+            gas.write_all_sources(gas.source_rows(gas.collect_sources(str(tree / 'list'))),
+                                  str(tree / 'all_sources.csv'))
+        return (lambda tree: tree), run_sources, None
+
+    if name == 'build_site':
+        from build_site import build_site
+
+        def run_build(tree) -> None:
+            build_site(tree / 'list', tree)
+        return (lambda tree: tree), run_build, lambda tree: _fresh_index()
+
+    raise ValueError(f"Unknown stage: {name}")
+
+
+def reference_seconds(runs: int = 3) -> float:
+    """Median time of a fixed pure-Python workload: how fast the machine runs now."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        counts: Dict[int, int] = {}
+        for i in range(100_000):
+            counts[i % 97] = counts.get(i % 97, 0) + i
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def run_worker(stage: str, tree: Path, repeat: int) -> Dict[str, object]:
+    setup, run, before_run = stage_functions(stage)
+    counter = IoCounter()
+    counter.install()
+    state = setup(tree)
+    # What setup keeps (the tree read into memory, ...) is not the stage's
+    # cost: memory is measured from here
+    reset = reset_peak_rss()
+    base_kb = proc_status_kb('VmRSS') if reset else peak_rss_kb()
+    times: List[float] = []
+    relative: List[float] = []
+    for _ in range(max(1, repeat)):
+        if before_run is not None:
+            before_run(state)
+        # Timed right before the run, so that both see the same machine speed
+        reference = reference_seconds()
+        counter.reset()
+        start = time.perf_counter()
+        run(state)
+        times.append(time.perf_counter() - start)
+        relative.append(times[-1] / reference)
+    return {'seconds': round(min(times), 6), 'median_seconds': round(statistics.median(times), 6),
+            'relative_time': round(statistics.median(relative), 4),
+            'relative_spread': round(max(relative) - min(relative), 4),
+            'rss_increase_kb': rss_increase_kb(base_kb, reset),
+            'peak_rss_kb': peak_rss_kb(), 'files_read': counter.files_read,
+            'files_written': counter.files_written, 'dirs_listed': counter.dirs_listed}
+
+
+def run_stage(stage: str, tree: Path, repeat: int) -> Dict[str, object]:
+    out = subprocess.run([sys.executable, str(Path(__file__).resolve()), '--worker', stage, '--tree', str(tree),
+                          '--repeat', str(repeat)], capture_output=True, text=True)
+    if out.returncode != 0:
+        raise SystemExit(f"Stage {stage} failed:\n{out.stderr}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def compare(baseline: Dict[str, object], current: Dict[str, object], threshold: float,
+            min_delta: Optional[Dict[str, float]] = None) -> List[str]:
+    """Regressions of `current` against `baseline`, as printable lines.
+
+    Times are compared as `relative_time`, the median of each run's time over
+    a reference workload timed just before it, so that a machine running
+    slower as a whole is not a regression. A stage regresses when that grew
+    by more than `threshold` and by more than the `relative_spread` of either
+    side (the run-to-run variation), and its median time grew by more than
+    `min_delta['median_seconds']`; memory when `rss_increase_kb` grew by more
+    than `threshold` and `min_delta['rss_increase_kb']` (defaults: MIN_DELTA).
+    """
+    floors = {**MIN_DELTA, **(min_delta or {})}
+    regressions: List[str] = []
+    for scale, stages in current['results'].items():  # type: ignore[union-attr]
+        base_stages = baseline['results'].get(scale, {})  # type: ignore[union-attr]
+        for stage, r in stages.items():
+            b = base_stages.get(stage)
+            if not b:
+                continue
+            old, new = b.get('relative_time'), r.get('relative_time')
+            if (old and new and new > old * (1 + threshold)
+                    and new - old > max(b.get('relative_spread') or 0, r.get('relative_spread') or 0)
+                    and r['median_seconds'] - b['median_seconds'] > floors['median_seconds']):
+                regressions.append(f"{scale} {stage}: median {b['median_seconds']} s -> {r['median_seconds']} s, "
+                                   f"relative to the reference +{(new / old - 1) * 100:.0f}%")
+            old, new = b.get('rss_increase_kb'), r.get('rss_increase_kb')
+            if old and new and new > old * (1 + threshold) and new - old > floors['rss_increase_kb']:
+                regressions.append(f"{scale} {stage}: rss_increase_kb {old} -> {new} (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark the aggregation and I/O stages on synthetic trees')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10], help='Tree scales (1 = current data size)')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES)
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per stage; the best and median times are kept')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', default=str(DEFAULT_DATA_DIR), help='Where generated trees are kept')
+    parser.add_argument('--baseline-dir', default=str(DEFAULT_BASELINE_DIR))
+    parser.add_argument('--save', metavar='NAME', help='Save the results as baseline NAME')
+    parser.add_argument('--compare', metavar='NAME', help='Compare with baseline NAME')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Allowed slowdown / growth (default: 0.10)')
+    parser.add_argument('--min-delta-ms', type=float, default=MIN_DELTA['median_seconds'] * 1000,
+                        help='Slowdowns up to this many ms are noise (default: %(default)s)')
+    parser.add_argument('--min-delta-kb', type=float, default=MIN_DELTA['rss_increase_kb'],
+                        help='Memory growths up to this many KiB are noise (default: %(default)s)')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--tree', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, Path(args.tree), args.repeat)))
+        return
+
+    baseline = None
+    baseline_dir = Path(args.baseline_dir)
+    if args.compare:
+        with (baseline_dir / f"{args.compare}.json").open('r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    results: Dict[str, Dict[str, object]] = {}
+    for scale in args.scales:
+        tree = Path(args.data_dir) / f"scale-{scale}-seed-{args.seed}"
+        stats = generate_layout(tree, scale, args.seed)
+        print(f"{scale}x: {stats.themes} themes, {stats.csv_files} CSVs, {stats.rows:,} rows, "
+              f"{stats.bytes / 1e6:.1f} MB")
+        results[f"{scale}x"] = {}
+        for stage in args.stages:
+            r = run_stage(stage, tree, args.repeat)
+            results[f"{scale}x"][stage] = r
+            grown = r.get('rss_increase_kb')
+            rss = f"{grown / 1024:8.1f} MB" if grown is not None else '       n/a'
+            print(f"  {stage:<24} {r['median_seconds'] * 1000:10.2f} ms (best {r['seconds'] * 1000:.2f})  RSS +{rss}  "
+                  f"read {r['files_read']:>7}  written {r['files_written']:>7}  listed {r['dirs_listed']:>7}")
+
+    report = {'meta': {'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                       'python': platform.python_version(), 'platform': platform.platform(),
+                       'repeat': args.repeat, 'seed': args.seed},
+              'results': results}
+    if args.save:
+        baseline_dir.mkdir(parents=True, exist_ok=True)
+        path = baseline_dir / f"{args.save}.json"
+        path.write_text(json.dumps(report, indent=2) + '\n', encoding='utf-8')
+        print(f"Saved baseline: {path}")
+    if baseline is not None:
+        regressions = compare(baseline, report, args.threshold,
+                              {'median_seconds': args.min_delta_ms / 1000, 'rss_increase_kb': args.min_delta_kb})
+        if regressions:
+            print(f"Regressions beyond {args.threshold:.0%} against '{args.compare}':")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"No regression beyond {args.threshold:.0%} against '{args.compare}'.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Fuzzy title resolution (`title_match.TitleIndex`) on large synthetic catalogues.
+
+Titles are 2 to 5 words drawn from a vocabulary of random words (English
+letter frequencies), some with a
+sequel number. The catalogue is loaded first (every title new); then variants
+of catalogue titles (case, accents, punctuation, a dropped letter) and unseen
+titles are resolved. Reported: load rate, mean lookup time for variants and
+misses, the share of variants resolved to their original, and for comparison
+the time of a pairwise scan over the catalogue for a few lookups.
+
+Usage:
+- python benchmarks/bench_titles.py                          (10k, 100k, 300k titles)
+- python benchmarks/bench_titles.py --titles 1000000 --queries 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+
+from title_match import TitleIndex, normalize_title, trigrams  # noqa: E402
+
+
+# English letter frequencies, so that trigram frequencies are skewed as in real titles
+LETTERS = 'etaoinshrdlcumwfgypbvkjxqz'
+WEIGHTS = [127, 91, 82, 75, 70, 67, 63, 61, 60, 43, 40, 28, 28, 24, 24, 22, 20, 20, 19, 15, 10, 8, 2, 2, 1, 1]
+NUMERALS = ['2', '3', '4', 'II', 'III', 'IV', 'V', 'X']
+ACCENTS = str.maketrans({'e': 'é', 'o': 'ö', 'a': 'á'})
+
+
+def vocabulary(rng: random.Random, size: int) -> List[str]:
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choices(LETTERS, WEIGHTS, k=rng.randint(3, 9))).capitalize())
+    return sorted(words)
+
+
+def catalogue(rng: random.Random, n: int) -> List[str]:
+    words = vocabulary(rng, max(2000, n // 20))
+    titles = set()
+    while len(titles) < n:
+        title = ' '.join(rng.choice(words) for _ in range(rng.randint(2, 5)))
+        if rng.random() < 0.15:
+            title += ' ' + rng.choice(NUMERALS)
+        elif rng.random() < 0.2:
+            title = title.replace(' ', ': ', 1)
+        titles.add(title)
+    return sorted(titles, key=lambda t: rng.random())
+
+
+def variant(rng: random.Random, title: str) -> str:
+    kind = rng.randrange(4)
+    if kind == 0:
+        return title.upper()
+    if kind == 1:
+        return title.translate(ACCENTS)
+    if kind == 2:
+        return title.replace(': ', ' - ') if ': ' in title else 'The ' + title
+    # One letter dropped from the longest word
+    words = title.split(' ')
+    i = max(range(len(words)), key=lambda k: len(words[k]))
+    w = words[i]
+    if len(w) > 4:
+        j = rng.randrange(1, len(w) - 1)
+        words[i] = w[:j] + w[j + 1:]
+    return ' '.join(words)
+
+
+def pairwise(index: TitleIndex, title: str) -> Tuple[int, float]:
+    # The naive alternative: compare with every catalogue entry
+    grams = trigrams(normalize_title(title))
+    best, best_sim = -1, 0.0
+    for entry, other in enumerate(index.grams):
+        shared = len(grams & other)
+        sim = shared / (len(grams) + len(other) - shared)
+        if sim > best_sim:
+            best, best_sim = entry, sim
+    return best, best_sim
+
+
+def run(n: int, queries: int, seed: int, threshold: float) -> None:
+    rng = random.Random(seed)
+    titles = catalogue(rng, n)
+    index = TitleIndex(threshold)
+    start = time.perf_counter()
+    for t in titles:
+        index.resolve(t)
+    load = time.perf_counter() - start
+
+    originals = [rng.choice(titles) for _ in range(queries)]
+    variants = [variant(rng, t) for t in originals]
+    start = time.perf_counter()
+    hits = sum(index.resolve(v).title == o for v, o in zip(variants, originals))
+    variant_time = time.perf_counter() - start
+
+    misses = catalogue(random.Random(seed + 1), queries)
+    start = time.perf_counter()
+    for t in misses:
+        index.match(t, None, None)
+    miss_time = time.perf_counter() - start
+
+    sample = variants[:20]
+    start = time.perf_counter()
+    for v in sample:
+        pairwise(index, v)
+    pair_time = (time.perf_counter() - start) / len(sample)
+
+    print(f"{n:>9,} titles: load {n / load:>9,.0f}/s  variant {variant_time / queries * 1e6:8.1f} us  "
+          f"miss {miss_time / queries * 1e6:8.1f} us  resolved {hits / queries:6.1%}  "
+          f"pairwise {pair_time * 1e6:10.0f} us")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark fuzzy title resolution')
+    parser.add_argument('--titles', type=int, nargs='+', default=[10_000, 100_000, 300_000])
+    parser.add_argument('--queries', type=int, default=5000)
+    parser.add_argument('--threshold', type=float, default=0.85)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    for n in args.titles:
+        run(n, args.queries, args.seed, args.threshold)
+
+
+if __name__ == '__main__':
+    main()
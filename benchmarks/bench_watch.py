@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Latency of `scripts/watch.py` from a snapshot drop to the updated outputs.
+
+A synthetic tree (`benchmarks/layout.py`) is copied to a temporary folder and
+the watcher is started on it as a subprocess. New snapshots of random sources
+(the latest CSV with its scores changed) are then written one at a time, each
+atomically as a scraper would, and the time until both the list's
+`aggregated-list.csv` and the root `aggregated-list.csv` are rewritten is
+measured by polling their mtimes. Reported: p50, p95 and max latency.
+
+Usage:
+- python benchmarks/bench_watch.py                       (scale 1, inotify)
+- python benchmarks/bench_watch.py --scales 1 10 --drops 50
+- python benchmarks/bench_watch.py --poll --interval 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+from synthetic import REPO_ROOT
+
+from layout import generate_layout
+
+
+BENCH_DIR = Path(__file__).resolve().parent
+DEFAULT_DATA_DIR = BENCH_DIR / '.data'
+TIMEOUT = 5.0
+
+
+def drop_snapshot(rng: random.Random, source_dir: Path, n: int) -> None:
+    latest = sorted(source_dir.glob('*.csv'))[-1]
+    with latest.open('r', encoding='utf-8', newline='') as f:
+        rows = list(csv.reader(f))
+    score = rows[0].index('Score')
+    for row in rows[1:]:
+        row[score] = str(rng.randint(1, 100))
+    out = io.StringIO(newline='')
+    csv.writer(out).writerows(rows)
+    data = out.getvalue()
+    name = f"{source_dir.name} - 2100-01-01_00-00-{n:02d}.csv" if n < 60 else \
+        f"{source_dir.name} - 2100-01-01_00-{n // 60:02d}-{n % 60:02d}.csv"
+    tmp = source_dir / f".{name}.part"
+    tmp.write_bytes(data.encode('utf-8'))
+    os.replace(tmp, source_dir / name)
+
+
+def wait_rewritten(paths: List[Path], before: List[int], start: float) -> float:
+    while True:
+        if all(os.stat(p).st_mtime_ns != m for p, m in zip(paths, before)):
+            return time.perf_counter() - start
+        if time.perf_counter() - start > TIMEOUT:
+            return float('inf')
+        time.sleep(0.001)
+
+
+def run(tree: Path, drops: int, seed: int, watch_args: List[str]) -> None:
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / 'list'
+        shutil.copytree(tree / 'list', root)
+        proc = subprocess.Popen([sys.executable, str(REPO_ROOT / 'scripts' / 'watch.py'), '--root', str(root),
+                                 *watch_args], stdout=subprocess.PIPE, text=True)
+        try:
+            ready = proc.stdout.readline().strip()  # type: ignore[union-attr]
+            print(f"  {ready}")
+            sources = sorted(p for p in root.glob('*/*') if p.is_dir())
+            latencies = []
+            for n in range(drops):
+                source_dir = rng.choice(sources)
+                paths = [source_dir.parent / 'aggregated-list.csv', root.parent / 'aggregated-list.csv']
+                before = [os.stat(p).st_mtime_ns for p in paths]
+                start = time.perf_counter()
+                drop_snapshot(rng, source_dir, n)
+                latencies.append(wait_rewritten(paths, before, start))
+                # Let the debounce window close before the next drop
+                time.sleep(0.1)
+        finally:
+            proc.terminate()
+            proc.wait()
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    missed = sum(1 for x in latencies if x == float('inf'))
+    print(f"  {drops} drops: p50 {p50 * 1000:7.1f} ms  p95 {p95 * 1000:7.1f} ms  max {latencies[-1] * 1000:7.1f} ms"
+          + (f"  ({missed} not picked up within {TIMEOUT:.0f} s)" if missed else ''))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark the watch-mode rebuild latency')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1])
+    parser.add_argument('--drops', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', default=str(DEFAULT_DATA_DIR), help='Where generated trees are kept')
+    parser.add_argument('--poll', action='store_true', help='Run the watcher with --poll')
+    parser.add_argument('--interval', type=float, help='Polling interval in ms')
+    parser.add_argument('--debounce', type=float, help='Debounce window in ms')
+    args = parser.parse_args()
+
+    watch_args = ['--poll'] if args.poll else []
+    if args.interval is not None:
+        watch_args += ['--interval', str(args.interval)]
+    if args.debounce is not None:
+        watch_args += ['--debounce', str(args.debounce)]
+    for scale in args.scales:
+        tree = Path(args.data_dir) / f"scale-{scale}-seed-{args.seed}"
+        stats = generate_layout(tree, scale, args.seed)
+        print(f"{scale}x: {stats.themes} themes, {stats.csv_files} CSVs")
+        run(tree, args.drops, args.seed, watch_args)
+
+
+if __name__ == '__main__':
+    main()
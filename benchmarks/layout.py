@@ -0,0 +1,140 @@
+"""
+Deterministic synthetic `list/` trees shaped like the real one.
+
+At scale 1 the tree matches the current data: 82 themes, ~6.7 sources per
+theme (1 to 27), 15 rows per source CSV for most sources, and about 1% of the
+sources with an older snapshot next to the latest one. Scale N multiplies the
+number of themes (and the size of the game catalogue) by N; every theme is
+generated from its own seed, so a larger tree contains the smaller ones.
+
+Layout written under `dest`:
+- `list/<theme>/<source>/<source> - YYYY-MM-DD_HH-MM-SS.csv` and
+  `list/<theme>/about.csv`, as in the repository;
+- `flat/<theme>/`: the latest CSV of every source and `about.csv`, hard-linked
+  directly in the theme folder (the layout `generate_all_aggregates.py` reads);
+- `layout.json`: generator version, parameters and counts. A tree is reused
+  when this file matches.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+import os
+import shutil
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from synthetic import game_title
+
+
+GENERATOR_VERSION = 1
+BASE_THEMES = 82
+BASE_GAMES = 2000
+SOURCE_POOL = 206
+LIST_SIZE = 15
+HISTORY_SHARE = 0.01
+FIELDS = ['Position', 'Title', 'ReleaseDate', 'ExternalId', 'Score', 'GameId', 'CoverImageId']
+EPOCH = 1672531200  # 2023-01-01 00:00:00 UTC
+
+
+@dataclass
+class LayoutStats:
+    version: int
+    scale: int
+    seed: int
+    themes: int = 0
+    sources: int = 0
+    csv_files: int = 0
+    rows: int = 0
+    bytes: int = 0
+    seconds: float = 0.0
+
+
+def source_name(k: int) -> str:
+    return f"source {k:03d}"
+
+
+def _stamp(t: int) -> str:
+    return time.strftime('%Y-%m-%d_%H-%M-%S', time.gmtime(t))
+
+
+def _render(rows: List[List[object]]) -> bytes:
+    buf = io.StringIO(newline='')
+    writer = csv.writer(buf)
+    writer.writerow(FIELDS)
+    writer.writerows(rows)
+    return buf.getvalue().encode('utf-8')
+
+
+def _snapshot_rows(rng: np.random.Generator, n_games: int) -> List[List[object]]:
+    size = LIST_SIZE if rng.random() < 0.9 else int(rng.integers(1, LIST_SIZE + 1))
+    # Zipf-like popularity, without repeats inside one list
+    games: List[int] = []
+    seen = set()
+    while len(games) < size:
+        g = int(rng.pareto(1.2) * n_games / 20) % n_games
+        if g not in seen:
+            seen.add(g)
+            games.append(g)
+    return [[pos, game_title(g), f"{1980 + g % 45}-{1 + g % 12:02d}-{1 + g % 28:02d}", 100000 + g,
+             LIST_SIZE + 1 - pos, g, f"co{g:06x}"] for pos, g in enumerate(games, start=1)]
+
+
+def generate_theme(list_root: Path, flat_root: Path, theme_index: int, n_games: int, seed: int, stats: LayoutStats) -> None:
+    rng = np.random.default_rng([seed, theme_index])
+    theme = f"synthetic_theme_{theme_index:06d}"
+    theme_dir = list_root / theme
+    flat_dir = flat_root / theme
+    flat_dir.mkdir(parents=True, exist_ok=True)
+    n_sources = int(min(27, 1 + rng.poisson(5.7)))
+    about = io.StringIO(newline='')
+    about_writer = csv.writer(about)
+    about_writer.writerow(['SourceName', 'SourceURL', 'SourceId', 'GeneratedCsvPath'])
+    for k in sorted(rng.choice(SOURCE_POOL, size=n_sources, replace=False).tolist()):
+        name = source_name(k)
+        source_dir = theme_dir / name
+        source_dir.mkdir(parents=True, exist_ok=True)
+        t = EPOCH + int(rng.integers(0, 2 * 365 * 86400))
+        n_snapshots = 2 if rng.random() < HISTORY_SHARE else 1
+        latest = source_dir
+        for _ in range(n_snapshots):
+            data = _render(_snapshot_rows(rng, n_games))
+            latest = source_dir / f"{name} - {_stamp(t)}.csv"
+            latest.write_bytes(data)
+            stats.csv_files += 1
+            stats.rows += data.count(b'\n') - 1
+            stats.bytes += len(data)
+            t += int(rng.integers(86400, 90 * 86400))
+        os.link(latest, flat_dir / latest.name)
+        about_writer.writerow([name.title(), f"https://example.com/{k}", k, f"{name}/{latest.name}"])
+        stats.sources += 1
+    (theme_dir / 'about.csv').write_text(about.getvalue(), encoding='utf-8')
+    os.link(theme_dir / 'about.csv', flat_dir / 'about.csv')
+    stats.themes += 1
+
+
+def generate_layout(dest: Path, scale: int, seed: int = 0) -> LayoutStats:
+    """Create (or reuse) the tree for `scale` under `dest`."""
+    marker = dest / 'layout.json'
+    try:
+        existing = json.loads(marker.read_text(encoding='utf-8'))
+        if (existing.get('version'), existing.get('scale'), existing.get('seed')) == (GENERATOR_VERSION, scale, seed):
+            return LayoutStats(**existing)
+    except (OSError, ValueError, TypeError):
+        pass
+    if dest.exists():
+        shutil.rmtree(dest)
+    start = time.perf_counter()
+    stats = LayoutStats(GENERATOR_VERSION, scale, seed)
+    n_games = BASE_GAMES * scale
+    for i in range(BASE_THEMES * scale):
+        generate_theme(dest / 'list', dest / 'flat', i, n_games, seed, stats)
+    stats.seconds = round(time.perf_counter() - start, 3)
+    marker.write_text(json.dumps(asdict(stats), indent=2), encoding='utf-8')
+    return stats
@@ -0,0 +1,74 @@
+"""
+Deterministic synthetic data for the benchmarks.
+
+Rows follow the shape of the real source CSVs: each source snapshot ranks a
+slice of the game catalogue, popular games appear in many sources, and the
+score decreases with the position as in the real lists.
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SCRIPTS_DIR = REPO_ROOT / 'scripts'
+for _path in (SCRIPTS_DIR, REPO_ROOT):
+    if str(_path) not in sys.path:
+        sys.path.insert(0, str(_path))
+
+
+CHUNK_ROWS = 1_000_000
+
+
+def synthetic_chunk(start: int, n_rows: int, list_size: int, n_games: int, seed: int) -> Dict[str, np.ndarray]:
+    """Rows `start`..`start + n_rows` of the synthetic corpus."""
+    rng = np.random.default_rng([seed, start])
+    # Zipf-like popularity: low ids are picked much more often
+    game = (rng.pareto(1.2, n_rows) * n_games / 20).astype(np.int64) % n_games
+    row = np.arange(start, start + n_rows, dtype=np.int64)
+    position = row % list_size + 1
+    source = row // list_size
+    score = np.maximum(list_size - position + 1, 1)
+    year = 1980 + game % 45
+    return {'game': game, 'position': position, 'source': source, 'score': score, 'year': year}
+
+
+def iter_synthetic_chunks(n_rows: int, list_size: int = 25, n_games: int = 0, seed: int = 0,
+                          chunk_rows: int = CHUNK_ROWS) -> Iterator[Dict[str, np.ndarray]]:
+    """The synthetic corpus as bounded chunks (`chunk_rows` is rounded to whole lists)."""
+    n_games = n_games or max(100, n_rows // 200)
+    chunk_rows = max(list_size, chunk_rows - chunk_rows % list_size)
+    for start in range(0, n_rows, chunk_rows):
+        yield synthetic_chunk(start, min(chunk_rows, n_rows - start), list_size, n_games, seed)
+
+
+def synthetic_columns(n_rows: int, list_size: int = 25, n_games: int = 0, seed: int = 0) -> Dict[str, np.ndarray]:
+    """Column arrays for `n_rows` rows grouped in snapshots of `list_size` rows."""
+    chunks = list(iter_synthetic_chunks(n_rows, list_size, n_games, seed))
+    if not chunks:
+        return synthetic_chunk(0, 0, list_size, max(100, n_games), seed)
+    return {k: np.concatenate([c[k] for c in chunks]) for k in chunks[0]}
+
+
+def game_title(game: int) -> str:
+    return f"Synthetic Game {game:07d}"
+
+
+def iter_dict_rows(columns: Dict[str, np.ndarray], limit: int = 0) -> Iterator[Dict[str, str]]:
+    """Rows shaped like `rebuild_list.read_picks_rows` output (all strings)."""
+    n = limit or columns['game'].size
+    game = columns['game'][:n].tolist()
+    score = columns['score'][:n].tolist()
+    source = columns['source'][:n].tolist()
+    year = columns['year'][:n].tolist()
+    for g, s, src, y in zip(game, score, source, year):
+        yield {'Title': game_title(g), 'Score': str(s), 'ReleaseDate': f"{y}-01-01",
+               'SourceFile': f"source{src} - 2024-01-01_00-00-00.csv"}
+
+
+def dict_rows(columns: Dict[str, np.ndarray], limit: int = 0) -> List[Dict[str, str]]:
+    return list(iter_dict_rows(columns, limit))
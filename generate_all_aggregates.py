@@ -1,68 +1,147 @@
+import argparse
 import csv
 import os
-from collections import defaultdict
+import sys
 from pathlib import Path
 
 BASE_DIR = Path(__file__).parent
+sys.path.insert(0, str(BASE_DIR / 'scripts'))
 
+from atomic_io import write_csv_atomic  # noqa: E402
+from instrument import add_arguments, count, session_from_args, stage  # noqa: E402
+from json_export import EXPORT_DIR, drop_export  # noqa: E402
+from rebuild_all import map_in_order  # noqa: E402
 
-def read_rows(folder):
-    rows = []
+
+def iter_rows(folder):
+    # Rows are yielded one at a time so callers can fold them without
+    # holding a whole theme (or the whole corpus) in memory
     for name in sorted(os.listdir(folder)):
         if name.endswith('.csv') and name != 'about.csv' and not name.startswith('aggregated'):
             path = os.path.join(folder, name)
+            n = 0
             with open(path, newline='', encoding='utf-8') as f:
                 reader = csv.DictReader(f)
                 for r in reader:
                     score = int(float(r['Score']))
-                    rows.append({'Title': r['Title'],
-                                 'Score': score,
-                                 'ReleaseDate': r['ReleaseDate'],
-                                 'SourceFile': name})
-    return rows
+                    n += 1
+                    yield {'Title': r['Title'],
+                           'Score': score,
+                           'ReleaseDate': r['ReleaseDate'],
+                           'SourceFile': name}
+            count('files_read')
+            count('rows_parsed', n)
 
 
-def aggregate_rows(rows):
-    agg = defaultdict(lambda: {'TotalScore': 0, 'Sources': set(), 'ReleaseYear': None})
+def read_rows(folder):
+    return list(iter_rows(folder))
+
+
+def partial_aggregate(rows):
+    # Title -> [TotalScore, Sources, ReleaseYear], in first-seen title order
+    partial = {}
     for r in rows:
-        title = r['Title']
-        entry = agg[title]
-        entry['TotalScore'] += r['Score']
-        entry['Sources'].add(r['SourceFile'])
-        if not entry['ReleaseYear']:
-            entry['ReleaseYear'] = r['ReleaseDate'].split('-')[0]
+        entry = partial.get(r['Title'])
+        if entry is None:
+            entry = partial[r['Title']] = [0, set(), None]
+        entry[0] += r['Score']
+        entry[1].add(r['SourceFile'])
+        if not entry[2]:
+            entry[2] = r['ReleaseDate'].split('-')[0]
+    return partial
+
+
+def compact_partial(partial):
+    # (title, total, lists, year) tuples: the sources of one theme are only
+    # needed to count its lists, so they are not carried any further
+    return [(title, total, len(sources), year) for title, (total, sources, year) in partial.items()]
+
+
+def merge_compact(into, compact):
+    # Folding compact partials in the order the rows would have been read keeps
+    # the result (including the order of tied scores) identical to a single
+    # pass, with memory bounded by the number of distinct titles
+    for title, total, lists, year in compact:
+        entry = into.get(title)
+        if entry is None:
+            into[title] = [total, lists, year]
+            continue
+        entry[0] += total
+        entry[1] += lists
+        if not entry[2]:
+            entry[2] = year
+    return into
+
+
+def finalize(totals):
     agg_rows = []
-    for title, data in agg.items():
-        agg_rows.append({'Title': f"{title} ({data['ReleaseYear']})",
-                         'TotalScore': data['TotalScore'],
-                         'ListsAppeared': len(data['Sources'])})
+    for title, (total, lists, year) in totals.items():
+        agg_rows.append({'Title': f"{title} ({year})",
+                         'TotalScore': total,
+                         'ListsAppeared': lists})
     agg_rows.sort(key=lambda x: x['TotalScore'], reverse=True)
     return agg_rows
 
 
-def write_aggregated(folder, rows):
+def aggregate_rows(rows):
+    return finalize(merge_compact({}, compact_partial(partial_aggregate(rows))))
+
+
+def write_aggregated(folder, rows, export_dir=None):
+    # Written atomically, and not at all when the content is unchanged. A new
+    # content drops the JSON export made from the old one (by default the
+    # global export, <folder>/pages)
     path = os.path.join(folder, 'aggregated-list.csv')
-    with open(path, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=['Position', 'Title', 'TotalScore', 'ListsAppeared'])
-        writer.writeheader()
-        for i, row in enumerate(rows, start=1):
-            writer.writerow({'Position': i, **row})
+    with stage('write'):
+        changed = write_csv_atomic(path, ['Position', 'Title', 'TotalScore', 'ListsAppeared'],
+                                   ({'Position': i, **row} for i, row in enumerate(rows, start=1)))
+    if changed:
+        drop_export(Path(export_dir or os.path.join(folder, EXPORT_DIR)))
     return path
 
 
-def main():
-    all_rows = []
-    for name in sorted(os.listdir(BASE_DIR)):
-        d = os.path.join(BASE_DIR, name)
+def aggregate_folder(folder):
+    # Worker: aggregate and write one theme, return only its compact partial
+    # so the parent never sees source rows
+    with stage('theme', theme=os.path.basename(folder)):
+        with stage('read_aggregate'):
+            compact = compact_partial(partial_aggregate(iter_rows(folder)))
+        if compact:
+            with stage('sort'):
+                agg_rows = finalize(merge_compact({}, compact))
+            write_aggregated(folder, agg_rows, os.path.join(os.path.dirname(folder), EXPORT_DIR, os.path.basename(folder)))
+    return compact
+
+
+def theme_folders(base_dir):
+    folders = []
+    for name in sorted(os.listdir(base_dir)):
+        d = os.path.join(base_dir, name)
         if os.path.isdir(d) and os.path.isfile(os.path.join(d, 'about.csv')):
-            rows = read_rows(d)
-            if rows:
-                agg_rows = aggregate_rows(rows)
-                write_aggregated(d, agg_rows)
-                all_rows.extend(rows)
-    if all_rows:
-        agg_all = aggregate_rows(all_rows)
-        write_aggregated(BASE_DIR, agg_all)
+            folders.append(d)
+    return folders
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Aggregate every theme and the global list')
+    parser.add_argument('--jobs', type=int, default=1, help='Number of worker processes (default: 1)')
+    parser.add_argument('--base-dir', default=str(BASE_DIR), help='Folder holding the theme folders (default: this folder)')
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    with session_from_args(args):
+        base_dir = args.base_dir
+        with stage('scan'):
+            folders = theme_folders(base_dir)
+        all_totals = {}
+        # Merging follows theme order exactly as the sequential run does
+        for compact in map_in_order(aggregate_folder, folders, args.jobs):
+            with stage('merge'):
+                merge_compact(all_totals, compact)
+        if all_totals:
+            with stage('sort'):
+                agg_rows = finalize(all_totals)
+            write_aggregated(base_dir, agg_rows)
 
 
 if __name__ == '__main__':
@@ -1,35 +1,71 @@
+import argparse
 import csv
 import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / 'scripts'))
+
+from instrument import add_arguments, count, session_from_args, stage  # noqa: E402
 
 OUTPUT_FILE = 'all_sources.csv'
 
-source_map = {}
-
-for entry in os.listdir('.'):
-    about_path = os.path.join(entry, 'about.csv')
-    if os.path.isdir(entry) and os.path.exists(about_path):
-        with open(about_path, newline='', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                name = row.get('SourceName', '').strip()
-                if not name:
-                    continue
-                source_map.setdefault(name, set()).add(entry)
-
-rows = []
-for name, datasets in source_map.items():
-    rows.append({
-        'SourceName': name,
-        'Count': len(datasets),
-        'Datasets': ';'.join(sorted(datasets))
-    })
-
-rows.sort(key=lambda x: (-x['Count'], x['SourceName'].lower()))
-
-with open(OUTPUT_FILE, 'w', newline='', encoding='utf-8') as f:
-    writer = csv.DictWriter(f, fieldnames=['SourceName', 'Count', 'Datasets'])
-    writer.writeheader()
-    for row in rows:
-        writer.writerow(row)
-
-print(f'Written {OUTPUT_FILE} with {len(rows)} sources.')
+
+def collect_sources(base_dir='.'):
+    # SourceName -> set of datasets (theme folders) listing it in about.csv
+    source_map = {}
+    for entry in os.listdir(base_dir):
+        folder = os.path.join(base_dir, entry)
+        about_path = os.path.join(folder, 'about.csv')
+        if os.path.isdir(folder) and os.path.exists(about_path):
+            with open(about_path, newline='', encoding='utf-8') as f:
+                reader = csv.DictReader(f)
+                for row in reader:
+                    name = row.get('SourceName', '').strip()
+                    if not name:
+                        continue
+                    source_map.setdefault(name, set()).add(entry)
+            count('files_read')
+    return source_map
+
+
+def source_rows(source_map):
+    rows = []
+    for name, datasets in source_map.items():
+        rows.append({
+            'SourceName': name,
+            'Count': len(datasets),
+            'Datasets': ';'.join(sorted(datasets))
+        })
+    rows.sort(key=lambda x: (-x['Count'], x['SourceName'].lower()))
+    return rows
+
+
+def write_all_sources(rows, path=OUTPUT_FILE):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=['SourceName', 'Count', 'Datasets'])
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+        count('bytes_written', f.tell())
+    count('files_written')
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='List every source and the datasets using it')
+    parser.add_argument('--base-dir', default='.', help='Folder holding the theme folders (default: current folder)')
+    parser.add_argument('--out', default=OUTPUT_FILE, help=f'Output CSV (default: {OUTPUT_FILE})')
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    with session_from_args(args):
+        with stage('collect'):
+            rows = source_rows(collect_sources(args.base_dir))
+        with stage('write'):
+            path = write_all_sources(rows, args.out)
+    print(f'Written {path} with {len(rows)} sources.')
+
+
+if __name__ == '__main__':
+    main()
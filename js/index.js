@@ -60,6 +60,22 @@ function buildIgdbSmallCoverUrl(coverCode) {
   return `https://images.igdb.com/igdb/image/upload/t_cover_small/${coverCode}.jpg`;
 }
 
+// Tile of `coverCode` in a list's sprite sheet (scripts/cover_variants.py),
+// as CSS background properties scaled to the box it is drawn in
+function spriteTileStyle(sprite, coverCode) {
+  const at = sprite && sprite.tiles && sprite.tiles[coverCode];
+  if (!at) return null;
+  const col = at[0] / sprite.tile[0];
+  const row = at[1] / sprite.tile[1];
+  const x = sprite.columns > 1 ? (col / (sprite.columns - 1)) * 100 : 0;
+  const y = sprite.rows > 1 ? (row / (sprite.rows - 1)) * 100 : 0;
+  return {
+    backgroundImage: `url("covers/sprites/${encodeURIComponent(sprite.image)}")`,
+    backgroundSize: `${sprite.columns * 100}% ${sprite.rows * 100}%`,
+    backgroundPosition: `${x}% ${y}%`,
+  };
+}
+
 // ==========================
 // Redirect to cards when `?name=` is provided
 // ==========================
@@ -122,18 +138,36 @@ async function loadSourceCount(listName) {
   }
 }
 
-async function loadTopCoverCodes(listName, limit = 4) {
+async function loadSprite(listName) {
+  try {
+    const response = await fetch(`covers/sprites/${encodeURIComponent(listName)}.json`, { headers: { 'Accept': 'application/json' } });
+    return response.ok ? await response.json() : null;
+  } catch (_) {
+    return null;
+  }
+}
+
+async function loadTopCoverCodes(listName, limit = 4, sprite = null) {
   const aggregatedRows = await fetchCsvAsObjects(`list/${encodeURIComponent(listName)}/aggregated-list.csv`);
   const desiredTitles = aggregatedRows.slice(0, limit).map((o) => removeYearSuffix(o.Title || ''));
   if (!desiredTitles.length) return new Map();
+  const codeByTitle = new Map();
+  let missingTitles = desiredTitles;
+  if (sprite && sprite.titles) {
+    // The sprite index already maps titles to cover codes ('' for none); titles
+    // added since it was built are looked up in the source CSVs below
+    desiredTitles.forEach((title) => { if (sprite.titles[title]) codeByTitle.set(title, sprite.titles[title]); });
+    missingTitles = desiredTitles.filter((title) => !Object.prototype.hasOwnProperty.call(sprite.titles, title));
+    if (!missingTitles.length) return codeByTitle;
+  }
+  const found = () => missingTitles.every((title) => codeByTitle.has(title));
 
   let aboutRows = [];
-  try { aboutRows = await fetchCsvAsObjects(`list/${encodeURIComponent(listName)}/about.csv`); } catch (_) { return new Map(); }
+  try { aboutRows = await fetchCsvAsObjects(`list/${encodeURIComponent(listName)}/about.csv`); } catch (_) { return codeByTitle; }
   const relativePaths = aboutRows.map((r) => r.GeneratedCsvPath).filter(Boolean);
 
-  const codeByTitle = new Map();
   for (const rel of relativePaths) {
-    if (codeByTitle.size >= desiredTitles.length) break;
+    if (found()) break;
     const relStr = String(rel);
     const candidates = [
       `list/${encodeURIComponent(listName)}/${relStr.split('/').map(encodeURIComponent).join('/')}`,
@@ -146,13 +180,13 @@ async function loadTopCoverCodes(listName, limit = 4) {
       }
     }
     for (const url of candidates) {
-      if (codeByTitle.size >= desiredTitles.length) break;
+      if (found()) break;
       try {
         const rows = await fetchCsvAsObjects(url);
         rows.forEach((obj) => {
           const titleKey = removeYearSuffix(obj.Title || '');
           const coverCode = (obj.CoverImageId || '').trim();
-          if (titleKey && coverCode && desiredTitles.includes(titleKey) && !codeByTitle.has(titleKey)) {
+          if (titleKey && coverCode && missingTitles.includes(titleKey) && !codeByTitle.has(titleKey)) {
             codeByTitle.set(titleKey, coverCode);
           }
         });
@@ -196,19 +230,30 @@ function createGroupedListItem(listName, categoryName) {
   (async () => {
     const count = await loadSourceCount(listName);
     sourceCountInfo.textContent = count == null ? 'Sources: -' : `Sources: ${count}`;
-    const coverCodes = await loadTopCoverCodes(listName, 4);
+    const sprite = await loadSprite(listName);
+    const coverCodes = await loadTopCoverCodes(listName, 4, sprite);
     miniCovers.innerHTML = '';
     for (const [title, code] of coverCodes.entries()) {
-      const img = document.createElement('img');
-      img.src = `covers/${code}_small.jpg`;
-      img.onerror = function () { this.onerror = null; this.src = buildIgdbSmallCoverUrl(code); };
-      img.alt = title;
-      img.title = title;
-      img.width = 56;
-      img.height = 76;
-      img.style.borderRadius = '8px';
-      img.style.objectFit = 'cover';
-      miniCovers.appendChild(img);
+      // One sprite sheet per list instead of one image per cover
+      const tile = spriteTileStyle(sprite, code);
+      const cover = document.createElement(tile ? 'div' : 'img');
+      if (tile) {
+        Object.assign(cover.style, tile);
+        cover.setAttribute('role', 'img');
+        cover.setAttribute('aria-label', title);
+        cover.style.width = '56px';
+        cover.style.height = '76px';
+      } else {
+        cover.src = `covers/${code}_small.jpg`;
+        cover.onerror = function () { this.onerror = null; this.src = buildIgdbSmallCoverUrl(code); };
+        cover.alt = title;
+        cover.width = 56;
+        cover.height = 76;
+        cover.style.objectFit = 'cover';
+      }
+      cover.title = title;
+      cover.style.borderRadius = '8px';
+      miniCovers.appendChild(cover);
     }
   })();
 
@@ -45,6 +45,27 @@ function buildCoverSrc(coverId) {
   return `https://images.igdb.com/igdb/image/upload/t_cover_big/${coverId}.jpg`;
 }
 
+// Local variants first (see scripts/cover_variants.py), then the JPEG, then IGDB
+function coverCandidates(coverId, variants) {
+  const local = ['avif', 'webp'].filter(f => (variants || []).includes(f)).map(f => `covers/${coverId}_big.${f}`);
+  return [...local, `covers/${coverId}_big.jpg`, buildCoverSrc(coverId)];
+}
+
+// Tile of `coverId` in the list's sprite sheet as CSS background properties,
+// scaled to whatever box it is drawn in
+function spriteStyle(sprite, coverId) {
+  const at = sprite && sprite.tiles && sprite.tiles[coverId];
+  if (!at) return null;
+  const col = at[0] / sprite.tile[0], row = at[1] / sprite.tile[1];
+  const x = sprite.columns > 1 ? col / (sprite.columns - 1) * 100 : 0;
+  const y = sprite.rows > 1 ? row / (sprite.rows - 1) * 100 : 0;
+  return {
+    backgroundImage: `url("covers/sprites/${encodeURIComponent(sprite.image)}")`,
+    backgroundSize: `${sprite.columns * 100}% ${sprite.rows * 100}%`,
+    backgroundPosition: `${x}% ${y}%`,
+  };
+}
+
 async function fetchText(url, accept) {
   const res = await fetch(url, { headers: { 'Accept': accept || '*/*' } });
   if (!res.ok) throw new Error(`HTTP ${res.status} for ${url}`);
@@ -56,6 +77,10 @@ async function fetchCsvAsObjects(url) {
   return rowsToObjects(parseCSV(text));
 }
 
+async function fetchJson(url) {
+  return JSON.parse(await fetchText(url, 'application/json'));
+}
+
 // ============
 // Data loading
 // ============
@@ -64,6 +89,15 @@ async function loadAggregated(listName) {
   return fetchCsvAsObjects(url);
 }
 
+async function loadSprite(listName) {
+  try {
+    const res = await fetch(`covers/sprites/${encodeURIComponent(listName)}.json`, { headers: { 'Accept': 'application/json' } });
+    return res.ok ? await res.json() : null;
+  } catch (_) {
+    return null;
+  }
+}
+
 async function loadAboutRows(listName) {
   const url = `list/${encodeURIComponent(listName)}/about.csv`;
   try {
@@ -73,6 +107,65 @@ async function loadAboutRows(listName) {
   }
 }
 
+// ============
+// JSON pages (see scripts/json_export.py)
+// ============
+function exportDir(listName) {
+  return `pages/${encodeURIComponent(listName)}`;
+}
+
+async function loadExportIndex(listName) {
+  try {
+    const res = await fetch(`${exportDir(listName)}/index.json`, { headers: { 'Accept': 'application/json' } });
+    return res.ok ? await res.json() : null;
+  } catch (_) {
+    return null;
+  }
+}
+
+// Same normalization as json_export.search_key
+function searchKey(text) {
+  const words = (text || '').normalize('NFKD').replace(/\p{M}/gu, '').toLowerCase().match(/[\p{L}\p{N}]+/gu);
+  return words ? words.join(' ') : '';
+}
+
+// Pages and search shards of one list, each fetched once and only when asked for
+function createPagedList(listName, index) {
+  const dir = exportDir(listName);
+  const pages = new Map();
+  const shards = new Map();
+  const page = (n) => {
+    if (!pages.has(n)) pages.set(n, fetchJson(`${dir}/page-${n}.json`).then(p => p.items));
+    return pages.get(n);
+  };
+  const shard = (i) => {
+    if (!shards.has(i)) shards.set(i, fetchJson(`${dir}/search-${i}.json`));
+    return shards.get(i);
+  };
+  return {
+    index,
+    page,
+    pageOf: (position) => Math.ceil(position / index.pageSize),
+    async search(query, limit) {
+      const key = searchKey(query);
+      if (!key) return [];
+      const entries = await shard(key.codePointAt(0) % index.searchShards);
+      // Entries are sorted by key: start at the first one not below the query
+      let lo = 0, hi = entries.length;
+      while (lo < hi) {
+        const mid = (lo + hi) >> 1;
+        if (entries[mid][0] < key) lo = mid + 1; else hi = mid;
+      }
+      const found = new Map();
+      for (let i = lo; i < entries.length && entries[i][0].startsWith(key); i++) {
+        const [, position, title] = entries[i];
+        if (!found.has(position)) found.set(position, title);
+      }
+      return [...found].sort((a, b) => a[0] - b[0]).slice(0, limit).map(([position, title]) => ({ position, title }));
+    },
+  };
+}
+
 function candidateSourceUrls(listName, relPath) {
   const relStr = String(relPath);
   const direct = relStr.split('/').map(encodeURIComponent).join('/');
@@ -124,15 +217,20 @@ function ensureGrid(rootEl) {
   return ul;
 }
 
-function createCoverElement(coverId, title) {
+function createCoverElement(coverId, title, sprite) {
   const wrap = document.createElement('div');
   wrap.className = 'cover-wrap';
   if (coverId) {
+    // The sprite tile shows at once; the full cover loads over it when in view
+    const tile = spriteStyle(sprite, coverId);
+    if (tile) Object.assign(wrap.style, tile);
+    const candidates = coverCandidates(coverId, sprite && sprite.variants);
+    let next = 0;
     const img = document.createElement('img');
     img.className = 'game-card-cover';
-    img.src = `covers/${coverId}_big.jpg`;
+    img.src = candidates[next++];
     img.onerror = function () {
-      if (img.dataset.fallback !== '1') { img.dataset.fallback = '1'; img.src = buildCoverSrc(coverId); }
+      if (next < candidates.length) img.src = candidates[next++];
     };
     img.alt = title;
     img.title = title;
@@ -148,12 +246,13 @@ function createCoverElement(coverId, title) {
   return wrap;
 }
 
-function createCard(row, coverId) {
+function createCard(row, coverId, sprite) {
   const li = document.createElement('li');
   li.className = 'list-item game-card';
+  li.dataset.position = row.Position;
 
   const title = row.Title || '';
-  li.appendChild(createCoverElement(coverId, title));
+  li.appendChild(createCoverElement(coverId, title, sprite));
 
   const badge = document.createElement('span');
   badge.className = 'badge-pos';
@@ -172,16 +271,18 @@ function createCard(row, coverId) {
   return li;
 }
 
-function renderCards(rootEl, aggregated, coverMap) {
-  const ul = ensureGrid(rootEl);
+function appendCards(ul, rows, coverOf, sprite) {
   const frag = document.createDocumentFragment();
-  aggregated.forEach(row => {
-    const coverId = coverMap.get(baseTitle(row.Title || '')) || '';
-    frag.appendChild(createCard(row, coverId));
-  });
+  rows.forEach(row => frag.appendChild(createCard(row, coverOf(row), sprite)));
   ul.appendChild(frag);
 }
 
+function renderCards(rootEl, aggregated, coverMap, sprite) {
+  const ul = ensureGrid(rootEl);
+  appendCards(ul, aggregated, row => coverMap.get(baseTitle(row.Title || '')) || '', sprite);
+  return ul;
+}
+
 function renderTableFromObjects(thead, tbody, aggregated) {
   thead.innerHTML = '';
   tbody.innerHTML = '';
@@ -189,9 +290,14 @@ function renderTableFromObjects(thead, tbody, aggregated) {
   const tr = document.createElement('tr');
   header.forEach(h => { const th = document.createElement('th'); th.textContent = h; tr.appendChild(th); });
   thead.appendChild(tr);
+  appendTableRows(tbody, aggregated);
+}
+
+function appendTableRows(tbody, aggregated) {
   const frag = document.createDocumentFragment();
   aggregated.forEach(row => {
     const tr = document.createElement('tr');
+    tr.dataset.position = row.Position;
     [row.Position, row.Title, row.TotalScore, row.ListsAppeared].forEach((val, idx) => {
       const td = document.createElement('td');
       td.textContent = String(val ?? '');
@@ -217,6 +323,87 @@ function setupToggle(toggleBtn, gridEl, tableWrap) {
   toggleBtn.addEventListener('click', () => setMode(mode === 'cards' ? 'table' : 'cards'));
 }
 
+// Shows the first page of a JSON export; the next ones load as the end of the
+// list comes into view, or when a search result further down is picked
+async function showPaged(name, index, section, thead, tbody, status, searchInput, resultsEl) {
+  const list = createPagedList(name, index);
+  const [first, sprite] = await Promise.all([list.page(1), loadSprite(name)]);
+  const ul = ensureGrid(section);
+  if (thead && tbody) renderTableFromObjects(thead, tbody, []);
+
+  let loaded = 0;
+  const append = (items) => {
+    appendCards(ul, items, row => row.CoverImageId || '', sprite);
+    if (tbody) appendTableRows(tbody, items);
+    loaded++;
+    if (status) status.textContent = `${Math.min(loaded * index.pageSize, index.total)} de ${index.total} itens`;
+  };
+  append(first);
+
+  let loading = null;
+  const more = () => {
+    if (!loading && loaded < index.pages) {
+      loading = list.page(loaded + 1).then(append).finally(() => { loading = null; });
+    }
+    return loading || Promise.resolve();
+  };
+  const loadUntil = async (n) => {
+    while (loaded < Math.min(n, index.pages)) await more();
+  };
+
+  const sentinel = document.createElement('div');
+  sentinel.setAttribute('aria-hidden', 'true');
+  section.appendChild(sentinel);
+  if ('IntersectionObserver' in window) {
+    const io = new IntersectionObserver(entries => {
+      if (!entries.some(e => e.isIntersecting)) return;
+      // Observe again once the page is in, in case the sentinel is still in view
+      io.unobserve(sentinel);
+      more().catch(err => console.error(err)).then(() => { if (loaded < index.pages) io.observe(sentinel); });
+    }, { rootMargin: '600px 0px' });
+    io.observe(sentinel);
+  } else {
+    loadUntil(index.pages).catch(err => console.error(err));
+  }
+
+  if (!searchInput || !resultsEl) return;
+  searchInput.hidden = false;
+  const goTo = async (position) => {
+    await loadUntil(list.pageOf(position));
+    const target = [...document.querySelectorAll(`[data-position="${position}"]`)].find(el => el.offsetParent !== null);
+    if (!target) return;
+    target.scrollIntoView({ behavior: 'smooth', block: 'center' });
+    target.classList.add('search-hit');
+    setTimeout(() => target.classList.remove('search-hit'), 2000);
+  };
+  let timer = null;
+  let latest = 0;
+  searchInput.addEventListener('input', () => {
+    clearTimeout(timer);
+    timer = setTimeout(async () => {
+      const ticket = ++latest;
+      let found = [];
+      try {
+        found = await list.search(searchInput.value, 10);
+      } catch (err) {
+        console.error(err);
+      }
+      if (ticket !== latest) return;
+      resultsEl.innerHTML = '';
+      found.forEach(({ position, title }) => {
+        const li = document.createElement('li');
+        const btn = document.createElement('button');
+        btn.type = 'button';
+        btn.textContent = `#${position} ${title}`;
+        btn.addEventListener('click', () => { resultsEl.hidden = true; goTo(position); });
+        li.appendChild(btn);
+        resultsEl.appendChild(li);
+      });
+      resultsEl.hidden = !found.length;
+    }, 150);
+  });
+}
+
 // ============
 // Page flow
 // ============
@@ -230,6 +417,8 @@ async function loadPage() {
   const thead = document.getElementById('table-head');
   const tbody = document.getElementById('table-body');
   const gridSection = document.querySelector('main section');
+  const searchInput = document.getElementById('game-search');
+  const resultsEl = document.getElementById('search-results');
 
   if (!name) { if (status) status.textContent = 'Parametro ?name= nao informado.'; return; }
   if (pageTitle) pageTitle.textContent = humanize(name);
@@ -239,14 +428,32 @@ async function loadPage() {
   if (pathEl) pathEl.textContent = csvPath;
 
   try {
+    // Paginated JSON export when the site has one; the whole CSV otherwise.
+    // Scripts that rewrite the CSV without exporting remove index.json, so an
+    // export that exists is current
+    const index = gridSection ? await loadExportIndex(name) : null;
+    if (index) {
+      if (pathEl) pathEl.textContent = `${exportDir(name)}/index.json`;
+      await showPaged(name, index, gridSection, thead, tbody, status, searchInput, resultsEl);
+      if (tableWrap) tableWrap.hidden = true;
+      const toggleBtn = document.getElementById('toggle-view');
+      if (toggleBtn) setupToggle(toggleBtn, document.getElementById('game-grid'), tableWrap);
+      return;
+    }
+
     const aggregated = await loadAggregated(name);
 
-    // Covers
-    const coverMap = await buildCoverMap(name);
+    // Covers: the sprite index maps titles to codes without reading the source
+    // CSVs, unless the list gained titles since the sprite was built
+    const sprite = await loadSprite(name);
+    const spriteTitles = sprite && sprite.titles ? new Map(Object.entries(sprite.titles)) : null;
+    const coverMap = spriteTitles && aggregated.every(row => spriteTitles.has(baseTitle(row.Title || '')))
+      ? spriteTitles
+      : await buildCoverMap(name);
 
     // Render
     const section = gridSection || document.body;
-    renderCards(section, aggregated, coverMap);
+    renderCards(section, aggregated, coverMap, sprite);
     if (tableEl && thead && tbody) { renderTableFromObjects(thead, tbody, aggregated); if (tableWrap) tableWrap.hidden = true; }
 
     // Toggle
@@ -0,0 +1,94 @@
+"""
+Crash-safe output files.
+
+Outputs such as `aggregated-list.csv` and `about.csv` are served directly to
+the web front-end, so readers must never see a half-written file:
+- content is rendered in memory and compared with the current file; when it
+  is identical nothing is written (mtime, caches and watchers stay untouched);
+- otherwise it goes to a temporary file in the same folder, which is fsynced
+  and renamed over the destination (atomic on POSIX and Windows), then the
+  folder itself is fsynced so the rename survives a power loss.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, List, Union
+
+from instrument import count
+
+
+PathLike = Union[str, os.PathLike]
+
+
+def render_csv(fieldnames: List[str], rows: Iterable[Dict[str, object]]) -> str:
+    # Same dialect as csv.DictWriter on a file opened with newline=''
+    buf = io.StringIO(newline='')
+    writer = csv.DictWriter(buf, fieldnames=fieldnames)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+    return buf.getvalue()
+
+
+def _same_content(path: Path, data: bytes) -> bool:
+    try:
+        if path.stat().st_size != len(data):
+            return False
+        return path.read_bytes() == data
+    except OSError:
+        return False
+
+
+def _fsync_dir(folder: Path) -> None:
+    if os.name != 'posix':
+        return
+    fd = os.open(folder, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_bytes_atomic(path: PathLike, data: bytes) -> bool:
+    """Atomically replace `path` with `data`; returns False if unchanged."""
+    path = Path(path)
+    if _same_content(path, data):
+        count('files_unchanged')
+        return False
+    try:
+        mode = path.stat().st_mode & 0o777
+    except OSError:
+        umask = os.umask(0)
+        os.umask(umask)
+        mode = 0o666 & ~umask
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    _fsync_dir(path.parent)
+    count('files_written')
+    count('bytes_written', len(data))
+    return True
+
+
+def write_text_atomic(path: PathLike, text: str, encoding: str = 'utf-8') -> bool:
+    return write_bytes_atomic(path, text.encode(encoding))
+
+
+def write_csv_atomic(path: PathLike, fieldnames: List[str], rows: Iterable[Dict[str, object]]) -> bool:
+    return write_text_atomic(path, render_csv(fieldnames, rows))
@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Build every generated file of the site from one scan of `list/`.
+
+`generate_all_aggregates.py`, `generate_all_sources.py`, `download_covers.py`
+and `generate-manifest.mjs` each walk the tree and re-read the same files.
+This command lists the tree once (through the shared source index), reads the
+chosen CSV of every source and every `about.csv` once, and from those bytes
+writes:
+- `list/<theme>/aggregated-list.csv` and `about.csv`, as `rebuild_all.py`;
+- the root `aggregated-list.csv`, as `generate_all_aggregates.py` would over
+  the chosen CSVs of every theme;
+- `all_sources.csv`, as `generate_all_sources.py` over the `about.csv` rows;
+- `list/.cover-worklist.json`: the distinct cover codes of every list, in the
+  order `download_covers.py` collects them (`download_covers.py --worklist`
+  then skips its own CSV pass);
+- `list/_manifest.json`, as `generate-manifest.mjs` (`generatedAt` is only
+  bumped when the lists changed);
+- `list/.buildcache.json`, hashed from the bytes already read, so a later
+  `rebuild_all.py` finds every list up to date.
+
+With `--json-pages`, every list and the global list are also exported as
+paginated JSON with a sharded title search index under `pages/` of the site
+folder (see json_export.py); a list whose export is unchanged is skipped.
+
+With `--fuzzy-titles`, spelling variants of a title are matched across every
+list (see title_match.py) and the proposed merges are written to
+`list/.title-merges.csv` for review; the outputs keep the published titles.
+`--apply-merges <file>` renames the titles of a reviewed copy of that report
+before aggregating. The build cache is then left alone, so `rebuild_all.py`
+does not take the merged outputs for its own.
+
+Outputs whose content is unchanged are not rewritten (see atomic_io.py).
+
+Usage examples:
+- Build everything:             python scripts/build_site.py
+- Custom lists root:            python scripts/build_site.py --root list
+- Trace the stages:             python scripts/build_site.py --trace build.json
+- Report title variants:        python scripts/build_site.py --fuzzy-titles
+- Apply the reviewed merges:    python scripts/build_site.py --apply-merges reviewed-merges.csv
+- Paginated JSON exports:       python scripts/build_site.py --json-pages --page-size 100
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import generate_all_aggregates  # noqa: E402
+import generate_all_sources  # noqa: E402
+from atomic_io import write_bytes_atomic, write_csv_atomic  # noqa: E402
+from download_covers import base_title  # noqa: E402
+from instrument import add_arguments, count, session_from_args, stage  # noqa: E402
+from json_export import (  # noqa: E402
+    DEFAULT_PAGE_SIZE,
+    DEFAULT_SEARCH_SHARDS,
+    EXPORT_DIR,
+    ExportOptions,
+    global_items,
+    remove_stale_exports,
+    theme_items,
+    write_export,
+)
+from rebuild_all import fingerprint_outputs, save_build_cache  # noqa: E402
+from title_match import (  # noqa: E402
+    DEFAULT_THRESHOLD,
+    REPORT_NAME,
+    TitleIndex,
+    apply_approved,
+    load_approved,
+    resolve_rows,
+    write_report,
+)
+from rebuild_list import (  # noqa: E402
+    SourcePick,
+    about_rows,
+    aggregate_rows,
+    get_index,
+    load_existing_about,
+    script_root_list_dir,
+    write_about,
+    write_aggregated,
+)
+
+
+MANIFEST_NAME = '_manifest.json'
+WORKLIST_NAME = '.cover-worklist.json'
+
+
+@dataclass
+class SiteBuild:
+    themes: List[str] = field(default_factory=list)
+    empty: List[str] = field(default_factory=list)
+    files_read: int = 0
+    rows: int = 0
+    titles: int = 0
+    sources: int = 0
+    cover_codes: int = 0
+    merges: int = 0
+    exports: int = 0
+
+
+def read_pick(list_dir: Path, pick: SourcePick) -> Tuple[List[Dict[str, str]], Dict[str, object]]:
+    # One read per file: the same bytes are hashed for the build cache and
+    # parsed exactly as rebuild_list.read_source_rows does
+    with pick.csv_path.open('rb') as f:
+        data = f.read()
+        st = os.fstat(f.fileno())
+    rows = []
+    for r in csv.DictReader(io.StringIO(data.decode('utf-8'), newline='')):
+        r['SourceFile'] = pick.csv_path.name
+        rows.append(r)
+    fingerprint = {'name': pick.name, 'path': pick.csv_path.relative_to(list_dir).as_posix(),
+                   'sha256': hashlib.sha256(data).hexdigest(), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+    return rows, fingerprint
+
+
+def root_row(r: Dict[str, str]) -> Dict[str, object]:
+    # generate_all_aggregates.iter_rows keeps the title as is; an invalid
+    # score counts as 0, as in rebuild_list.aggregate_rows
+    try:
+        score = int(float(r['Score']))
+    except (KeyError, TypeError, ValueError):
+        score = 0
+    return {'Title': r.get('Title', ''), 'Score': score, 'ReleaseDate': r.get('ReleaseDate') or '',
+            'SourceFile': r['SourceFile']}
+
+
+def locale_key(name: str) -> Tuple[List[Tuple[int, str]], str]:
+    # Approximates String.prototype.localeCompare as used by
+    # generate-manifest.mjs: punctuation < digits < letters, case-insensitive
+    return [(0 if not c.isalnum() else 1 if c.isdigit() else 2, c.casefold()) for c in name], name
+
+
+def write_manifest(root: Path, lists: List[str]) -> Path:
+    path = root / MANIFEST_NAME
+    lists = sorted(lists, key=locale_key)
+    try:
+        with path.open('r', encoding='utf-8') as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = {}
+    if isinstance(previous, dict) and previous.get('lists') == lists and previous.get('generatedAt'):
+        generated = previous['generatedAt']
+    else:
+        now = time.time()
+        generated = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(now)) + f".{int(now * 1000) % 1000:03d}Z"
+    # Same layout as JSON.stringify(out, null, 2)
+    write_bytes_atomic(path, json.dumps({'generatedAt': generated, 'lists': lists}, indent=2,
+                                        ensure_ascii=False).encode('utf-8'))
+    return path
+
+
+def write_worklist(root: Path, codes: List[str], lists: int) -> Path:
+    path = root / WORKLIST_NAME
+    write_bytes_atomic(path, json.dumps({'lists': lists, 'codes': codes}, indent=1).encode('utf-8'))
+    return path
+
+
+@dataclass
+class ThemeBuild:
+    theme: str
+    files_read: int = 0
+    rows: int = 0
+    # Build cache entry; None when the list has no sources
+    cache: Optional[Dict[str, object]] = None
+    # generate_all_aggregates.compact_partial of the rows
+    compact: List[tuple] = field(default_factory=list)
+    source_names: List[str] = field(default_factory=list)
+    cover_codes: List[str] = field(default_factory=list)
+    # Listed in the manifest
+    listed: bool = True
+    # With an export: position and cover code of each title
+    positions: Dict[str, int] = field(default_factory=dict)
+    covers: Dict[str, str] = field(default_factory=dict)
+    exported: bool = False
+
+
+def build_theme(list_dir: Path, picks: List[SourcePick], titles: Optional[TitleIndex] = None,
+                merges: Optional[List[Dict[str, object]]] = None,
+                read: Callable[[Path, SourcePick], Tuple[List[Dict[str, str]], Dict[str, object]]] = read_pick,
+                export: Optional[ExportOptions] = None, approved: Optional[Dict[str, str]] = None) -> ThemeBuild:
+    """Write one list's outputs and keep what the site-wide files need of it.
+
+    `approved` titles (from a reviewed merge report) are renamed; `titles`
+    only records the merges it would make into `merges`.
+    """
+    theme = list_dir.name
+    build = ThemeBuild(theme)
+    if not picks:
+        # Nothing to rebuild; its about.csv still lists sources
+        build.source_names = [r['SourceName'].strip() for r in load_existing_about(list_dir).values()]
+        build.listed = (list_dir / 'aggregated-list.csv').is_file()
+        return build
+
+    rows: List[Dict[str, str]] = []
+    sources: List[Dict[str, object]] = []
+    with stage('read'):
+        for p in picks:
+            pick_rows, fingerprint = read(list_dir, p)
+            rows.extend(pick_rows)
+            sources.append(fingerprint)
+            count('files_read')
+        count('rows_parsed', len(rows))
+    build.files_read = len(picks)
+    build.rows = len(rows)
+    if approved:
+        rows = apply_approved(rows, approved)
+    if titles is not None:
+        with stage('titles'):
+            resolve_rows(titles, rows, theme, merges if merges is not None else [])
+
+    agg_rows = aggregate_rows(rows)
+    write_aggregated(list_dir, agg_rows, export.root / theme if export is not None else None)
+    about = about_rows(list_dir, picks)
+    write_about(list_dir, picks, about)
+
+    with stage('fold'):
+        build.compact = generate_all_aggregates.compact_partial(
+            generate_all_aggregates.partial_aggregate(root_row(r) for r in rows))
+        build.source_names = [name for r in about for name in [r['SourceName'].strip()] if name]
+        # First code per title, as download_covers.build_cover_map_from_sources
+        covers: Dict[str, str] = {}
+        for r in rows:
+            title = base_title(r.get('Title', ''))
+            code = (r.get('CoverImageId', '') or '').strip()
+            if title and code and title not in covers:
+                covers[title] = code
+        build.cover_codes = list(covers.values())
+    if export is not None:
+        items, build.positions = theme_items(rows, agg_rows, about, covers)
+        build.covers = covers
+        meta = {'name': theme, 'sources': [{'name': r['SourceName'], 'url': r['SourceURL']} for r in about]}
+        build.exported = write_export(export.root / theme, meta, items, export)
+    build.cache = {'sources': sources, 'outputs': fingerprint_outputs(list_dir)}
+    return build
+
+
+def save_caches(root: Path, builds: List[ThemeBuild], merges: Optional[List[Dict[str, object]]] = None,
+                merged: bool = False) -> int:
+    """Write the cover worklist, the merge report of a fuzzy build and the
+    build cache (not when `merged` titles were renamed); returns the number of
+    cover codes."""
+    codes: Dict[str, None] = {}
+    cache: Dict[str, Dict[str, object]] = {}
+    for build in builds:
+        if build.cache is not None:
+            for code in build.cover_codes:
+                codes.setdefault(code, None)
+            cache[build.theme] = build.cache
+    with stage('write'):
+        write_worklist(root, list(codes), len(cache))
+        if not merged:
+            save_build_cache(root, cache)
+        if merges is not None:
+            write_report(root / REPORT_NAME, merges)
+    count('cover_codes', len(codes))
+    return len(codes)
+
+
+def write_site(root: Path, site_dir: Path, builds: List[ThemeBuild],
+               merges: Optional[List[Dict[str, object]]] = None, caches: bool = True,
+               export: Optional[ExportOptions] = None, merged: bool = False) -> SiteBuild:
+    """Write the site-wide files from the lists' builds, in list order.
+
+    `merges` is the title merge report of a fuzzy build, and `merged` tells
+    the builds renamed approved titles. With `caches` off,
+    the files only the scripts read (see save_caches) are left for later.
+    With `export`, the builds were made with the same options and the global
+    list is exported too.
+    """
+    result = SiteBuild()
+    totals: Dict[str, list] = {}
+    source_map: Dict[str, set] = {}
+    manifest: List[str] = []
+
+    with stage('site'):
+        with stage('fold'):
+            for build in builds:
+                for name in build.source_names:
+                    source_map.setdefault(name, set()).add(build.theme)
+                if build.listed:
+                    manifest.append(build.theme)
+                if build.cache is None:
+                    result.empty.append(build.theme)
+                    continue
+                generate_all_aggregates.merge_compact(totals, build.compact)
+                result.themes.append(build.theme)
+                result.files_read += build.files_read
+                result.rows += build.rows
+        if totals:
+            with stage('sort'):
+                agg_rows = generate_all_aggregates.finalize(totals)
+            generate_all_aggregates.write_aggregated(str(site_dir), agg_rows, export.root if export is not None else None)
+        if export is not None:
+            exported = [b for b in builds if b.cache is not None]
+            items = global_items(totals, agg_rows if totals else [],
+                                 [(b.theme, b.positions, b.covers) for b in exported])
+            meta = {'name': 'all', 'sources': [{'name': b.theme} for b in exported]}
+            result.exports = sum(b.exported for b in builds) + write_export(export.root, meta, items, export)
+            remove_stale_exports(export, (b.theme for b in exported))
+        source_rows = generate_all_sources.source_rows(source_map)
+        with stage('write'):
+            write_csv_atomic(site_dir / generate_all_sources.OUTPUT_FILE, ['SourceName', 'Count', 'Datasets'],
+                             source_rows)
+            write_manifest(root, manifest)
+        if caches:
+            result.cover_codes = save_caches(root, builds, merges, merged)
+
+    result.titles = len(totals)
+    result.sources = len(source_rows)
+    result.merges = len(merges or ())
+    return result
+
+
+def build_site(root: Optional[Path] = None, site_dir: Optional[Path] = None,
+               titles: Optional[TitleIndex] = None, export: Optional[ExportOptions] = None,
+               approved: Optional[Dict[str, str]] = None) -> SiteBuild:
+    """Build every output; `titles` turns on the fuzzy title report,
+    `approved` renames reviewed titles and `export` writes the paginated JSON
+    exports."""
+    root = root or script_root_list_dir()
+    index = get_index(root)
+    builds: List[ThemeBuild] = []
+    merges: List[Dict[str, object]] = []
+
+    with stage('scan'):
+        list_dirs = index.lists()
+    for list_dir in list_dirs:
+        with stage('theme', theme=list_dir.name):
+            with stage('scan'):
+                picks = index.picks(list_dir)
+            builds.append(build_theme(list_dir, picks, titles, merges, export=export, approved=approved))
+
+    result = write_site(root, site_dir or root.parent, builds, None if titles is None else merges, export=export,
+                        merged=bool(approved))
+    index.save()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Build every generated file of the site in one pass')
+    parser.add_argument('--root', default=str(script_root_list_dir()), help='Root folder containing lists (default: list)')
+    parser.add_argument('--site-dir', help='Folder for the root aggregated-list.csv and all_sources.csv '
+                                           '(default: the parent of the root)')
+    parser.add_argument('--fuzzy-titles', action='store_true',
+                        help=f'Report spelling variants of titles across lists to <root>/{REPORT_NAME}')
+    parser.add_argument('--title-threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f'Minimum trigram similarity for --fuzzy-titles (default: {DEFAULT_THRESHOLD})')
+    parser.add_argument('--apply-merges', metavar='FILE',
+                        help='Rename the titles of a reviewed merge report (a copy of the --fuzzy-titles one)')
+    parser.add_argument('--json-pages', action='store_true', help=f'Also write paginated JSON exports to {EXPORT_DIR}/')
+    parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE,
+                        help=f'Games per JSON page (default: {DEFAULT_PAGE_SIZE})')
+    parser.add_argument('--search-shards', type=int, default=DEFAULT_SEARCH_SHARDS,
+                        help=f'Files the title search index is split into (default: {DEFAULT_SEARCH_SHARDS})')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    root = Path(args.root)
+    if not root.exists() or not root.is_dir():
+        print(f"Invalid root: {root}", file=sys.stderr)
+        sys.exit(1)
+
+    approved: Optional[Dict[str, str]] = None
+    if args.apply_merges:
+        try:
+            approved = load_approved(Path(args.apply_merges))
+        except OSError as exc:
+            print(f"Cannot read merges: {exc}", file=sys.stderr)
+            sys.exit(1)
+
+    with session_from_args(args):
+        titles = TitleIndex(args.title_threshold) if args.fuzzy_titles else None
+        site_dir = Path(args.site_dir) if args.site_dir else root.parent
+        export = ExportOptions(site_dir / EXPORT_DIR, args.page_size, args.search_shards) if args.json_pages else None
+        result = build_site(root, site_dir, titles, export, approved)
+    print(f"Built {len(result.themes)} lists ({len(result.empty)} without sources) from {result.files_read} "
+          f"CSVs and {result.rows} rows: {result.titles} titles, {result.sources} sources, "
+          f"{result.cover_codes} cover codes.")
+    if export is not None:
+        print(f"Exported {result.exports} changed lists to {export.root}")
+    if approved is not None:
+        print(f"Renamed {len(approved)} reviewed title variants")
+    if titles is not None:
+        print(f"Found title variants in {result.merges} rows, not applied; review {root / REPORT_NAME} "
+              f"and rebuild with --apply-merges <reviewed copy>")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Changelog of what moved between two builds: per source, per theme and in the
+global ranking.
+
+A build is the set of CSVs `pick_sources_for_list` chooses (latest snapshot per
+source). The previous build is kept in `list/.changelog-state.json`:
+- per theme and source: the CSV used and its contribution, i.e. for each
+  title its score, position and release year in that CSV;
+- per theme: the aggregated ranking (`aggregate_rows`) as Title -> position;
+- the global accumulator, Title -> [TotalScore, ListsAppeared, ReleaseYear],
+  summing every theme like `generate_all_aggregates.py` does.
+
+Each source also keeps the size, mtime and SHA-256 of its CSV, as the build
+cache of `rebuild_all.py` does. On the next run only sources whose chosen CSV
+is another file or has other content are read (a snapshot edited in place
+counts, a touched one does not). Their old contribution (from the state, so
+history files may be deleted) is subtracted from the global accumulator and
+the new one added; only the themes touched are re-aggregated. The global ranking is ordered by TotalScore, then title, so an
+incremental update and a full recomputation give the same positions.
+
+The diff is written as JSON (default `list/.changelog/<timestamp>.json`):
+    {"from": ..., "to": ...,
+     "themes": {theme: {"status": "added" | "removed" | "changed",
+                        "sources": {source: {"status": ..., "from": path, "to": path,
+                                             "added": [...], "removed": [...], "moved": [...]}},
+                        "ranking": {"added": [...], "removed": [...], "moved": [...]}}},
+     "global": {"added": [...], "removed": [...], "moved": [...]}}
+Entries carry `title` and `position` (`from`/`to` for moved ones, plus scores
+in the rankings).
+
+Usage examples:
+- Diff against the last run and record this build:   python scripts/changelog.py
+- Only print the diff, write nothing:                  python scripts/changelog.py --dry-run
+- Write the diff to a given file:                      python scripts/changelog.py --out changes.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from atomic_io import write_text_atomic
+from rebuild_all import fingerprint_sources
+from rebuild_list import (
+    SourcePick,
+    aggregate_rows,
+    get_index,
+    list_available_lists,
+    pick_sources_for_list,
+    read_picks_rows,
+    script_root_list_dir,
+)
+
+
+STATE_FILE_NAME = '.changelog-state.json'
+CHANGELOG_DIR_NAME = '.changelog'
+STATE_VERSION = 1
+
+# title -> [score, position, year] of one source CSV
+Contribution = Dict[str, list]
+# title -> [TotalScore, ListsAppeared, ReleaseYear]
+Totals = Dict[str, list]
+
+
+def read_contribution(csv_path: Path) -> Contribution:
+    contrib: Contribution = {}
+    with csv_path.open('r', encoding='utf-8', newline='') as f:
+        for r in csv.DictReader(f):
+            title = (r.get('Title') or '').strip()
+            if not title:
+                continue
+            try:
+                score = int(float(r.get('Score', '0')))
+            except (TypeError, ValueError, OverflowError):
+                score = 0
+            try:
+                position = int(r.get('Position') or 0)
+            except ValueError:
+                position = 0
+            entry = contrib.get(title)
+            if entry is None:
+                date = r.get('ReleaseDate') or ''
+                contrib[title] = [score, position, (date.split('-')[0] if date else '').strip()]
+            else:
+                entry[0] += score
+    return contrib
+
+
+def apply_contribution(totals: Totals, contrib: Contribution, sign: int) -> None:
+    """Add (sign=1) or subtract (sign=-1) one source CSV from the global totals."""
+    for title, (score, _, year) in contrib.items():
+        entry = totals.get(title)
+        if entry is None:
+            entry = totals[title] = [0, 0, year]
+        entry[0] += sign * score
+        entry[1] += sign
+        if entry[1] <= 0:
+            del totals[title]
+        elif not entry[2] and year:
+            entry[2] = year
+
+
+def global_positions(totals: Totals) -> Dict[str, int]:
+    ordered = sorted(totals, key=lambda t: (-totals[t][0], t))
+    return {title: i for i, title in enumerate(ordered, start=1)}
+
+
+def diff_positions(old: Dict[str, int], new: Dict[str, int],
+                   old_scores: Optional[Dict[str, int]] = None,
+                   new_scores: Optional[Dict[str, int]] = None) -> Dict[str, list]:
+    """Entries added, removed and moved between two title -> position maps."""
+    def with_score(item: dict, scores: Optional[Dict[str, int]], title: str, key: str) -> dict:
+        if scores is not None:
+            item[key] = scores[title]
+        return item
+
+    added = [with_score({'title': t, 'position': p}, new_scores, t, 'score')
+             for t, p in sorted(new.items(), key=lambda x: x[1]) if t not in old]
+    removed = [with_score({'title': t, 'position': p}, old_scores, t, 'score')
+               for t, p in sorted(old.items(), key=lambda x: x[1]) if t not in new]
+    moved = []
+    for t, p in sorted(new.items(), key=lambda x: x[1]):
+        if t not in old:
+            continue
+        changed_score = old_scores is not None and new_scores is not None and old_scores[t] != new_scores[t]
+        if old[t] != p or changed_score:
+            item = {'title': t, 'from': old[t], 'to': p}
+            if old_scores is not None and new_scores is not None:
+                item['score_from'], item['score_to'] = old_scores[t], new_scores[t]
+            moved.append(item)
+    return {'added': added, 'removed': removed, 'moved': moved}
+
+
+def _is_empty(diff: Dict[str, list]) -> bool:
+    return not (diff['added'] or diff['removed'] or diff['moved'])
+
+
+def _source_positions(contrib: Contribution) -> Dict[str, int]:
+    return {title: entry[1] for title, entry in contrib.items()}
+
+
+def theme_ranking(picks: List[SourcePick]) -> Dict[str, list]:
+    # Display title -> [Position, TotalScore] of the aggregated list
+    return {r['Title']: [r['Position'], r['TotalScore']] for r in aggregate_rows(read_picks_rows(picks))}
+
+
+def empty_state() -> Dict[str, object]:
+    return {'version': STATE_VERSION, 'built_at': None, 'themes': {}, 'global': {}}
+
+
+def load_state(root: Path) -> Optional[Dict[str, object]]:
+    try:
+        with (root / STATE_FILE_NAME).open('r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(state, dict) or state.get('version') != STATE_VERSION:
+        return None
+    return state
+
+
+def save_state(root: Path, state: Dict[str, object]) -> Path:
+    path = root / STATE_FILE_NAME
+    write_text_atomic(path, json.dumps(state, ensure_ascii=False, separators=(',', ':')))
+    return path
+
+
+def compute_changes(root: Path, state: Optional[Dict[str, object]] = None
+                    ) -> Tuple[Dict[str, object], Dict[str, object]]:
+    """Diff the current build against `state`; returns (diff, new state).
+
+    Without a state every theme is reported as added.
+    """
+    old = state or empty_state()
+    old_themes: Dict[str, dict] = old['themes']  # type: ignore[assignment]
+    old_totals: Totals = old['global']  # type: ignore[assignment]
+    totals: Totals = {title: list(entry) for title, entry in old_totals.items()}
+    now = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+
+    themes_state: Dict[str, dict] = {}
+    themes_diff: Dict[str, dict] = {}
+    current = {d.name: d for d in list_available_lists(root)}
+
+    for theme, list_dir in current.items():
+        picks = pick_sources_for_list(list_dir)
+        prev = old_themes.get(theme, {'sources': {}, 'ranking': {}})
+        prev_sources: Dict[str, dict] = prev['sources']
+        sources: Dict[str, dict] = {}
+        sources_diff: Dict[str, dict] = {}
+        # Hashes are reused while size and mtime match the state
+        fingerprints = fingerprint_sources(root, picks, [
+            {k: before.get(k) for k in ('path', 'size', 'mtime_ns', 'sha256')} for before in prev_sources.values()])
+        for p, fp in zip(picks, fingerprints):
+            rel = str(fp['path'])
+            stamp = {'sha256': fp['sha256'], 'size': fp['size'], 'mtime_ns': fp['mtime_ns']}
+            before = prev_sources.get(p.name)
+            same_file = before is not None and before['path'] == rel
+            if same_file and before.get('sha256') == fp['sha256']:
+                sources[p.name] = {**before, **stamp}
+                continue
+            contrib = read_contribution(p.csv_path)
+            sources[p.name] = {'path': rel, **stamp, 'entries': contrib}
+            if same_file and before['entries'] == contrib:
+                # Edited, but nothing the rankings use changed
+                continue
+            apply_contribution(totals, contrib, 1)
+            if before is not None:
+                apply_contribution(totals, before['entries'], -1)
+            sources_diff[p.name] = {'status': 'changed' if before else 'added',
+                                    'from': before['path'] if before else None, 'to': rel,
+                                    **diff_positions(_source_positions(before['entries']) if before else {},
+                                                     _source_positions(contrib))}
+        for name, before in prev_sources.items():
+            if name not in sources:
+                apply_contribution(totals, before['entries'], -1)
+                sources_diff[name] = {'status': 'removed', 'from': before['path'], 'to': None,
+                                      **diff_positions(_source_positions(before['entries']), {})}
+
+        if not sources_diff and theme in old_themes:
+            themes_state[theme] = {'sources': sources, 'ranking': prev['ranking']}
+            continue
+        ranking = theme_ranking(picks)
+        themes_state[theme] = {'sources': sources, 'ranking': ranking}
+        ranking_diff = diff_positions({t: v[0] for t, v in prev['ranking'].items()}, {t: v[0] for t, v in ranking.items()},
+                                      {t: v[1] for t, v in prev['ranking'].items()}, {t: v[1] for t, v in ranking.items()})
+        themes_diff[theme] = {'status': 'changed' if theme in old_themes else 'added',
+                              'sources': sources_diff, 'ranking': ranking_diff}
+
+    for theme, prev in old_themes.items():
+        if theme in current:
+            continue
+        for name, before in prev['sources'].items():
+            apply_contribution(totals, before['entries'], -1)
+        themes_diff[theme] = {
+            'status': 'removed',
+            'sources': {name: {'status': 'removed', 'from': before['path'], 'to': None,
+                               **diff_positions(_source_positions(before['entries']), {})}
+                        for name, before in prev['sources'].items()},
+            'ranking': diff_positions({t: v[0] for t, v in prev['ranking'].items()}, {},
+                                      {t: v[1] for t, v in prev['ranking'].items()}, {}),
+        }
+
+    if themes_diff:
+        global_diff = diff_positions(global_positions(old_totals), global_positions(totals),
+                                     {t: e[0] for t, e in old_totals.items()}, {t: e[0] for t, e in totals.items()})
+    else:
+        global_diff = {'added': [], 'removed': [], 'moved': []}
+    diff = {'from': old.get('built_at'), 'to': now, 'themes': dict(sorted(themes_diff.items())), 'global': global_diff}
+    new_state = {'version': STATE_VERSION, 'built_at': now, 'themes': themes_state, 'global': totals}
+    return diff, new_state
+
+
+def full_totals(state: Dict[str, object]) -> Totals:
+    """Global totals recomputed from every stored contribution (for checking the incremental ones)."""
+    totals: Totals = {}
+    for theme in state['themes'].values():  # type: ignore[union-attr]
+        for source in theme['sources'].values():
+            apply_contribution(totals, source['entries'], 1)
+    return totals
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Changelog of source, theme and global rank changes since the last run')
+    parser.add_argument('--root', default=str(script_root_list_dir()), help='Root folder containing lists (default: list)')
+    parser.add_argument('--out', help=f'Diff file (default: <root>/{CHANGELOG_DIR_NAME}/<timestamp>.json)')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Print the diff (or write it to --out only) and keep the stored state and index')
+    args = parser.parse_args()
+
+    root = Path(args.root)
+    if not root.is_dir():
+        print(f"Invalid root: {root}", file=sys.stderr)
+        sys.exit(1)
+
+    state = load_state(root)
+    start = time.perf_counter()
+    diff, new_state = compute_changes(root, state)
+    elapsed = time.perf_counter() - start
+    if not args.dry_run:
+        get_index(root).save()
+        save_state(root, new_state)
+    if state is None:
+        if args.dry_run:
+            print(f"No previous build to compare with; nothing recorded ({elapsed:.2f}s).")
+            return
+        print(f"Recorded the current build of {len(new_state['themes'])} themes as baseline "
+              f"in {elapsed:.2f}s; the next run reports changes against it.")
+        return
+
+    themes_diff: Dict[str, dict] = diff['themes']  # type: ignore[assignment]
+    global_diff: Dict[str, list] = diff['global']  # type: ignore[assignment]
+    if not themes_diff:
+        print(f"No changes since {diff['from']} ({elapsed:.2f}s).")
+        return
+    text = json.dumps(diff, ensure_ascii=False, indent=2) + '\n'
+    if args.dry_run and not args.out:
+        sys.stdout.write(text)
+        return
+    out_path = Path(args.out) if args.out else (
+        root / CHANGELOG_DIR_NAME / f"{time.strftime('%Y-%m-%d_%H-%M-%S', time.gmtime())}.json")
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    write_text_atomic(out_path, text)
+    for theme, t in themes_diff.items():
+        r = t['ranking']
+        print(f"{theme}: {t['status']}, {len(t['sources'])} sources changed, "
+              f"{len(r['added'])} added / {len(r['removed'])} removed / {len(r['moved'])} moved")
+    if not _is_empty(global_diff):
+        print(f"global: {len(global_diff['added'])} added / {len(global_diff['removed'])} removed / "
+              f"{len(global_diff['moved'])} moved")
+    print(f"Written: {out_path} ({elapsed:.2f}s)")
+
+
+if __name__ == '__main__':
+    main()
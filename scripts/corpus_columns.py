@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Compile every source CSV under `list/` into a single memory-mappable columnar
+file, and load it back as zero-copy NumPy views.
+
+All snapshots are included (not only the latest one per source); each
+snapshot is flagged `latest` when it is the CSV `rebuild_list.py` would pick.
+
+File layout (little-endian):
+- 8 bytes magic `OVGDCOL1`, 8 bytes header length, UTF-8 JSON header;
+- one raw array per column, each aligned to 64 bytes. The header maps each
+  column name to its dtype, byte offset and element count.
+
+Row columns (one element per source CSV row):
+- `position`, `score`, `game_id`, `external_id` (int64; -1 if blank, 0 for a
+  blank score; a value outside the int64 range reads as blank)
+- `title`, `cover`, `release_date` (int32 codes into string dictionaries)
+- `snapshot` (int32 index into the snapshot columns)
+
+Snapshot columns (one element per source CSV file):
+- `snapshot_theme`, `snapshot_source`, `snapshot_path` (int32 codes)
+- `snapshot_timestamp` (int64 epoch seconds from the filename, -1 if none)
+- `snapshot_start`, `snapshot_stop` (int64 row range), `snapshot_latest` (uint8)
+
+String dictionaries (`title`, `cover`, `release_date`, `theme`, `source`,
+`path`) are stored as concatenated UTF-8 bytes plus an int64 offsets array.
+
+The header also records the fingerprint (path, size, mtime, SHA-256) of
+every CSV compiled in, as `rebuild_all.py` does for its build cache;
+`corpus_is_current` compares them with the tree, so readers can rebuild the
+file after a new or edited snapshot instead of using old data.
+
+Usage examples:
+- Build the corpus file:        python scripts/corpus_columns.py build
+- Show a summary of the file:   python scripts/corpus_columns.py info
+"""
+
+from __future__ import annotations
+
+import argparse
+import calendar
+import csv
+import json
+import mmap
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from instrument import count
+from rebuild_all import fingerprint_sources, sources_key
+from rebuild_list import (
+    SourcePick,
+    get_index,
+    list_available_lists,
+    parse_timestamp_from_filename,
+    pick_sources_for_list,
+    script_root_list_dir,
+)
+
+
+MAGIC = b'OVGDCOL1'
+FORMAT_VERSION = 2
+ALIGN = 64
+CORPUS_FILE_NAME = '.corpus.col'
+DICTIONARIES = ('title', 'cover', 'release_date', 'theme', 'source', 'path')
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+def default_corpus_path() -> Path:
+    return script_root_list_dir() / CORPUS_FILE_NAME
+
+
+def to_int(value: Optional[str], default: int) -> int:
+    try:
+        number = int(float(value))  # type: ignore[arg-type]
+    except (TypeError, ValueError, OverflowError):
+        return default
+    if not INT64_MIN <= number <= INT64_MAX:
+        count('out_of_range_values')
+        return default
+    return number
+
+
+def timestamp_seconds(filename: str) -> int:
+    ts = parse_timestamp_from_filename(filename)
+    return calendar.timegm(ts + (0, 0, 0)) if ts else -1
+
+
+def iter_snapshots(list_dir: Path) -> Iterator[Tuple[str, Path]]:
+    # Every (source, csv) of a list, sorted by source then by snapshot time
+    for history in get_index(list_dir.parent).sources(list_dir):
+        for snapshot in history.snapshots:
+            yield history.name, snapshot.path
+
+
+class _Encoder:
+    """Assigns dense integer codes to strings in first-seen order."""
+
+    def __init__(self) -> None:
+        self.codes: Dict[str, int] = {}
+
+    def __call__(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.codes)
+        return code
+
+    def values(self) -> List[str]:
+        return list(self.codes)
+
+
+def corpus_sources(root: Path, previous: Optional[List[Dict[str, object]]] = None) -> List[Dict[str, object]]:
+    """Fingerprints of every snapshot CSV under `root`, reusing the hashes of
+    `previous` entries whose size and mtime are unchanged."""
+    picks = [SourcePick(source, csv_path) for list_dir in list_available_lists(root)
+             for source, csv_path in iter_snapshots(list_dir)]
+    return fingerprint_sources(root, picks, list(previous or []))
+
+
+def _encode_dictionary(values: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    encoded = [v.encode('utf-8') for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    if encoded:
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    return offsets, data
+
+
+def compile_corpus(root: Path) -> Dict[str, np.ndarray]:
+    enc = {name: _Encoder() for name in DICTIONARIES}
+    rows: Dict[str, List[int]] = {k: [] for k in
+                                  ('position', 'score', 'game_id', 'external_id', 'title', 'cover', 'release_date', 'snapshot')}
+    snaps: Dict[str, List[int]] = {k: [] for k in
+                                   ('theme', 'source', 'path', 'timestamp', 'start', 'stop', 'latest')}
+
+    for list_dir in list_available_lists(root):
+        latest = {p.csv_path for p in pick_sources_for_list(list_dir)}
+        theme_code = enc['theme'](list_dir.name)
+        for source, csv_path in iter_snapshots(list_dir):
+            snap_id = len(snaps['theme'])
+            start = len(rows['snapshot'])
+            with csv_path.open('r', encoding='utf-8', newline='') as f:
+                for r in csv.DictReader(f):
+                    rows['position'].append(to_int(r.get('Position'), -1))
+                    rows['score'].append(to_int(r.get('Score'), 0))
+                    rows['game_id'].append(to_int(r.get('GameId'), -1))
+                    rows['external_id'].append(to_int(r.get('ExternalId'), -1))
+                    rows['title'].append(enc['title']((r.get('Title') or '').strip()))
+                    rows['cover'].append(enc['cover']((r.get('CoverImageId') or '').strip()))
+                    rows['release_date'].append(enc['release_date']((r.get('ReleaseDate') or '').strip()))
+                    rows['snapshot'].append(snap_id)
+            snaps['theme'].append(theme_code)
+            snaps['source'].append(enc['source'](source))
+            snaps['path'].append(enc['path'](csv_path.relative_to(root).as_posix()))
+            snaps['timestamp'].append(timestamp_seconds(csv_path.name))
+            snaps['start'].append(start)
+            snaps['stop'].append(len(rows['snapshot']))
+            snaps['latest'].append(1 if csv_path in latest else 0)
+
+    columns: Dict[str, np.ndarray] = {
+        'position': np.asarray(rows['position'], dtype=np.int64),
+        'score': np.asarray(rows['score'], dtype=np.int64),
+        'game_id': np.asarray(rows['game_id'], dtype=np.int64),
+        'external_id': np.asarray(rows['external_id'], dtype=np.int64),
+        'title': np.asarray(rows['title'], dtype=np.int32),
+        'cover': np.asarray(rows['cover'], dtype=np.int32),
+        'release_date': np.asarray(rows['release_date'], dtype=np.int32),
+        'snapshot': np.asarray(rows['snapshot'], dtype=np.int32),
+        'snapshot_theme': np.asarray(snaps['theme'], dtype=np.int32),
+        'snapshot_source': np.asarray(snaps['source'], dtype=np.int32),
+        'snapshot_path': np.asarray(snaps['path'], dtype=np.int32),
+        'snapshot_timestamp': np.asarray(snaps['timestamp'], dtype=np.int64),
+        'snapshot_start': np.asarray(snaps['start'], dtype=np.int64),
+        'snapshot_stop': np.asarray(snaps['stop'], dtype=np.int64),
+        'snapshot_latest': np.asarray(snaps['latest'], dtype=np.uint8),
+    }
+    for name in DICTIONARIES:
+        offsets, data = _encode_dictionary(enc[name].values())
+        columns[f'dict_{name}_offsets'] = offsets
+        columns[f'dict_{name}_data'] = data
+    return columns
+
+
+def write_columns(path: Path, columns: Dict[str, np.ndarray],
+                  sources: Optional[List[Dict[str, object]]] = None) -> Path:
+    # Offsets are relative to the end of the (padded) header
+    layout: Dict[str, Dict[str, object]] = {}
+    offset = 0
+    for name, arr in columns.items():
+        layout[name] = {'dtype': arr.dtype.str, 'offset': offset, 'count': int(arr.size)}
+        offset += -(-arr.nbytes // ALIGN) * ALIGN
+    header = json.dumps({'version': FORMAT_VERSION, 'columns': layout, 'sources': sources or []},
+                        ensure_ascii=False).encode('utf-8')
+    prefix = len(MAGIC) + 8 + len(header)
+    pad = -prefix % ALIGN
+
+    tmp = path.with_name(path.name + '.tmp')
+    with tmp.open('wb') as f:
+        f.write(MAGIC)
+        f.write((len(header) + pad).to_bytes(8, 'little'))
+        f.write(header + b' ' * pad)
+        for arr in columns.values():
+            data = np.ascontiguousarray(arr).astype(arr.dtype.newbyteorder('<'), copy=False).tobytes()
+            f.write(data)
+            f.write(b'\0' * (-len(data) % ALIGN))
+    tmp.replace(path)
+    return path
+
+
+def build_corpus(root: Optional[Path] = None, out_path: Optional[Path] = None) -> Path:
+    root = root or script_root_list_dir()
+    out_path = out_path or root / CORPUS_FILE_NAME
+    # Fingerprinted before reading, so a CSV changed meanwhile shows as stale
+    try:
+        previous = read_header(out_path).get('sources')
+    except (OSError, ValueError):
+        previous = None
+    sources = corpus_sources(root, previous if isinstance(previous, list) else None)
+    return write_columns(out_path, compile_corpus(root), sources)
+
+
+def read_header(path: Path) -> Dict[str, object]:
+    """The JSON header of a corpus file, without mapping the columns."""
+    with path.open('rb') as f:
+        prefix = f.read(16)
+        if prefix[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"Not a corpus file: {path}")
+        return json.loads(f.read(int.from_bytes(prefix[8:16], 'little')).decode('utf-8'))
+
+
+def corpus_is_current(root: Path, path: Path) -> bool:
+    """True when `path` exists and was compiled from the CSVs now under `root`."""
+    try:
+        header = read_header(path)
+    except (OSError, ValueError):
+        return False
+    recorded = header.get('sources')
+    if header.get('version') != FORMAT_VERSION or not isinstance(recorded, list) or not recorded:
+        return False
+    return sources_key(corpus_sources(root, recorded)) == sources_key(recorded)
+
+
+class StringDictionary:
+    """Read-only view over a dictionary-encoded string column."""
+
+    def __init__(self, offsets: np.ndarray, data: np.ndarray) -> None:
+        self.offsets = offsets
+        self.data = data
+        self._index: Optional[Dict[str, int]] = None
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, code: int) -> str:
+        start, stop = self.offsets[code], self.offsets[code + 1]
+        return self.data[start:stop].tobytes().decode('utf-8')
+
+    def to_list(self) -> List[str]:
+        raw = self.data.tobytes()
+        bounds = self.offsets.tolist()
+        return [raw[bounds[i]:bounds[i + 1]].decode('utf-8') for i in range(len(self))]
+
+    def code(self, value: str) -> int:
+        # Returns -1 when the string is not part of the dictionary
+        if self._index is None:
+            self._index = {v: i for i, v in enumerate(self.to_list())}
+        return self._index.get(value, -1)
+
+
+@dataclass
+class Corpus:
+    columns: Dict[str, np.ndarray]
+    dictionaries: Dict[str, StringDictionary]
+    _mmap: Optional[mmap.mmap] = None
+
+    def __getattr__(self, name: str) -> np.ndarray:
+        columns = self.__dict__.get('columns') or {}
+        if name in columns:
+            return columns[name]
+        raise AttributeError(name)
+
+    @property
+    def row_count(self) -> int:
+        return int(self.columns['snapshot'].size)
+
+    @property
+    def snapshot_count(self) -> int:
+        return int(self.columns['snapshot_theme'].size)
+
+    def snapshot_rows(self, snapshot_id: int) -> slice:
+        return slice(int(self.columns['snapshot_start'][snapshot_id]), int(self.columns['snapshot_stop'][snapshot_id]))
+
+    def latest_row_mask(self) -> np.ndarray:
+        return self.columns['snapshot_latest'][self.columns['snapshot']].astype(bool)
+
+
+def load_corpus(path: Optional[Path] = None) -> Corpus:
+    path = path or default_corpus_path()
+    with path.open('rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if mm[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"Not a corpus file: {path}")
+    header_len = int.from_bytes(mm[8:16], 'little')
+    header = json.loads(bytes(mm[16:16 + header_len]).decode('utf-8'))
+    if header.get('version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported corpus version in {path}: {header.get('version')}")
+    base = 16 + header_len
+    columns: Dict[str, np.ndarray] = {}
+    for name, spec in header['columns'].items():
+        columns[name] = np.frombuffer(mm, dtype=np.dtype(spec['dtype']), count=spec['count'],
+                                      offset=base + spec['offset'])
+    dictionaries = {name: StringDictionary(columns.pop(f'dict_{name}_offsets'), columns.pop(f'dict_{name}_data'))
+                    for name in DICTIONARIES}
+    return Corpus(columns=columns, dictionaries=dictionaries, _mmap=mm)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Build or inspect the columnar corpus file')
+    parser.add_argument('command', choices=['build', 'info'])
+    parser.add_argument('--root', default=str(script_root_list_dir()), help='Root folder containing lists (default: list)')
+    parser.add_argument('--out', help=f'Corpus file (default: <root>/{CORPUS_FILE_NAME})')
+    args = parser.parse_args()
+
+    root = Path(args.root)
+    out_path = Path(args.out) if args.out else root / CORPUS_FILE_NAME
+    if args.command == 'build':
+        if not root.is_dir():
+            print(f"Invalid root: {root}", file=sys.stderr)
+            sys.exit(1)
+        start = time.perf_counter()
+        build_corpus(root, out_path)
+        print(f"Written: {out_path} ({out_path.stat().st_size} bytes) in {time.perf_counter() - start:.2f}s")
+        return
+
+    start = time.perf_counter()
+    corpus = load_corpus(out_path)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"Loaded {out_path} in {elapsed:.2f} ms")
+    print(f"Rows: {corpus.row_count}, snapshots: {corpus.snapshot_count}, "
+          f"latest snapshots: {int(corpus.snapshot_latest.sum())}")
+    for name, d in corpus.dictionaries.items():
+        print(f"Dictionary {name}: {len(d)} values")
+
+
+if __name__ == '__main__':
+    main()
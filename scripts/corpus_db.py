@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""
+Indexed SQLite database of the whole corpus, with a small query API.
+
+The build step loads every source CSV (all snapshots, not only the latest
+one), every `about.csv` and the root `all_sources.csv` into one SQLite file,
+so questions such as "which themes rank game X, and where" or "top 20 across
+all PlayStation lists" become indexed queries instead of a full CSV parse.
+
+Tables:
+- `snapshots`: one row per source CSV (theme, source, path, file, taken_at,
+  latest). `latest` flags the CSV `rebuild_list.py` would pick.
+- `entries`: one row per source CSV row (snapshot_id, position, title,
+  release_date, release_year, external_id, score, game_id, cover). Scores are
+  normalized like `aggregate_rows` does; blank ids are NULL.
+- `about`: the `about.csv` rows of every theme.
+- `source_datasets`: `all_sources.csv`, one row per (source, dataset).
+
+Indexes cover GameId, title (case-insensitive), theme, source and snapshot
+date. The file is built next to the lists and swapped in atomically.
+
+The `meta` table also records the fingerprint (path, size, mtime, SHA-256) of
+every file loaded, as `rebuild_all.py` does for its build cache;
+`db_is_current` compares them with the tree, so a service can rebuild the
+database after a new snapshot or an edited `about.csv`.
+
+Usage examples:
+- Build the database (list/.corpus.sqlite):  python scripts/corpus_db.py build
+- Where is a game ranked:                    python scripts/corpus_db.py game --title "Hades"
+- Same, by GameId:                           python scripts/corpus_db.py game --id 113112
+- Top 20 across all PlayStation lists:       python scripts/corpus_db.py top --theme-like playstation
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from rebuild_all import fingerprint_sources, sources_key
+from rebuild_list import (
+    SourcePick,
+    get_index,
+    list_available_lists,
+    parse_timestamp_from_filename,
+    script_root_list_dir,
+)
+
+
+DB_FILE_NAME = '.corpus.sqlite'
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE snapshots (
+    id INTEGER PRIMARY KEY,
+    theme TEXT NOT NULL,
+    source TEXT NOT NULL,
+    path TEXT NOT NULL,
+    file TEXT NOT NULL,
+    taken_at TEXT,
+    latest INTEGER NOT NULL
+);
+CREATE TABLE entries (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id),
+    position INTEGER,
+    title TEXT NOT NULL,
+    release_date TEXT NOT NULL,
+    release_year TEXT NOT NULL,
+    external_id INTEGER,
+    score INTEGER NOT NULL,
+    game_id INTEGER,
+    cover TEXT NOT NULL
+);
+CREATE TABLE about (
+    theme TEXT NOT NULL,
+    source_name TEXT NOT NULL,
+    source_url TEXT NOT NULL,
+    source_id TEXT NOT NULL,
+    csv_path TEXT NOT NULL
+);
+CREATE TABLE source_datasets (
+    source_name TEXT NOT NULL,
+    dataset TEXT NOT NULL,
+    count INTEGER NOT NULL
+);
+"""
+
+# Created after the bulk insert, which is faster than maintaining them row by row
+INDEXES = """
+CREATE INDEX entries_game_id ON entries(game_id);
+CREATE INDEX entries_title ON entries(title COLLATE NOCASE);
+CREATE INDEX entries_snapshot ON entries(snapshot_id, position);
+CREATE INDEX snapshots_theme ON snapshots(theme, source, taken_at);
+CREATE INDEX snapshots_source ON snapshots(source COLLATE NOCASE, taken_at);
+CREATE INDEX snapshots_taken_at ON snapshots(taken_at);
+CREATE INDEX snapshots_latest ON snapshots(latest, theme);
+CREATE INDEX about_theme ON about(theme);
+CREATE INDEX about_source ON about(source_name COLLATE NOCASE);
+CREATE INDEX source_datasets_source ON source_datasets(source_name COLLATE NOCASE);
+CREATE INDEX source_datasets_dataset ON source_datasets(dataset);
+"""
+
+
+def default_db_path() -> Path:
+    return script_root_list_dir() / DB_FILE_NAME
+
+
+def to_int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(float(value))  # type: ignore[arg-type]
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def db_sources(root: Path, previous: Optional[List[Dict[str, object]]] = None) -> List[Dict[str, object]]:
+    """Fingerprints of every file `build_db` loads, relative to `root.parent`,
+    reusing the hashes of `previous` entries whose size and mtime are unchanged."""
+    index = get_index(root)
+    picks: List[SourcePick] = []
+    for list_dir in list_available_lists(root):
+        for history in index.sources(list_dir):
+            picks.extend(SourcePick(history.name, snapshot.path) for snapshot in history.snapshots)
+        if (list_dir / 'about.csv').exists():
+            picks.append(SourcePick('about.csv', list_dir / 'about.csv'))
+    if (root.parent / 'all_sources.csv').exists():
+        picks.append(SourcePick('all_sources.csv', root.parent / 'all_sources.csv'))
+    return fingerprint_sources(root.parent, picks, list(previous or []))
+
+
+def _recorded_sources(path: Path) -> Optional[List[Dict[str, object]]]:
+    try:
+        conn = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True)
+    except sqlite3.Error:
+        return None
+    try:
+        rows = dict(conn.execute("SELECT key, value FROM meta WHERE key IN ('schema_version', 'sources')"))
+    except sqlite3.Error:
+        return None
+    finally:
+        conn.close()
+    if rows.get('schema_version') != str(SCHEMA_VERSION):
+        return None
+    try:
+        sources = json.loads(rows.get('sources') or 'null')
+    except ValueError:
+        return None
+    return sources if isinstance(sources, list) else None
+
+
+def db_is_current(root: Path, path: Path) -> bool:
+    """True when `path` exists and was built from the files now under `root`."""
+    if not path.exists():
+        return False
+    recorded = _recorded_sources(path)
+    if not recorded:
+        return False
+    return sources_key(db_sources(root, recorded)) == sources_key(recorded)
+
+
+def snapshot_date(filename: str) -> Optional[str]:
+    # ISO 8601 so that text ordering is chronological
+    ts = parse_timestamp_from_filename(filename)
+    if not ts:
+        return None
+    return '%04d-%02d-%02dT%02d:%02d:%02d' % ts
+
+
+def _read_csv(path: Path) -> List[Dict[str, str]]:
+    with path.open('r', encoding='utf-8', newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def _entry_values(snapshot_id: int, rows: Iterable[Dict[str, str]]) -> Iterator[Tuple]:
+    for r in rows:
+        date = (r.get('ReleaseDate') or '').strip()
+        yield (snapshot_id,
+               to_int(r.get('Position')),
+               (r.get('Title') or '').strip(),
+               date,
+               date.split('-')[0].strip(),
+               to_int(r.get('ExternalId')),
+               to_int(r.get('Score', '0')) or 0,
+               to_int(r.get('GameId')),
+               (r.get('CoverImageId') or '').strip())
+
+
+def load_lists(conn: sqlite3.Connection, root: Path) -> None:
+    index = get_index(root)
+    snapshot_id = 0
+    for list_dir in list_available_lists(root):
+        theme = list_dir.name
+        for history in index.sources(list_dir):
+            for snapshot in history.snapshots:
+                snapshot_id += 1
+                path = snapshot.path
+                conn.execute('INSERT INTO snapshots VALUES (?, ?, ?, ?, ?, ?, ?)',
+                             (snapshot_id, theme, history.name, path.relative_to(root).as_posix(), path.name,
+                              snapshot_date(path.name), 1 if snapshot is history.latest else 0))
+                conn.executemany('INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                 _entry_values(snapshot_id, _read_csv(path)))
+
+        about_path = list_dir / 'about.csv'
+        if about_path.exists():
+            conn.executemany('INSERT INTO about VALUES (?, ?, ?, ?, ?)', (
+                (theme, (r.get('SourceName') or '').strip(), (r.get('SourceURL') or '').strip(),
+                 (r.get('SourceId') or '').strip(), (r.get('GeneratedCsvPath') or '').strip())
+                for r in _read_csv(about_path)))
+
+
+def load_all_sources(conn: sqlite3.Connection, path: Path) -> None:
+    if not path.exists():
+        return
+    for r in _read_csv(path):
+        name = (r.get('SourceName') or '').strip()
+        count = to_int(r.get('Count')) or 0
+        conn.executemany('INSERT INTO source_datasets VALUES (?, ?, ?)',
+                         ((name, d, count) for d in (r.get('Datasets') or '').split(';') if d))
+
+
+def build_db(root: Optional[Path] = None, out_path: Optional[Path] = None) -> Path:
+    root = root or script_root_list_dir()
+    out_path = out_path or root / DB_FILE_NAME
+    tmp = out_path.with_name(out_path.name + '.tmp')
+    if tmp.exists():
+        tmp.unlink()
+    # Fingerprinted before reading, so a file changed meanwhile shows as stale
+    sources = db_sources(root, _recorded_sources(out_path) if out_path.exists() else None)
+    conn = sqlite3.connect(tmp)
+    try:
+        # The file only becomes visible once complete, so no journal is needed
+        conn.execute('PRAGMA journal_mode = OFF')
+        conn.execute('PRAGMA synchronous = OFF')
+        conn.executescript(SCHEMA)
+        with conn:
+            load_lists(conn, root)
+            load_all_sources(conn, root.parent / 'all_sources.csv')
+            conn.executemany('INSERT INTO meta VALUES (?, ?)', [
+                ('schema_version', str(SCHEMA_VERSION)),
+                ('built_at', time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime())),
+                ('sources', json.dumps(sources, ensure_ascii=False)),
+            ])
+        conn.executescript(INDEXES)
+        conn.execute('ANALYZE')
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp, out_path)
+    return out_path
+
+
+class CorpusDB:
+    """Read-only query API over a database written by `build_db`."""
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.path = path or default_db_path()
+        if not self.path.exists():
+            raise FileNotFoundError(f"Corpus database not found: {self.path} (run corpus_db.py build)")
+        self.conn = sqlite3.connect(f"{self.path.resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        version = self.conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+        if version is None or int(version[0]) != SCHEMA_VERSION:
+            raise ValueError(f"Unsupported corpus database version in {self.path}")
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> 'CorpusDB':
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def query(self, sql: str, params: Sequence[object] = ()) -> List[Dict[str, object]]:
+        return [dict(r) for r in self.conn.execute(sql, params)]
+
+    def themes(self) -> List[str]:
+        return [r[0] for r in self.conn.execute('SELECT DISTINCT theme FROM snapshots ORDER BY theme')]
+
+    def game_rankings(self, game_id: Optional[int] = None, title: Optional[str] = None,
+                      latest_only: bool = True) -> List[Dict[str, object]]:
+        """Every (theme, source) that ranks a game, by GameId or exact title (case-insensitive)."""
+        if (game_id is None) == (title is None):
+            raise ValueError('Pass exactly one of game_id or title')
+        where = 'e.game_id = ?' if game_id is not None else 'e.title = ? COLLATE NOCASE'
+        if latest_only:
+            where += ' AND s.latest = 1'
+        return self.query(
+            'SELECT s.theme, s.source, s.taken_at, e.position, e.score, e.title, e.release_year, e.game_id '
+            'FROM entries e JOIN snapshots s ON s.id = e.snapshot_id '
+            f'WHERE {where} ORDER BY s.theme, s.source, s.taken_at',
+            (game_id if game_id is not None else title.strip(),))  # type: ignore[union-attr]
+
+    def top_games(self, limit: int = 20, themes: Optional[Iterable[str]] = None,
+                  theme_like: Optional[str] = None, source: Optional[str] = None) -> List[Dict[str, object]]:
+        """Aggregated ranking over the latest snapshots of the selected themes.
+
+        Same rules as `aggregate_rows`: rows are grouped by title, the release
+        year comes from the first row seen, ListsAppeared counts distinct
+        source files, and ties keep first-seen order.
+        """
+        where = ['s.latest = 1']
+        params: List[object] = []
+        if themes is not None:
+            themes = list(themes)
+            where.append(f"s.theme IN ({', '.join('?' * len(themes))})")
+            params.extend(themes)
+        if theme_like:
+            where.append('s.theme LIKE ?')
+            params.append(f'%{theme_like}%')
+        if source:
+            where.append('s.source = ? COLLATE NOCASE')
+            params.append(source)
+        params.append(limit)
+        rows = self.query(
+            # With a single MIN() the bare release_year comes from the first row
+            'SELECT e.title, e.release_year, MIN(e.rowid) AS first_seen, '
+            'SUM(e.score) AS TotalScore, COUNT(DISTINCT s.file) AS ListsAppeared '
+            'FROM entries e JOIN snapshots s ON s.id = e.snapshot_id '
+            f"WHERE {' AND '.join(where)} AND e.title != '' "
+            'GROUP BY e.title ORDER BY TotalScore DESC, first_seen LIMIT ?', params)
+        out: List[Dict[str, object]] = []
+        for i, r in enumerate(rows, start=1):
+            year = r['release_year']
+            out.append({'Position': i, 'Title': f"{r['title']} ({year})" if year else r['title'],
+                        'TotalScore': r['TotalScore'], 'ListsAppeared': r['ListsAppeared']})
+        return out
+
+    def theme_sources(self, theme: str) -> List[Dict[str, object]]:
+        return self.query('SELECT source_name, source_url, source_id, csv_path FROM about '
+                          'WHERE theme = ? ORDER BY source_name COLLATE NOCASE', (theme,))
+
+    def source_datasets(self, source_name: str) -> List[str]:
+        return [r[0] for r in self.conn.execute(
+            'SELECT dataset FROM source_datasets WHERE source_name = ? COLLATE NOCASE ORDER BY dataset',
+            (source_name,))]
+
+    def snapshots(self, theme: Optional[str] = None, source: Optional[str] = None,
+                  since: Optional[str] = None, until: Optional[str] = None) -> List[Dict[str, object]]:
+        """Snapshot history, optionally filtered; dates are ISO strings ('2024-03-29' works)."""
+        where: List[str] = ['1']
+        params: List[object] = []
+        if theme is not None:
+            where.append('theme = ?')
+            params.append(theme)
+        if source is not None:
+            where.append('source = ? COLLATE NOCASE')
+            params.append(source)
+        if since is not None:
+            where.append('taken_at >= ?')
+            params.append(since)
+        if until is not None:
+            where.append('taken_at < ?')
+            params.append(until)
+        return self.query('SELECT id, theme, source, path, taken_at, latest FROM snapshots '
+                          f"WHERE {' AND '.join(where)} ORDER BY theme, source, taken_at", params)
+
+    def snapshot_entries(self, snapshot_id: int) -> List[Dict[str, object]]:
+        return self.query('SELECT position, title, release_date, score, game_id, external_id, cover '
+                          'FROM entries WHERE snapshot_id = ? ORDER BY position', (snapshot_id,))
+
+
+def _print_rows(rows: List[Dict[str, object]]) -> None:
+    if not rows:
+        print('(no rows)')
+        return
+    writer = csv.DictWriter(sys.stdout, fieldnames=list(rows[0]), lineterminator='\n')
+    writer.writeheader()
+    writer.writerows(rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Build or query the corpus database')
+    sub = parser.add_subparsers(dest='command', required=True)
+    parser.add_argument('--root', default=str(script_root_list_dir()), help='Root folder containing lists (default: list)')
+    parser.add_argument('--db', help=f'Database file (default: <root>/{DB_FILE_NAME})')
+    sub.add_parser('build', help='Load every CSV into the database')
+    game = sub.add_parser('game', help='Themes and positions of one game')
+    game.add_argument('--id', type=int, help='GameId')
+    game.add_argument('--title', help='Exact title (case-insensitive)')
+    game.add_argument('--all-snapshots', action='store_true', help='Include older snapshots')
+    top = sub.add_parser('top', help='Aggregated ranking over some themes')
+    top.add_argument('--theme', action='append', help='Theme folder name (repeatable)')
+    top.add_argument('--theme-like', help='Substring of the theme folder name')
+    top.add_argument('--source', help='Only this source')
+    top.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    root = Path(args.root)
+    db_path = Path(args.db) if args.db else root / DB_FILE_NAME
+    if args.command == 'build':
+        if not root.is_dir():
+            print(f"Invalid root: {root}", file=sys.stderr)
+            sys.exit(1)
+        start = time.perf_counter()
+        build_db(root, db_path)
+        print(f"Written: {db_path} ({db_path.stat().st_size} bytes) in {time.perf_counter() - start:.2f}s")
+        return
+
+    with CorpusDB(db_path) as db:
+        start = time.perf_counter()
+        if args.command == 'game':
+            if (args.id is None) == (args.title is None):
+                parser.error('game needs exactly one of --id or --title')
+            rows = db.game_rankings(game_id=args.id, title=args.title, latest_only=not args.all_snapshots)
+        else:
+            rows = db.top_games(args.limit, themes=args.theme, theme_like=args.theme_like, source=args.source)
+        elapsed = (time.perf_counter() - start) * 1000
+    _print_rows(rows)
+    print(f"{len(rows)} rows in {elapsed:.2f} ms", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
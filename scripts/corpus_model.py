@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Compact in-memory model of the latest source rows of every list.
+
+`read_picks_rows` returns one `dict` per CSV row, each holding its own copies
+of the title, release date, ids and source file name. `Corpus` instead keeps
+one `array` column per CSV field: `Position` and `Score` as 64-bit ints,
+`GameId` and `ExternalId` as 64-bit ints when they are plain numbers, every other
+string as a code into one interned string table (a title listed by 30 sources
+is stored once), and the source file as an integer id into `Corpus.sources`.
+Themes are row ranges.
+
+`SourceRow` is a two-slot view on one row that reads like the dict it
+replaces (`row['Title']`, `row.get('SourceFile')`, `{**row}`), so
+`rebuild_list.aggregate_rows`, `generate_all_aggregates.partial_aggregate`,
+`title_match.resolve_rows` and the other row consumers run on
+`corpus.theme_rows(theme)` unchanged and give the same outputs. `Position` and
+`Score` read as ints; a score that is not a number reads as 0, as
+`aggregate_rows` already counts it, and so does one beyond the 64-bit range
+(counted as `out_of_range_values`).
+
+On the current corpus the model takes about a fifth of the memory of the
+dict rows; `python scripts/corpus_model.py` measures both with tracemalloc
+and checks that every list aggregates identically.
+
+Usage examples:
+- Compare memory and outputs:   python scripts/corpus_model.py
+- Custom lists root:            python scripts/corpus_model.py --root list
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import operator
+import sys
+import time
+import tracemalloc
+from array import array
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from instrument import count, stage
+from rebuild_list import (
+    SourcePick,
+    aggregate_rows,
+    list_available_lists,
+    pick_sources_for_list,
+    read_picks_rows,
+    script_root_list_dir,
+)
+
+
+# CSV column -> Corpus column; the string columns hold codes into Corpus.strings
+FIELDS = {
+    'Position': 'position',
+    'Title': 'title',
+    'ReleaseDate': 'release_date',
+    'ExternalId': 'external_id',
+    'Score': 'score',
+    'GameId': 'game_id',
+    'CoverImageId': 'cover',
+}
+INT_COLUMNS = ('position', 'score')
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+ID_COLUMNS = ('external_id', 'game_id')
+STRING_COLUMNS = ('title', 'release_date', 'cover')
+
+
+def to_int(value: Optional[str]) -> int:
+    try:
+        number = int(float(value))  # type: ignore[arg-type]
+    except (TypeError, ValueError, OverflowError):
+        return 0
+    if not INT64_MIN <= number <= INT64_MAX:
+        count('out_of_range_values')
+        return 0
+    return number
+
+
+class SourceRef:
+    """One source CSV of one theme; `id` is its index in `Corpus.sources`."""
+
+    __slots__ = ('id', 'theme', 'name', 'file')
+
+    def __init__(self, id: int, theme: str, name: str, file: str) -> None:
+        self.id = id
+        self.theme = theme
+        self.name = name
+        self.file = file
+
+    def __repr__(self) -> str:
+        return f"SourceRef({self.id}, {self.theme!r}, {self.name!r}, {self.file!r})"
+
+
+class SourceRow:
+    """Row `index` of a corpus, readable as a mapping of the CSV columns."""
+
+    __slots__ = ('corpus', 'index')
+
+    def __init__(self, corpus: 'Corpus', index: int) -> None:
+        self.corpus = corpus
+        self.index = index
+
+    def value(self, column: str) -> object:
+        corpus = self.corpus
+        code = corpus.columns[column][self.index]
+        if column in INT_COLUMNS:
+            return code
+        if column in ID_COLUMNS:
+            return str(code) if code >= 0 else corpus.strings[-code - 1]
+        return corpus.strings[code]
+
+    @property
+    def source(self) -> SourceRef:
+        return self.corpus.sources[self.corpus.columns['source'][self.index]]
+
+    def __getitem__(self, key: str) -> object:
+        if key == 'SourceFile':
+            return self.source.file
+        try:
+            return self.value(FIELDS[key])
+        except KeyError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default: object = None) -> object:
+        if key == 'SourceFile':
+            return self.source.file
+        column = FIELDS.get(key)
+        return default if column is None else self.value(column)
+
+    def keys(self) -> List[str]:
+        return [*FIELDS, 'SourceFile']
+
+    def __contains__(self, key: object) -> bool:
+        return key in FIELDS or key == 'SourceFile'
+
+    def __repr__(self) -> str:
+        return f"SourceRow({self.get('Position')}, {self.get('Title')!r}, {self.get('Score')}, {self.source.file!r})"
+
+
+class Corpus:
+    def __init__(self) -> None:
+        self.strings: List[str] = ['']
+        self._codes: Optional[Dict[str, int]] = {'': 0}
+        self.columns: Dict[str, array] = {name: array('q' if name in INT_COLUMNS or name in ID_COLUMNS else 'i')
+                                          for name in (*FIELDS.values(), 'source')}
+        self.sources: List[SourceRef] = []
+        # theme -> (first row, end row)
+        self.themes: Dict[str, Tuple[int, int]] = {}
+
+    def code(self, value: Optional[str]) -> int:
+        codes = self._codes
+        if codes is None:
+            codes = self._codes = {s: i for i, s in enumerate(self.strings)}
+        if value is None:
+            return 0
+        c = codes.get(value)
+        if c is None:
+            c = codes[value] = len(self.strings)
+            self.strings.append(value)
+        return c
+
+    def id_code(self, value: Optional[str]) -> int:
+        # Plain numbers as themselves, anything else as -(string code) - 1
+        if value and value.isascii() and value.isdigit() and (value[0] != '0' or value == '0') and len(value) < 19:
+            return int(value)
+        return -self.code(value) - 1
+
+    def freeze(self) -> None:
+        """Drop the string -> code table; it is rebuilt if more rows are added."""
+        self._codes = None
+
+    def add_source(self, theme: str, name: str, file: str) -> SourceRef:
+        strings = self.strings
+        ref = SourceRef(len(self.sources), strings[self.code(theme)], strings[self.code(name)],
+                        strings[self.code(file)])
+        self.sources.append(ref)
+        return ref
+
+    def read_csv(self, path: Path, source: SourceRef) -> int:
+        # Same rows as csv.DictReader: blank lines skipped, missing cells blank
+        code = self.code
+        if self._codes is None:
+            code('')
+        codes = self._codes
+        id_code = self.id_code
+        cols = self.columns
+        position, score, src = cols['position'], cols['score'], cols['source']
+        title_col, date_col, cover_col = (cols[name] for name in STRING_COLUMNS)
+        ext_col, gid_col = (cols[name] for name in ID_COLUMNS)
+        n = 0
+        with path.open('r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                return 0
+            # Missing columns read the padding cell (None) after the last one
+            width = len(header) + 1
+            index = {name: i for i, name in reversed(list(enumerate(header)))}
+            take = operator.itemgetter(*(index.get(name, width - 1) for name in FIELDS))
+            for cells in reader:
+                if not cells:
+                    continue
+                cells.append(None)
+                if len(cells) != width:
+                    cells = (cells[:-1] + [None] * width)[:width - 1] + [None]
+                pos, title, date, ext, raw, gid, cover = take(cells)
+                position.append(int(pos) if pos and pos.isdecimal() and len(pos) < 19 else to_int(pos))
+                if raw and raw.isdecimal() and len(raw) < 19:
+                    score.append(int(raw))
+                else:
+                    value = to_int(raw)
+                    if value == 0 and raw is not None:
+                        try:
+                            float(raw)
+                        except ValueError:
+                            count('invalid_scores')
+                    score.append(value)
+                c = codes.get(title)
+                title_col.append(code(title) if c is None else c)
+                c = codes.get(date)
+                date_col.append(code(date) if c is None else c)
+                c = codes.get(cover)
+                cover_col.append(code(cover) if c is None else c)
+                ext_col.append(id_code(ext))
+                gid_col.append(id_code(gid))
+                src.append(source.id)
+                n += 1
+        return n
+
+    def read_picks(self, theme: str, picks: List[SourcePick]) -> Tuple[int, int]:
+        """Append the chosen sources of one theme, in `read_picks_rows` order."""
+        first = len(self)
+        for p in picks:
+            with stage('read'):
+                source = self.add_source(theme, p.name, p.csv_path.name)
+                n = self.read_csv(p.csv_path, source)
+            count('files_read')
+            count('rows_parsed', n)
+        self.themes[self.strings[self.code(theme)]] = span = (first, len(self))
+        return span
+
+    def theme_rows(self, theme: str) -> Iterator[SourceRow]:
+        first, end = self.themes[theme]
+        for i in range(first, end):
+            yield SourceRow(self, i)
+
+    def rows(self) -> Iterator[SourceRow]:
+        for i in range(len(self)):
+            yield SourceRow(self, i)
+
+    def __len__(self) -> int:
+        return len(self.columns['source'])
+
+    def nbytes(self) -> int:
+        """Bytes held by the columns (the string table not included)."""
+        return sum(c.itemsize * len(c) for c in self.columns.values())
+
+
+def load_corpus(root: Optional[Path] = None) -> Corpus:
+    """The latest CSV of every source of every list under `root`."""
+    corpus = Corpus()
+    for list_dir in list_available_lists(root or script_root_list_dir()):
+        corpus.read_picks(list_dir.name, pick_sources_for_list(list_dir))
+    corpus.freeze()
+    return corpus
+
+
+def _measure(load):
+    # Timed without tracemalloc, which slows allocations down
+    start = time.perf_counter()
+    load()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    result = load()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size, seconds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Compare the compact corpus model with dict rows')
+    parser.add_argument('--root', default=str(script_root_list_dir()), help='Root folder containing lists (default: list)')
+    args = parser.parse_args()
+
+    root = Path(args.root)
+    if not root.exists() or not root.is_dir():
+        print(f"Invalid root: {root}", file=sys.stderr)
+        sys.exit(1)
+
+    lists = list_available_lists(root)
+    picks = {d.name: pick_sources_for_list(d) for d in lists}
+    dict_rows, dict_bytes, dict_seconds = _measure(lambda: {t: read_picks_rows(p) for t, p in picks.items()})
+    corpus, corpus_bytes, corpus_seconds = _measure(lambda: _load_picks(picks))
+
+    rows = sum(len(r) for r in dict_rows.values())
+    print(f"{len(lists)} lists, {rows} rows, {len(corpus.strings)} distinct strings")
+    print(f"  dict rows:     {dict_bytes / 1e6:8.2f} MB  {dict_bytes / max(rows, 1):7.0f} B/row  "
+          f"{dict_seconds * 1000:7.1f} ms")
+    print(f"  compact rows:  {corpus_bytes / 1e6:8.2f} MB  {corpus_bytes / max(rows, 1):7.0f} B/row  "
+          f"{corpus_seconds * 1000:7.1f} ms  ({dict_bytes / max(corpus_bytes, 1):.1f}x smaller)")
+    mismatched = [t for t in picks if aggregate_rows(dict_rows[t]) != aggregate_rows(corpus.theme_rows(t))]
+    print(f"Aggregated lists identical: {len(picks) - len(mismatched)}/{len(picks)}"
+          + (f" (differ: {', '.join(mismatched)})" if mismatched else ''))
+
+
+def _load_picks(picks: Dict[str, List[SourcePick]]) -> Corpus:
+    corpus = Corpus()
+    for theme, theme_picks in picks.items():
+        corpus.read_picks(theme, theme_picks)
+    corpus.freeze()
+    return corpus
+
+
+if __name__ == '__main__':
+    main()
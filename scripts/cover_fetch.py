@@ -0,0 +1,351 @@
+"""
+Asyncio download engine for cover images.
+
+- Keep-alive HTTP/1.1 connections are pooled per host and reused across
+  requests (one TCP/TLS handshake per pooled connection, not per image).
+- Concurrency is bounded by the number of workers; each host also has a
+  token-bucket rate limit.
+- Failed requests are retried with exponential backoff and full jitter.
+  Connection errors, 429 and 5xx are retried; other HTTP errors are not.
+- A journal (JSON lines) records every finished file. If a run is interrupted,
+  the next run skips journaled files without touching the disk; the journal is
+  removed once a run completes without failures.
+
+Only the standard library is used. Files are written to a temporary name and
+renamed into place, so an interrupted download never leaves a partial image.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import socket
+import ssl
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+
+USER_AGENT = 'open-data/cover-downloader'
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, url: str) -> None:
+        super().__init__(f"HTTP {status} for {url}")
+        self.status = status
+        self.url = url
+
+    @property
+    def retryable(self) -> bool:
+        return self.status in RETRY_STATUSES
+
+
+class HttpConnection:
+    """One keep-alive HTTP/1.1 connection."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, host_header: str) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.host_header = host_header
+        self.closed = False
+
+    @classmethod
+    async def open(cls, scheme: str, host: str, port: int, timeout: float) -> 'HttpConnection':
+        ctx = ssl.create_default_context() if scheme == 'https' else None
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port, ssl=ctx, server_hostname=host if ctx else None), timeout)
+        sock = writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        default_port = 443 if scheme == 'https' else 80
+        return cls(reader, writer, host if port == default_port else f"{host}:{port}")
+
+    async def get(self, path: str, headers: Optional[Dict[str, str]] = None) -> Tuple[int, Dict[str, str], bytes]:
+        extra = ''.join(f"{name}: {value}\r\n" for name, value in (headers or {}).items())
+        request = (f"GET {path} HTTP/1.1\r\nHost: {self.host_header}\r\nUser-Agent: {USER_AGENT}\r\n"
+                   f"Accept: */*\r\n{extra}Connection: keep-alive\r\n\r\n")
+        self.writer.write(request.encode('ascii'))
+        await self.writer.drain()
+        return await self.read_response()
+
+    async def read_response(self) -> Tuple[int, Dict[str, str], bytes]:
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError('Connection closed by peer')
+        parts = status_line.decode('latin-1').split(None, 2)
+        if len(parts) < 2 or not parts[0].startswith('HTTP/'):
+            raise ConnectionError(f"Malformed status line: {status_line!r}")
+        status = int(parts[1])
+        headers: Dict[str, str] = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if status in (204, 304) or 100 <= status < 200:
+            body = b''
+        elif headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks: List[bytes] = []
+            while True:
+                size = int((await self.reader.readline()).split(b';', 1)[0].strip() or b'0', 16)
+                if size == 0:
+                    # Skip trailers up to the final empty line
+                    while (await self.reader.readline()) not in (b'\r\n', b'\n', b''):
+                        pass
+                    break
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readexactly(2)
+            body = b''.join(chunks)
+        elif 'content-length' in headers:
+            body = await self.reader.readexactly(int(headers['content-length']))
+        else:
+            body = await self.reader.read()
+            self.closed = True
+
+        if headers.get('connection', '').lower() == 'close' or parts[0] == 'HTTP/1.0':
+            self.closed = True
+        return status, headers, body
+
+    def close(self) -> None:
+        self.closed = True
+        self.writer.close()
+
+
+class RateLimiter:
+    """Token bucket: at most `rate` requests per second (0 disables it)."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None) -> None:
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class HostPool:
+    """Idle keep-alive connections and the rate limiter of one host."""
+
+    def __init__(self, scheme: str, host: str, port: int, rate: float, timeout: float) -> None:
+        self.scheme, self.host, self.port = scheme, host, port
+        self.timeout = timeout
+        self.idle: List[HttpConnection] = []
+        self.limiter = RateLimiter(rate)
+        self.opened = 0
+
+    async def acquire(self) -> HttpConnection:
+        while self.idle:
+            conn = self.idle.pop()
+            if not conn.closed and not conn.reader.at_eof():
+                return conn
+            conn.close()
+        self.opened += 1
+        return await HttpConnection.open(self.scheme, self.host, self.port, self.timeout)
+
+    def release(self, conn: HttpConnection) -> None:
+        if conn.closed:
+            conn.close()
+        else:
+            self.idle.append(conn)
+
+    def close(self) -> None:
+        for conn in self.idle:
+            conn.close()
+        self.idle.clear()
+
+
+class DownloadJournal:
+    """Append-only record of finished files, used to resume interrupted runs."""
+
+    def __init__(self, path: Optional[Path]) -> None:
+        self.path = path
+        self.done: Set[str] = set()
+        self._fh = None
+        if path is not None and path.exists():
+            with path.open('r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line after a crash
+                    if entry.get('status') == 'done':
+                        self.done.add(entry['file'])
+
+    def record(self, file_name: str, status: str, **extra: object) -> None:
+        if self.path is None:
+            return
+        if self._fh is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fh = self.path.open('a', encoding='utf-8')
+        self._fh.write(json.dumps({'file': file_name, 'status': status, **extra}) + '\n')
+        self._fh.flush()
+        if status == 'done':
+            self.done.add(file_name)
+
+    def close(self, completed: bool) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+        if completed and self.path is not None and self.path.exists():
+            self.path.unlink()
+
+
+@dataclass
+class DownloadStats:
+    downloaded: int = 0
+    skipped: int = 0
+    failed: int = 0
+    retries: int = 0
+    bytes: int = 0
+    connections: int = 0
+    errors: List[Tuple[str, str]] = field(default_factory=list)
+
+
+@dataclass
+class DownloadOptions:
+    concurrency: int = 12
+    rate: float = 0.0              # requests per second per host, 0 = unlimited
+    retries: int = 4               # extra attempts after the first one
+    backoff: float = 0.5           # base delay in seconds
+    backoff_cap: float = 30.0
+    timeout: float = 25.0
+    force: bool = False
+    check_existing: bool = True    # stat each destination before downloading
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    # Exponential backoff with full jitter
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def write_atomic(dest: Path, data: bytes) -> None:
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(dest.name + '.part')
+    tmp.write_bytes(data)
+    tmp.replace(dest)
+
+
+async def download_all(tasks: Iterable[Tuple[str, Path]], options: Optional[DownloadOptions] = None,
+                       journal_path: Optional[Path] = None,
+                       on_download: Optional[Callable[[Path, bytes], None]] = None) -> DownloadStats:
+    """Download every (url, dest) task; returns counts, never raises per file.
+
+    `on_download(dest, data)` is called after each file is written.
+    """
+    options = options or DownloadOptions()
+    journal = DownloadJournal(journal_path)
+    stats = DownloadStats()
+    pools: Dict[Tuple[str, str, int], HostPool] = {}
+    queue: asyncio.Queue = asyncio.Queue()
+    queued: Set[Path] = set()
+    for url, dest in tasks:
+        if dest in queued:
+            continue  # the same cover listed twice
+        queued.add(dest)
+        if not options.force and dest.name in journal.done:
+            stats.skipped += 1
+            continue
+        queue.put_nowait((url, dest))
+
+    def pool_for(url: str) -> HostPool:
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        key = (parts.scheme, parts.hostname or '', port)
+        if key not in pools:
+            pools[key] = HostPool(key[0], key[1], key[2], options.rate, options.timeout)
+        return pools[key]
+
+    async def fetch(url: str) -> bytes:
+        pool = pool_for(url)
+        parts = urlsplit(url)
+        path = parts.path + (f"?{parts.query}" if parts.query else '')
+        await pool.limiter.acquire()
+        conn = await pool.acquire()
+        try:
+            status, _, body = await asyncio.wait_for(conn.get(path), options.timeout)
+        except BaseException:
+            conn.close()
+            raise
+        pool.release(conn)
+        if status != 200:
+            raise HttpError(status, url)
+        return body
+
+    def fail(url: str, dest: Path, exc: BaseException) -> None:
+        stats.failed += 1
+        stats.errors.append((url, str(exc) or type(exc).__name__))
+        journal.record(dest.name, 'failed', error=str(exc) or type(exc).__name__)
+
+    async def download_one(url: str, dest: Path) -> None:
+        if options.check_existing and not options.force and dest.exists():
+            stats.skipped += 1
+            journal.record(dest.name, 'done')
+            return
+        for attempt in range(options.retries + 1):
+            try:
+                data = await fetch(url)
+            # ValueError: malformed status line, chunk size or Content-Length
+            except (OSError, ConnectionError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError,
+                    HttpError) as exc:
+                retryable = not isinstance(exc, HttpError) or exc.retryable
+                if retryable and attempt < options.retries:
+                    stats.retries += 1
+                    await asyncio.sleep(backoff_delay(attempt, options.backoff, options.backoff_cap))
+                    continue
+                fail(url, dest, exc)
+                return
+            write_atomic(dest, data)
+            if on_download is not None:
+                on_download(dest, data)
+            stats.downloaded += 1
+            stats.bytes += len(data)
+            journal.record(dest.name, 'done', bytes=len(data))
+            return
+
+    async def worker() -> None:
+        while True:
+            try:
+                url, dest = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            # A single file never stops the run: whatever it raises (a write
+            # error, a bug in a callback) is recorded as its failure
+            try:
+                await download_one(url, dest)
+            except Exception as exc:
+                fail(url, dest, exc)
+
+    finished = False
+    try:
+        await asyncio.gather(*(worker() for _ in range(max(1, options.concurrency))))
+        finished = True
+    finally:
+        for pool in pools.values():
+            stats.connections += pool.opened
+            pool.close()
+        journal.close(completed=finished and stats.failed == 0)
+    return stats
+
+
+def run_downloads(tasks: Iterable[Tuple[str, Path]], options: Optional[DownloadOptions] = None,
+                  journal_path: Optional[Path] = None,
+                  on_download: Optional[Callable[[Path, bytes], None]] = None) -> DownloadStats:
+    return asyncio.run(download_all(tasks, options, journal_path, on_download))
@@ -0,0 +1,129 @@
+"""
+Persistent index of the global covers folder.
+
+`covers/.index.json` maps each cover code to the sizes present on disk, with
+the byte size and mtime of every file. Refreshing it costs one directory
+listing: only files that are not in the index yet are stat'ed, and entries
+whose file disappeared are dropped. Deciding what to download is then a set
+difference against the index instead of one `exists()` per file.
+
+The SHA-256 of a file is only computed when a consumer asks for it
+(`sha256`, e.g. cover_variants.py deciding what to re-encode), then kept
+until the file's size or mtime changes. Downloads record it at once, as the
+bytes are already in memory.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+INDEX_NAME = '.index.json'
+INDEX_VERSION = 1
+COVER_FILE_RE = re.compile(r"^(.+)_(small|big)\.jpg$")
+
+
+def cover_file_name(code: str, size: str) -> str:
+    return f"{code}_{'small' if size == 'small' else 'big'}.jpg"
+
+
+class CoverIndex:
+    def __init__(self, covers_dir: Path) -> None:
+        self.covers_dir = covers_dir
+        self.path = covers_dir / INDEX_NAME
+        # code -> size -> {'bytes': int, 'mtime_ns': int, 'sha256': str (once computed)}
+        self.covers: Dict[str, Dict[str, Dict[str, object]]] = {}
+        self.dirty = False
+
+    @classmethod
+    def load(cls, covers_dir: Path) -> 'CoverIndex':
+        index = cls(covers_dir)
+        try:
+            with index.path.open('r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return index
+        if isinstance(data, dict) and data.get('version') == INDEX_VERSION:
+            index.covers = data.get('covers') or {}
+        return index
+
+    def save(self) -> Optional[Path]:
+        if not self.dirty:
+            return None
+        tmp = self.path.with_name(self.path.name + '.tmp')
+        with tmp.open('w', encoding='utf-8') as f:
+            json.dump({'version': INDEX_VERSION, 'covers': self.covers}, f, sort_keys=True, separators=(',', ':'))
+        tmp.replace(self.path)
+        self.dirty = False
+        return self.path
+
+    def has(self, code: str, size: str) -> bool:
+        return size in self.covers.get(code, ())
+
+    def _stat(self, code: str, size: str) -> Dict[str, object]:
+        try:
+            st = (self.covers_dir / cover_file_name(code, size)).stat()
+        except OSError:
+            return {'bytes': -1, 'mtime_ns': -1}
+        return {'bytes': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+    def add(self, code: str, size: str, data: bytes) -> None:
+        # Called once the file is written, so its mtime is known
+        self.covers.setdefault(code, {})[size] = {**self._stat(code, size), 'sha256': hashlib.sha256(data).hexdigest()}
+        self.dirty = True
+
+    def sha256(self, code: str, size: str) -> str:
+        """SHA-256 of an indexed file, hashed now unless known for its current size and mtime."""
+        entry = self.covers[code][size]
+        st = self._stat(code, size)
+        if 'sha256' not in entry or any(entry.get(k) != v for k, v in st.items()):
+            entry.update(st, sha256=hashlib.sha256(
+                (self.covers_dir / cover_file_name(code, size)).read_bytes()).hexdigest())
+            self.dirty = True
+        return str(entry['sha256'])
+
+    def add_file(self, path: Path) -> bool:
+        m = COVER_FILE_RE.match(path.name)
+        if not m:
+            return False
+        self.add(m.group(1), m.group(2), path.read_bytes())
+        return True
+
+    def refresh(self) -> Tuple[int, int]:
+        """Reconcile with the folder in one listing; returns (added, removed)."""
+        present: Dict[str, set] = {}
+        try:
+            names = os.listdir(self.covers_dir)
+        except FileNotFoundError:
+            names = []
+        for name in names:
+            m = COVER_FILE_RE.match(name)
+            if m:
+                present.setdefault(m.group(1), set()).add(m.group(2))
+
+        removed = 0
+        for code in list(self.covers):
+            sizes = self.covers[code]
+            for size in list(sizes):
+                if size not in present.get(code, ()):
+                    del sizes[size]
+                    removed += 1
+            if not sizes:
+                del self.covers[code]
+        added = 0
+        for code, sizes in present.items():
+            for size in sizes:
+                if not self.has(code, size):
+                    self.covers.setdefault(code, {})[size] = self._stat(code, size)
+                    added += 1
+        if added or removed:
+            self.dirty = True
+        return added, removed
+
+    def missing(self, codes: Iterable[str], sizes: List[str]) -> List[Tuple[str, str]]:
+        return [(code, size) for code in codes for size in sizes if not self.has(code, size)]
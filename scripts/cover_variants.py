@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Compact image variants of the downloaded covers, and one sprite sheet per list.
+
+`download_covers.py` stores IGDB's `<code>_big.jpg` and `<code>_small.jpg`,
+and the pages request them one by one. This post-download step writes:
+- `covers/<code>_<size>.webp` (and `.avif` with `--formats webp avif`, when
+  the installed Pillow can encode it) next to each JPEG;
+- `covers/sprites/<theme>.webp`: the small cover of every game of the list,
+  in `aggregated-list.csv` order, as the tiles of one image;
+- `covers/sprites/<theme>.json`: the tile offset of every cover code, the
+  cover code of every title of the list (empty for a title without one) and
+  the variant formats available, so a page draws its thumbnails from one
+  image request and no longer reads the source CSVs to find the codes. Pages
+  still read them for titles the index does not know, i.e. when the list was
+  rebuilt after its sprite.
+
+Work is skipped through content hashes. `covers/.variants.json` records, for
+every variant, the SHA-256 of the JPEG it was encoded from (from the cover
+index, see cover_index.py) and the encoder settings, and for every sprite a
+hash of its tiles and their sources; only new or changed covers are encoded
+again. Encodes and sprites run on a process pool (`--jobs`, default: one
+worker per core). Variants whose JPEG disappeared and sprites whose list
+disappeared are removed; variants of a format not requested this run are
+kept.
+
+Requires Pillow (`pip install Pillow`); AVIF needs a Pillow build with AVIF
+support.
+
+Usage examples:
+- WebP variants and sprites:    python scripts/cover_variants.py
+- Also AVIF:                    python scripts/cover_variants.py --formats webp avif
+- Sprites only, one list:       python scripts/cover_variants.py --skip-variants --list best_games_of_all_time
+- Re-encode everything:         python scripts/cover_variants.py --force
+"""
+
+from __future__ import annotations
+
+import argparse
+import concurrent.futures
+import csv
+import hashlib
+import io
+import json
+import math
+import os
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from atomic_io import write_bytes_atomic, write_text_atomic
+from cover_index import CoverIndex, cover_file_name
+from download_covers import base_title, load_cover_map, repo_root
+from instrument import add_arguments, count, session_from_args, stage
+from rebuild_list import list_available_lists, script_root_list_dir
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # optional
+    Image = None
+
+
+MANIFEST_NAME = '.variants.json'
+MANIFEST_VERSION = 1
+SPRITES_DIR = 'sprites'
+# format -> (Pillow format name, default quality, save options)
+FORMATS: Dict[str, Tuple[str, int, Dict[str, object]]] = {
+    'webp': ('WEBP', 80, {'method': 6}),
+    'avif': ('AVIF', 60, {'speed': 6}),
+}
+# IGDB t_cover_small
+TILE = (90, 128)
+DEFAULT_COLUMNS = 10
+# Largest WebP side
+MAX_SIDE = 16383
+
+
+def available_formats() -> List[str]:
+    if Image is None:
+        return []
+    return [fmt for fmt in FORMATS if features.check(fmt)]
+
+
+def encode(image, fmt: str, quality: int) -> bytes:
+    name, _, options = FORMATS[fmt]
+    buf = io.BytesIO()
+    image.save(buf, name, quality=quality, **options)
+    return buf.getvalue()
+
+
+@dataclass
+class VariantTask:
+    source: str
+    dest: str
+    fmt: str
+    quality: int
+
+
+@dataclass
+class SpriteTask:
+    theme: str
+    # (code, small JPEG path), one tile each, in list order
+    tiles: List[Tuple[str, str]]
+    titles: Dict[str, str]
+    image: str
+    index: str
+    fmt: str
+    quality: int
+    columns: int
+    variants: List[str]
+
+
+def encode_variant(task: VariantTask) -> int:
+    with Image.open(task.source) as im:
+        data = encode(im.convert('RGB'), task.fmt, task.quality)
+    write_bytes_atomic(task.dest, data)
+    return len(data)
+
+
+def sprite_layout(n: int, columns: int) -> Tuple[int, int]:
+    # Wide enough to keep the height under the WebP limit
+    columns = max(1, min(n, max(columns, math.ceil(n * TILE[1] / MAX_SIDE))))
+    return columns, math.ceil(n / columns)
+
+
+def build_sprite(task: SpriteTask) -> int:
+    columns, rows = sprite_layout(len(task.tiles), task.columns)
+    sheet = Image.new('RGB', (columns * TILE[0], rows * TILE[1]), (16, 21, 33))
+    offsets: Dict[str, List[int]] = {}
+    for i, (code, path) in enumerate(task.tiles):
+        x, y = (i % columns) * TILE[0], (i // columns) * TILE[1]
+        with Image.open(path) as im:
+            # Cropped to the tile, as object-fit: cover does on the pages
+            sheet.paste(ImageOps.fit(im.convert('RGB'), TILE, Image.LANCZOS), (x, y))
+        offsets[code] = [x, y]
+    data = encode(sheet, task.fmt, task.quality)
+    write_bytes_atomic(task.image, data)
+    index = {'image': Path(task.image).name, 'tile': list(TILE), 'columns': columns, 'rows': rows,
+             'width': sheet.width, 'height': sheet.height, 'variants': task.variants,
+             'tiles': offsets, 'titles': task.titles}
+    write_text_atomic(task.index, json.dumps(index, ensure_ascii=False, separators=(',', ':')))
+    return len(data)
+
+
+def run_task(task) -> Tuple[object, Optional[int], Optional[str]]:
+    # Worker entry point: a failed cover is reported, not fatal
+    try:
+        if isinstance(task, SpriteTask):
+            return task, build_sprite(task), None
+        return task, encode_variant(task), None
+    except Exception as exc:
+        return task, None, f"{type(exc).__name__}: {exc}"
+
+
+def run_pool(tasks: list, jobs: int):
+    if jobs <= 1 or len(tasks) <= 1:
+        yield from map(run_task, tasks)
+        return
+    chunksize = max(1, len(tasks) // (jobs * 8))
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as ex:
+        yield from ex.map(run_task, tasks, chunksize=chunksize)
+
+
+def load_manifest(covers_dir: Path) -> Dict[str, Dict[str, object]]:
+    try:
+        with (covers_dir / MANIFEST_NAME).open('r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {}
+    if not isinstance(data, dict) or data.get('version') != MANIFEST_VERSION:
+        data = {}
+    return {'variants': data.get('variants') or {}, 'sprites': data.get('sprites') or {}}
+
+
+def save_manifest(covers_dir: Path, manifest: Dict[str, Dict[str, object]]) -> None:
+    payload = {'version': MANIFEST_VERSION, 'variants': dict(sorted(manifest['variants'].items())),
+               'sprites': dict(sorted(manifest['sprites'].items()))}
+    write_text_atomic(covers_dir / MANIFEST_NAME, json.dumps(payload, indent=1))
+
+
+def list_tiles(list_dir: Path, index: CoverIndex) -> Tuple[List[str], Dict[str, str]]:
+    """Distinct cover codes of a list in aggregated order, and the code of each title ('' without one)."""
+    cover_map = load_cover_map(list_dir)
+    codes: Dict[str, None] = {}
+    titles: Dict[str, str] = {}
+    try:
+        with (list_dir / 'aggregated-list.csv').open('r', encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f):
+                title = base_title(row.get('Title', ''))
+                code = cover_map.get(title, '')
+                titles[title] = code
+                if code and index.has(code, 'small'):
+                    codes.setdefault(code, None)
+    except FileNotFoundError:
+        pass
+    return list(codes), titles
+
+
+def plan_variants(covers_dir: Path, index: CoverIndex, formats: List[str], quality: Optional[int],
+                  manifest: Dict[str, Dict[str, object]], force: bool
+                  ) -> Tuple[List[VariantTask], Dict[str, Dict[str, object]], List[str]]:
+    """Tasks to run, the manifest entry each writes, and the stale variants.
+
+    A variant is stale when its JPEG is gone, whatever its format: formats
+    not in `formats` are left as they are.
+    """
+    present = set(os.listdir(covers_dir))
+    tasks: List[VariantTask] = []
+    entries: Dict[str, Dict[str, object]] = {}
+    sources = set()
+    for code, sizes in index.covers.items():
+        for size in sizes:
+            source = cover_file_name(code, size)
+            sources.add(source[:-len('.jpg')])
+            for fmt in formats:
+                q = quality if quality is not None else FORMATS[fmt][1]
+                name = f"{source[:-len('.jpg')]}.{fmt}"
+                entry = {'sha256': index.sha256(code, size), 'quality': q}
+                if not force and manifest['variants'].get(name) == entry and name in present:
+                    count('variants_unchanged')
+                    continue
+                tasks.append(VariantTask(str(covers_dir / source), str(covers_dir / name), fmt, q))
+                entries[name] = entry
+    stale = [name for name in manifest['variants'] if name.rsplit('.', 1)[0] not in sources]
+    return tasks, entries, stale
+
+
+def sprite_key(tiles: List[Tuple[str, str]], titles: Dict[str, str], index: CoverIndex, fmt: str, quality: int,
+               columns: int, variants: List[str]) -> str:
+    h = hashlib.sha256(json.dumps([fmt, quality, columns, list(TILE), variants, sorted(titles.items())]).encode())
+    for code, _ in tiles:
+        h.update(f"\n{code}:{index.sha256(code, 'small')}".encode())
+    return h.hexdigest()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Encode cover variants and per-list sprite sheets')
+    parser.add_argument('--root', default=str(script_root_list_dir()), help='Root folder containing lists (default: list)')
+    parser.add_argument('--list', dest='single', help='Single list to build the sprite of (folder name under root)')
+    parser.add_argument('--covers-dir', default=str(repo_root() / 'covers'), help='Global covers directory')
+    parser.add_argument('--formats', nargs='+', choices=sorted(FORMATS), default=['webp'],
+                        help='Variant formats (default: webp)')
+    parser.add_argument('--quality', type=int, help='Encoder quality for every format '
+                                                    '(default: webp 80, avif 60)')
+    parser.add_argument('--sprite-format', choices=sorted(FORMATS), default='webp', help='Sprite sheet format')
+    parser.add_argument('--columns', type=int, default=DEFAULT_COLUMNS,
+                        help=f'Tiles per sprite row (default: {DEFAULT_COLUMNS})')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1,
+                        help='Number of worker processes (default: one per core)')
+    parser.add_argument('--skip-variants', action='store_true', help='Only build the sprite sheets')
+    parser.add_argument('--skip-sprites', action='store_true', help='Only encode the variants')
+    parser.add_argument('--force', action='store_true', help='Re-encode even when the sources are unchanged')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    root = Path(args.root)
+    if not root.exists() or not root.is_dir():
+        print(f"Invalid root: {root}", file=sys.stderr)
+        sys.exit(1)
+    if Image is None:
+        print("Pillow is required: pip install Pillow", file=sys.stderr)
+        sys.exit(1)
+    supported = available_formats()
+    unsupported = [f for f in {*args.formats, args.sprite_format} if f not in supported]
+    if unsupported:
+        print(f"This Pillow cannot encode: {', '.join(sorted(unsupported))}", file=sys.stderr)
+        sys.exit(1)
+
+    with session_from_args(args):
+        build(args, root)
+
+
+def build(args: argparse.Namespace, root: Path) -> None:
+    covers_dir = Path(args.covers_dir)
+    sprites_dir = covers_dir / SPRITES_DIR
+    with stage('scan'):
+        index = CoverIndex.load(covers_dir)
+        index.refresh()
+        index.save()
+    manifest = load_manifest(covers_dir)
+    formats = list(dict.fromkeys(args.formats))
+
+    tasks: list = []
+    variant_entries: Dict[str, Dict[str, object]] = {}
+    stale: List[str] = []
+    if not args.skip_variants:
+        with stage('plan'):
+            variant_tasks, variant_entries, stale = plan_variants(covers_dir, index, formats, args.quality,
+                                                                  manifest, args.force)
+        tasks.extend(variant_tasks)
+
+    sprite_keys: Dict[str, str] = {}
+    empty: List[str] = []
+    if not args.skip_sprites:
+        sprite_quality = args.quality if args.quality is not None else FORMATS[args.sprite_format][1]
+        # The variant formats the pages may request instead of the JPEGs:
+        # this run's and the ones kept from earlier runs
+        kept = {name.rsplit('.', 1)[1] for name in manifest['variants'] if name not in stale}
+        variants = sorted(kept if args.skip_variants else kept.union(formats))
+        list_dirs = list_available_lists(root)
+        if args.single:
+            list_dirs = [d for d in list_dirs if d.name == args.single]
+            if not list_dirs:
+                print(f"List not found: {args.single}", file=sys.stderr)
+                sys.exit(1)
+        else:
+            # Sprites of lists that no longer exist
+            themes = {d.name for d in list_dirs}
+            empty = [t for t in manifest['sprites'] if t not in themes]
+        for list_dir in list_dirs:
+            theme = list_dir.name
+            with stage('plan', theme=theme):
+                codes, titles = list_tiles(list_dir, index)
+            if not codes:
+                empty.append(theme)
+                continue
+            tiles = [(code, str(covers_dir / cover_file_name(code, 'small'))) for code in codes]
+            key = sprite_key(tiles, titles, index, args.sprite_format, sprite_quality, args.columns, variants)
+            image = sprites_dir / f"{theme}.{args.sprite_format}"
+            if not args.force and manifest['sprites'].get(theme, {}).get('key') == key and image.is_file():
+                count('sprites_unchanged')
+                continue
+            sprite_keys[theme] = key
+            tasks.append(SpriteTask(theme, tiles, titles, str(image), str(sprites_dir / f"{theme}.json"),
+                                    args.sprite_format, sprite_quality, args.columns, variants))
+        sprites_dir.mkdir(parents=True, exist_ok=True)
+
+    # Sprites are the longest tasks: started first
+    tasks.sort(key=lambda t: not isinstance(t, SpriteTask))
+    encoded = sprites = failed = 0
+    written = 0
+    with stage('encode'):
+        for task, size, error in run_pool(tasks, args.jobs):
+            if error is not None:
+                failed += 1
+                print(f"Failed: {getattr(task, 'source', None) or task.theme} ({error})", file=sys.stderr)
+                continue
+            written += size
+            if isinstance(task, SpriteTask):
+                sprites += 1
+                previous = manifest['sprites'].get(task.theme)
+                if previous and previous.get('image') != Path(task.image).name:
+                    (sprites_dir / str(previous['image'])).unlink(missing_ok=True)
+                manifest['sprites'][task.theme] = {'key': sprite_keys[task.theme], 'image': Path(task.image).name}
+            else:
+                encoded += 1
+                manifest['variants'][Path(task.dest).name] = variant_entries[Path(task.dest).name]
+    count('variants_encoded', encoded)
+    count('sprites_built', sprites)
+    count('bytes_written', written)
+
+    removed = 0
+    for name in stale:
+        (covers_dir / name).unlink(missing_ok=True)
+        del manifest['variants'][name]
+        removed += 1
+    for theme in empty:
+        entry = manifest['sprites'].pop(theme, None)
+        if entry is not None:
+            (sprites_dir / str(entry['image'])).unlink(missing_ok=True)
+            (sprites_dir / f"{theme}.json").unlink(missing_ok=True)
+            removed += 1
+    save_manifest(covers_dir, manifest)
+    # With the hashes computed while planning
+    index.save()
+    print(f"Encoded {encoded} variants and {sprites} sprite sheets ({written / 1e6:.1f} MB), "
+          f"removed {removed} stale, {failed} failed.")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,10 +3,13 @@
 Download IGDB cover images into a single global folder so the same cover is
 never downloaded twice, even if it appears in multiple lists.
 
-Flow per list:
-1) Build cover codes from the most recent source CSVs listed in about.csv.
-2) For each code and requested size(s), ensure the file exists in the global
-   covers/ directory (download once). No per-list copies are created.
+Flow:
+1) Collect the distinct cover codes of all requested lists in one pass, from
+   the most recent source CSVs of each list.
+2) Compare them with the persistent cover index (covers/.index.json, see
+   cover_index.py), refreshed with a single directory listing.
+3) Download only the missing code/size files into the global covers/
+   directory. No per-list copies are created.
 
 Usage examples:
 - All lists, both sizes:        python scripts/download_covers.py
@@ -14,6 +17,11 @@ Usage examples:
 - Only big size:                python scripts/download_covers.py --size big
 - Overwrite existing files:     python scripts/download_covers.py --force
 - Custom covers dir:            python scripts/download_covers.py --covers-dir covers
+- Old thread-per-request path:  python scripts/download_covers.py --engine threads
+
+The default `async` engine (see cover_fetch.py) reuses keep-alive connections,
+retries with backoff, rate-limits per host (`--rate`) and keeps a journal in
+the covers dir so an interrupted run resumes where it stopped.
 """
 
 from __future__ import annotations
@@ -22,16 +30,20 @@ import argparse
 import concurrent.futures
 import csv
 import json
-import os
 import re
 import sys
 import urllib.request
 from pathlib import Path
 from typing import Dict, Iterable, List, Optional, Tuple
 
+from cover_fetch import DownloadOptions, run_downloads
+from cover_index import COVER_FILE_RE, CoverIndex, cover_file_name
+from instrument import add_arguments, count, session_from_args, stage
+from source_index import get_index
+
 
 IGDB_BASE = "https://images.igdb.com/igdb/image/upload"
-TIMESTAMP_RE = re.compile(r" - (\d{4})-(\d{2})-(\d{2})_(\d{2})-(\d{2})-(\d{2})\.csv$")
+JOURNAL_NAME = '.download-journal.jsonl'
 
 
 def repo_root() -> Path:
@@ -42,24 +54,6 @@ def lists_root() -> Path:
     return repo_root() / 'list'
 
 
-def parse_timestamp_from_filename(filename: str) -> Optional[Tuple[int, int, int, int, int, int]]:
-    m = TIMESTAMP_RE.search(filename)
-    if not m:
-        return None
-    return tuple(int(x) for x in m.groups())  # type: ignore[return-value]
-
-
-def latest_csv_in_dir(dir_path: Path) -> Optional[Path]:
-    files = [p for p in dir_path.iterdir() if p.is_file() and p.suffix.lower() == '.csv']
-    files = [p for p in files if p.name.lower() not in {'aggregated-list.csv', 'about.csv'}]
-    if not files:
-        return None
-    with_ts = [p for p in files if parse_timestamp_from_filename(p.name)]
-    if with_ts:
-        return max(with_ts, key=lambda p: parse_timestamp_from_filename(p.name))
-    return max(files, key=lambda p: p.stat().st_mtime)
-
-
 def base_title(title: str) -> str:
     title = (title or '').strip()
     m = re.match(r"^(.*)\s+\((\d{4})\)$", title)
@@ -68,27 +62,8 @@ def base_title(title: str) -> str:
 
 def build_cover_map_from_sources(list_dir: Path) -> Dict[str, str]:
     mapping: Dict[str, str] = {}
-    # Prefer per-source subfolders
-    source_dirs = [p for p in list_dir.iterdir() if p.is_dir()]
-    picks: List[Path] = []
-    if source_dirs:
-        for sdir in sorted(source_dirs, key=lambda p: p.name.lower()):
-            latest = latest_csv_in_dir(sdir)
-            if latest is not None:
-                picks.append(latest)
-    if not picks:
-        files = [p for p in list_dir.iterdir() if p.is_file() and p.suffix.lower() == '.csv']
-        files = [p for p in files if p.name.lower() not in {'aggregated-list.csv', 'about.csv'}]
-        groups: Dict[str, List[Path]] = {}
-        for f in files:
-            stem = f.name[:-4]
-            if ' - ' in stem:
-                src = stem.split(' - ', 1)[0]
-                groups.setdefault(src, []).append(f)
-        for paths in groups.values():
-            with_ts = [p for p in paths if parse_timestamp_from_filename(p.name)]
-            chosen = max(with_ts, key=lambda p: parse_timestamp_from_filename(p.name)) if with_ts else max(paths, key=lambda p: p.stat().st_mtime)
-            picks.append(chosen)
+    # Latest CSV per source, as picked by rebuild_list.py
+    picks = [p.csv_path for p in get_index(list_dir.parent).picks(list_dir)]
     for p in picks:
         with p.open('r', encoding='utf-8', newline='') as f:
             reader = csv.DictReader(f)
@@ -105,9 +80,9 @@ def load_cover_map(list_dir: Path) -> Dict[str, str]:
     return build_cover_map_from_sources(list_dir)
 
 
-def build_url(code: str, size: str) -> str:
+def build_url(code: str, size: str, base: str = IGDB_BASE) -> str:
     variant = 't_cover_small' if size == 'small' else 't_cover_big'
-    return f"{IGDB_BASE}/{variant}/{code}.jpg"
+    return f"{base}/{variant}/{code}.jpg"
 
 
 def ensure_parent(path: Path) -> None:
@@ -126,45 +101,62 @@ def ensure_file(url: str, dest_path: Path, force: bool, timeout: int = 25) -> st
     return 'downloaded'
 
 
-def tasks_for_list(codes: Iterable[str], sizes: List[str], covers_dir: Path) -> List[Tuple[str, Path]]:
+def tasks_for_list(codes: Iterable[str], sizes: List[str], covers_dir: Path,
+                   base: str = IGDB_BASE) -> List[Tuple[str, Path]]:
     tasks: List[Tuple[str, Path]] = []
     for code in codes:
         for size in sizes:
-            url = build_url(code, size)
-            dest = covers_dir / f"{code}_{'small' if size=='small' else 'big'}.jpg"
+            url = build_url(code, size, base)
+            dest = covers_dir / cover_file_name(code, size)
             tasks.append((url, dest))
     return tasks
 
 
-def process_list(list_dir: Path, sizes: List[str], force: bool, parallel: int, covers_dir: Path) -> Tuple[int, int]:
-    covers = load_cover_map(list_dir)
-    if not covers:
-        return (0, 0)
-    tasks = tasks_for_list(covers.values(), sizes, covers_dir)
-    downloaded = skipped = 0
+def download_threaded(tasks: List[Tuple[str, Path]], force: bool, parallel: int,
+                      index: Optional[CoverIndex] = None) -> Tuple[int, int, int]:
+    downloaded = skipped = failed = 0
+
+    def tally(url: str, dpath: Path, fn) -> None:
+        nonlocal downloaded, skipped, failed
+        try:
+            res = fn()
+        except Exception as exc:
+            failed += 1
+            print(f"Failed: {url} ({exc})", file=sys.stderr)
+            return
+        if res == 'downloaded':
+            downloaded += 1
+            if index is not None:
+                index.add_file(dpath)
+        else:
+            skipped += 1
+
     if parallel <= 1:
         for url, dpath in tasks:
-            try:
-                res = ensure_file(url, dpath, force)
-                if res == 'downloaded':
-                    downloaded += 1
-                else:
-                    skipped += 1
-            except Exception:
-                pass
+            tally(url, dpath, lambda: ensure_file(url, dpath, force))
     else:
         with concurrent.futures.ThreadPoolExecutor(max_workers=parallel) as ex:
             futs = {ex.submit(ensure_file, url, dpath, force): (url, dpath) for url, dpath in tasks}
             for fut in concurrent.futures.as_completed(futs):
-                try:
-                    res = fut.result()
-                    if res == 'downloaded':
-                        downloaded += 1
-                    else:
-                        skipped += 1
-                except Exception:
-                    pass
-    return downloaded, skipped
+                tally(*futs[fut], fut.result)
+    return downloaded, skipped, failed
+
+
+def collect_cover_codes(list_dirs: Iterable[Path]) -> List[str]:
+    # Distinct codes across all lists, in first-seen order
+    codes: Dict[str, None] = {}
+    for list_dir in list_dirs:
+        with stage('cover_map', theme=list_dir.name):
+            for code in load_cover_map(list_dir).values():
+                codes.setdefault(code, None)
+    return list(codes)
+
+
+def load_worklist(path: Path) -> Tuple[List[str], int]:
+    # Written by build_site.py: {"lists": n, "codes": [...]}
+    with path.open('r', encoding='utf-8') as f:
+        data = json.load(f)
+    return [str(c) for c in data.get('codes') or []], int(data.get('lists') or 0)
 
 
 def main() -> None:
@@ -175,8 +167,19 @@ def main() -> None:
     parser.add_argument('--force', action='store_true', help='Overwrite existing files in covers dir')
     parser.add_argument('--parallel', type=int, default=12, help='Number of parallel downloads')
     parser.add_argument('--covers-dir', default=str(repo_root() / 'covers'), help='Global covers directory')
+    parser.add_argument('--engine', choices=['async', 'threads'], default='async', help='Download engine')
+    parser.add_argument('--rate', type=float, default=50.0, help='Max requests per second per host, 0 = unlimited (async engine)')
+    parser.add_argument('--retries', type=int, default=4, help='Retries per file on transient errors (async engine)')
+    parser.add_argument('--base-url', default=IGDB_BASE, help='Image host base URL')
+    parser.add_argument('--worklist', help='Cover codes from build_site.py (list/.cover-worklist.json) '
+                                           'instead of reading the source CSVs')
+    add_arguments(parser)
     args = parser.parse_args()
+    with session_from_args(args):
+        download(args)
+
 
+def download(args: argparse.Namespace) -> None:
     root = Path(args.root)
     if not root.exists() or not root.is_dir():
         print(f"Invalid root: {root}", file=sys.stderr)
@@ -186,22 +189,66 @@ def main() -> None:
     covers_dir = Path(args.covers_dir)
     covers_dir.mkdir(parents=True, exist_ok=True)
 
-    targets: List[Path] = []
-    if args.single:
-        targets = [root / args.single]
+    if args.worklist:
+        codes, n_lists = load_worklist(Path(args.worklist))
     else:
-        targets = sorted([p for p in root.iterdir() if p.is_dir()], key=lambda p: p.name.lower())
-
-    total_d = total_s = 0
-    for list_dir in targets:
-        if not list_dir.exists() or not list_dir.is_dir():
-            print(f"Skip missing directory: {list_dir}")
-            continue
-        d, s = process_list(list_dir, sizes, args.force, args.parallel, covers_dir)
-        total_d += d; total_s += s
-        print(f"{list_dir.name}: downloaded {d}, skipped {s}")
-
-    print(f"All done. Downloaded: {total_d}, skipped: {total_s}")
+        targets: List[Path] = []
+        if args.single:
+            targets = [root / args.single]
+        else:
+            targets = get_index(root).lists()
+
+        list_dirs: List[Path] = []
+        for list_dir in targets:
+            if not list_dir.exists() or not list_dir.is_dir():
+                print(f"Skip missing directory: {list_dir}")
+                continue
+            list_dirs.append(list_dir)
+        with stage('collect_codes'):
+            codes = collect_cover_codes(list_dirs)
+        get_index(root).save()
+        n_lists = len(list_dirs)
+    count('cover_codes', len(codes))
+
+    with stage('index_refresh'):
+        index = CoverIndex.load(covers_dir)
+        index.refresh()
+    pending = [(c, s) for c in codes for s in sizes] if args.force else index.missing(codes, sizes)
+    skipped = len(codes) * len(sizes) - len(pending)
+    print(f"{len(codes)} distinct covers in {n_lists} lists, {len(pending)} files to download.")
+    tasks = [(build_url(code, size, args.base_url), covers_dir / cover_file_name(code, size))
+             for code, size in pending]
+
+    def record(dest: Path, data: bytes) -> None:
+        m = COVER_FILE_RE.match(dest.name)
+        if m:
+            index.add(m.group(1), m.group(2), data)
+
+    try:
+        if args.engine == 'threads':
+            # The index already filtered existing files; force skips the extra stat
+            with stage('download'):
+                downloaded, _, failed = download_threaded(tasks, True, args.parallel, index)
+            count('covers_fetched', downloaded)
+            count('covers_failed', failed)
+            print(f"All done. Downloaded: {downloaded}, skipped: {skipped}, failed: {failed}")
+            return
+
+        # One event loop and one connection pool for every list
+        options = DownloadOptions(concurrency=args.parallel, rate=args.rate, retries=args.retries,
+                                  force=args.force, check_existing=False)
+        with stage('download'):
+            stats = run_downloads(tasks, options, covers_dir / JOURNAL_NAME, record)
+        count('covers_fetched', stats.downloaded)
+        count('covers_failed', stats.failed)
+        count('cover_bytes', stats.bytes)
+        for url, error in stats.errors:
+            print(f"Failed: {url} ({error})", file=sys.stderr)
+        print(f"All done. Downloaded: {stats.downloaded}, skipped: {skipped + stats.skipped}, failed: {stats.failed} "
+              f"({stats.retries} retries, {stats.connections} connections)")
+    finally:
+        with stage('index_save'):
+            index.save()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Canonical game dimension table keyed by `GameId`, and aggregation by GameId
+instead of by display title.
+
+The table is built once from the latest CSV of every source of every list
+(the same files `rebuild_list.py` reads). For each GameId:
+- Title: the most frequent title across sources (first seen wins ties);
+- ReleaseYear: year of the most frequent non-empty ReleaseDate;
+- CoverImageId / ExternalId: the most frequent non-empty value.
+
+Rows without a usable GameId fall back to their stripped title as key, so they
+are still aggregated exactly as `aggregate_rows` would.
+
+`aggregate` derives the table from the rows it aggregates, in the same pass,
+so it never reads a `.games.csv` older than the sources; `build` writes the
+table for other tools. The ranking is written to `aggregated-by-game.csv`
+(same columns as `aggregated-list.csv`), next to the title-keyed root
+`aggregated-list.csv` the pages read, which it does not replace.
+
+Usage examples:
+- Write the table (list/.games.csv):    python scripts/game_index.py build
+- Global ranking by GameId:             python scripts/game_index.py aggregate  (aggregated-by-game.csv)
+- Custom folder for the ranking:        python scripts/game_index.py aggregate --out-dir /tmp
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import sys
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from aggregate_kernel import _to_score
+from atomic_io import write_csv_atomic
+from rebuild_list import (
+    list_available_lists,
+    pick_sources_for_list,
+    read_picks_rows,
+    script_root_list_dir,
+)
+
+
+GAMES_FILE_NAME = '.games.csv'
+AGGREGATED_FILE_NAME = 'aggregated-by-game.csv'
+AGGREGATED_FIELDS = ['Position', 'Title', 'TotalScore', 'ListsAppeared']
+GAMES_FIELDS = ['GameId', 'Title', 'ReleaseYear', 'CoverImageId', 'ExternalId']
+
+GameKey = Union[int, str]
+
+
+@dataclass
+class GameRecord:
+    game_id: int
+    title: str
+    release_year: str
+    cover_image_id: str
+    external_id: str
+
+    @property
+    def display_title(self) -> str:
+        return f"{self.title} ({self.release_year})" if self.release_year else self.title
+
+
+def parse_game_id(value: Optional[str]) -> Optional[int]:
+    value = (value or '').strip()
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def _most_common(counter: Counter) -> str:
+    # Counter keeps insertion order, and most_common() is stable for ties
+    for value, _ in counter.most_common():
+        if value:
+            return value
+    return ''
+
+
+class GameIndex:
+    """GameId -> GameRecord with O(1) lookups."""
+
+    def __init__(self, records: Iterable[GameRecord] = ()) -> None:
+        self.records: Dict[int, GameRecord] = {r.game_id: r for r in records}
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __contains__(self, game_id: int) -> bool:
+        return game_id in self.records
+
+    def get(self, game_id: Optional[int]) -> Optional[GameRecord]:
+        return self.records.get(game_id) if game_id is not None else None
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, str]]) -> 'GameIndex':
+        titles: Dict[int, Counter] = {}
+        dates: Dict[int, Counter] = {}
+        covers: Dict[int, Counter] = {}
+        externals: Dict[int, Counter] = {}
+        for r in rows:
+            gid = parse_game_id(r.get('GameId'))
+            title = (r.get('Title') or '').strip()
+            if gid is None or not title:
+                continue
+            if gid not in titles:
+                titles[gid], dates[gid], covers[gid], externals[gid] = Counter(), Counter(), Counter(), Counter()
+            titles[gid][title] += 1
+            dates[gid][(r.get('ReleaseDate') or '').split('-')[0].strip()] += 1
+            covers[gid][(r.get('CoverImageId') or '').strip()] += 1
+            externals[gid][(r.get('ExternalId') or '').strip()] += 1
+        return cls(GameRecord(game_id=gid,
+                              title=_most_common(titles[gid]),
+                              release_year=_most_common(dates[gid]),
+                              cover_image_id=_most_common(covers[gid]),
+                              external_id=_most_common(externals[gid]))
+                   for gid in titles)
+
+    @classmethod
+    def load(cls, path: Path) -> 'GameIndex':
+        with path.open('r', encoding='utf-8', newline='') as f:
+            return cls(GameRecord(game_id=int(r['GameId']), title=r['Title'], release_year=r['ReleaseYear'],
+                                  cover_image_id=r['CoverImageId'], external_id=r['ExternalId'])
+                       for r in csv.DictReader(f))
+
+    def save(self, path: Path) -> Path:
+        write_csv_atomic(path, GAMES_FIELDS, (
+            {'GameId': r.game_id, 'Title': r.title, 'ReleaseYear': r.release_year,
+             'CoverImageId': r.cover_image_id, 'ExternalId': r.external_id}
+            for r in (self.records[gid] for gid in sorted(self.records))))
+        return path
+
+
+def iter_latest_rows(root: Path) -> Iterable[Dict[str, str]]:
+    for list_dir in list_available_lists(root):
+        yield from read_picks_rows(pick_sources_for_list(list_dir))
+
+
+def build_game_index(root: Optional[Path] = None) -> GameIndex:
+    return GameIndex.from_rows(iter_latest_rows(root or script_root_list_dir()))
+
+
+def row_key(r: Dict[str, str]) -> Optional[GameKey]:
+    gid = parse_game_id(r.get('GameId'))
+    if gid is not None:
+        return gid
+    title = (r.get('Title') or '').strip()
+    return title or None
+
+
+def aggregate_rows_by_game(rows: Iterable[Dict[str, str]], games: GameIndex) -> List[Dict[str, object]]:
+    """Like `aggregate_rows`, but grouping on the integer GameId.
+
+    Display titles come from the game table, so a game listed under slightly
+    different titles by different sources is counted once.
+    """
+    # key -> [TotalScore, SeenSources, fallback title, fallback year]
+    agg: Dict[GameKey, List] = {}
+    for r in rows:
+        key = row_key(r)
+        if key is None:
+            continue
+        entry = agg.get(key)
+        if entry is None:
+            date = r.get('ReleaseDate', '') or ''
+            entry = agg[key] = [0, set(), (r.get('Title') or '').strip(), date.split('-')[0].strip()]
+        entry[0] += _to_score(r.get('Score', '0'))
+        entry[1].add(r.get('SourceFile') or '')
+
+    out: List[Dict[str, object]] = []
+    for key, (total, sources, title, year) in agg.items():
+        record = games.get(key) if isinstance(key, int) else None
+        if record is not None:
+            disp_title = record.display_title
+        else:
+            disp_title = f"{title} ({year})" if year else title
+        out.append({'Title': disp_title, 'TotalScore': total, 'ListsAppeared': len(sources)})
+    out.sort(key=lambda x: x['TotalScore'], reverse=True)
+    for i, row in enumerate(out, start=1):
+        row['Position'] = i
+    return out
+
+
+def aggregate_all_by_game(root: Optional[Path] = None,
+                          games: Optional[GameIndex] = None) -> Tuple[List[Dict[str, object]], GameIndex]:
+    root = root or script_root_list_dir()
+    rows = list(iter_latest_rows(root))
+    if games is None:
+        games = GameIndex.from_rows(rows)
+    return aggregate_rows_by_game(rows, games), games
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Build the game table and aggregate by GameId')
+    parser.add_argument('command', choices=['build', 'aggregate'])
+    parser.add_argument('--root', default=str(script_root_list_dir()), help='Root folder containing lists (default: list)')
+    parser.add_argument('--out', help='Game table path for build (default: <root>/.games.csv)')
+    parser.add_argument('--out-dir', help=f'Folder for the {AGGREGATED_FILE_NAME} of aggregate (default: repo root)')
+    args = parser.parse_args()
+
+    root = Path(args.root)
+    if not root.is_dir():
+        print(f"Invalid root: {root}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.command == 'build':
+        games = build_game_index(root)
+        out_path = games.save(Path(args.out) if args.out else root / GAMES_FILE_NAME)
+        print(f"Written: {out_path} ({len(games)} games)")
+        return
+
+    agg_rows, games = aggregate_all_by_game(root)
+    out_path = (Path(args.out_dir) if args.out_dir else root.parent) / AGGREGATED_FILE_NAME
+    write_csv_atomic(out_path, AGGREGATED_FIELDS, agg_rows)
+    print(f"Written: {out_path} ({len(agg_rows)} games)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+"""
+Opt-in timers and counters for the rebuild pipelines.
+
+Code marks its stages and counts what it does:
+
+    with stage('read', theme=list_dir.name):
+        rows = read_picks_rows(picks)
+        count('rows_parsed', len(rows))
+
+Counters are attributed to the theme of the innermost enclosing stage that
+has one, and also summed globally. While tracing is disabled (the default)
+`stage()` returns a shared no-op context manager and `count()` returns at
+once, so the instrumentation costs one function call per call site. Nothing
+is counted per row: call sites count per file or per theme.
+
+Enable it from the scripts with `--trace FILE` (JSON summary and events, or a
+Chrome trace-event file with `--trace-format chrome`, viewable in
+chrome://tracing or Perfetto), `--profile FILE` for a cProfile dump
+(`python -m pstats FILE`), or by setting `OVGD_TRACE=FILE`. Stages that run in
+worker processes (`--jobs N` > 1) are not recorded; use `--jobs 1` to trace
+them.
+"""
+
+from __future__ import annotations
+
+import argparse
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+TRACE_ENV = 'OVGD_TRACE'
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc: object) -> None:
+        return None
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Tracer:
+    def __init__(self) -> None:
+        self.enabled = False
+        self.origin = time.perf_counter()
+        self.events: List[Dict[str, object]] = []
+        self.counters: Dict[str, int] = {}
+        self.theme_counters: Dict[Tuple[str, str], int] = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def reset(self) -> None:
+        self.origin = time.perf_counter()
+        self.events = []
+        self.counters = {}
+        self.theme_counters = {}
+
+    def current_theme(self) -> Optional[str]:
+        themes = getattr(self.local, 'themes', None)
+        return themes[-1] if themes else None
+
+    def add(self, name: str, n: int) -> None:
+        theme = self.current_theme()
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+            if theme is not None:
+                key = (theme, name)
+                self.theme_counters[key] = self.theme_counters.get(key, 0) + n
+
+
+class _Stage:
+    __slots__ = ('tracer', 'name', 'theme', 'start')
+
+    def __init__(self, tracer: Tracer, name: str, theme: Optional[str]) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.theme = theme
+        self.start = 0.0
+
+    def __enter__(self) -> None:
+        if self.theme is not None:
+            themes = getattr(self.tracer.local, 'themes', None)
+            if themes is None:
+                themes = self.tracer.local.themes = []
+            themes.append(self.theme)
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc: object) -> None:
+        end = time.perf_counter()
+        tracer = self.tracer
+        theme = self.theme if self.theme is not None else tracer.current_theme()
+        if self.theme is not None:
+            tracer.local.themes.pop()
+        event = {'name': self.name, 'theme': theme, 'start': self.start - tracer.origin, 'duration': end - self.start,
+                 'pid': os.getpid(), 'tid': threading.get_ident()}
+        with tracer.lock:
+            tracer.events.append(event)
+
+
+TRACER = Tracer()
+
+
+def enable() -> None:
+    TRACER.reset()
+    TRACER.enabled = True
+
+
+def disable() -> None:
+    TRACER.enabled = False
+
+
+def stage(name: str, theme: Optional[str] = None):
+    """Context manager timing one stage (optionally for one theme)."""
+    if not TRACER.enabled:
+        return _NULL_STAGE
+    return _Stage(TRACER, name, theme)
+
+
+def count(name: str, n: int = 1) -> None:
+    if TRACER.enabled:
+        TRACER.add(name, n)
+
+
+def summary() -> Dict[str, object]:
+    """Per-stage totals, counters, and the same per theme."""
+    stages: Dict[str, Dict[str, float]] = {}
+    themes: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for e in TRACER.events:
+        for table in [stages] + ([themes.setdefault(e['theme'], {})] if e['theme'] else []):  # type: ignore[index]
+            s = table.setdefault(e['name'], {'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0})  # type: ignore[index]
+            ms = e['duration'] * 1000  # type: ignore[operator]
+            s['calls'] += 1
+            s['total_ms'] += ms
+            s['max_ms'] = max(s['max_ms'], ms)
+    per_theme: Dict[str, Dict[str, object]] = {t: {'stages': s, 'counters': {}} for t, s in themes.items()}
+    for (theme, name), value in TRACER.theme_counters.items():
+        per_theme.setdefault(theme, {'stages': {}, 'counters': {}})['counters'][name] = value  # type: ignore[index]
+    for table in [stages] + [t['stages'] for t in per_theme.values()]:  # type: ignore[misc]
+        for s in table.values():
+            s['total_ms'] = round(s['total_ms'], 3)
+            s['max_ms'] = round(s['max_ms'], 3)
+    return {'stages': stages, 'counters': dict(TRACER.counters), 'themes': dict(sorted(per_theme.items()))}
+
+
+def json_trace() -> Dict[str, object]:
+    return {**summary(), 'events': [{**e, 'start': round(e['start'] * 1000, 3),  # type: ignore[operator]
+                                     'duration': round(e['duration'] * 1000, 3)}  # type: ignore[operator]
+                                    for e in TRACER.events]}
+
+
+def chrome_trace() -> Dict[str, object]:
+    events: List[Dict[str, object]] = []
+    for e in TRACER.events:
+        item = {'name': e['name'], 'cat': 'stage', 'ph': 'X', 'ts': round(e['start'] * 1e6, 1),  # type: ignore[operator]
+                'dur': round(e['duration'] * 1e6, 1), 'pid': e['pid'], 'tid': e['tid']}  # type: ignore[operator]
+        if e['theme']:
+            item['args'] = {'theme': e['theme']}
+        events.append(item)
+    end = max((e['start'] + e['duration'] for e in TRACER.events), default=0.0)  # type: ignore[operator]
+    events.append({'name': 'counters', 'ph': 'C', 'ts': round(end * 1e6, 1), 'pid': os.getpid(), 'tid': 0,
+                   'args': dict(TRACER.counters)})
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+def write_trace(path: Path, fmt: str = 'json') -> Path:
+    data = chrome_trace() if fmt == 'chrome' else json_trace()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open('w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    return path
+
+
+def print_summary(file=sys.stderr) -> None:
+    s = summary()
+    for name, st in sorted(s['stages'].items(), key=lambda x: -x[1]['total_ms']):  # type: ignore[union-attr]
+        print(f"  {name:<24} {st['total_ms']:10.1f} ms  ({st['calls']} calls, max {st['max_ms']:.1f} ms)", file=file)
+    for name, value in sorted(s['counters'].items()):  # type: ignore[union-attr]
+        print(f"  {name:<24} {value:>12,}", file=file)
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    group = parser.add_argument_group('instrumentation')
+    group.add_argument('--trace', metavar='FILE', default=os.environ.get(TRACE_ENV),
+                       help=f'Write stage timings and counters to FILE (or set {TRACE_ENV})')
+    group.add_argument('--trace-format', choices=['json', 'chrome'], default='json',
+                       help='json: summary + events; chrome: trace-event file for chrome://tracing / Perfetto')
+    group.add_argument('--profile', metavar='FILE', help='Write a cProfile dump to FILE')
+
+
+@contextmanager
+def session(trace: Optional[str] = None, fmt: str = 'json', profile: Optional[str] = None) -> Iterator[None]:
+    """Trace and/or profile the enclosed block; a no-op when both are None."""
+    if not trace and not profile:
+        yield
+        return
+    profiler = cProfile.Profile() if profile else None
+    if trace:
+        enable()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(profile)
+            print(f"Profile written: {profile}", file=sys.stderr)
+        if trace:
+            disable()
+            write_trace(Path(trace), fmt)
+            print(f"Trace written: {trace}", file=sys.stderr)
+            print_summary()
+
+
+def session_from_args(args: argparse.Namespace):
+    return session(args.trace, args.trace_format, args.profile)
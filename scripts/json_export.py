@@ -0,0 +1,234 @@
+"""
+Paginated JSON exports of the aggregated lists, for pages that load lazily.
+
+For every list, and for the global list, `write_export` writes into its own
+folder under `pages/` (`pages/<theme>/` for a list, `pages/` itself for the
+global list):
+- `page-<n>.json`: `{"page": n, "items": [...]}` with `page_size` games per
+  page, in ranking order. An item has the columns of `aggregated-list.csv`
+  (`Position`, `Title`, `TotalScore`, `ListsAppeared`) plus its
+  `CoverImageId` and `Sources`: `[source index, position]` pairs, the
+  position the game has in each source of the list (for the global list, its
+  position in each list);
+- `search-<i>.json`: a prefix-searchable title index split into `shards`
+  files. Every title is indexed under the normalized text starting at each of
+  its words (`search_key`), so "zel" finds "The Legend of Zelda"; an entry is
+  `[key, position, title]`, entries are sorted by key, and a key lives in
+  shard `ord(key[0]) % shards`. A page normalizes the query the same way and
+  fetches only the one shard its first character maps to;
+- `index.json`: the list name, its sources, the number of games and pages,
+  the page size, the number of shards and a content key. js/list.js uses the
+  export when `index.json` exists and reads `aggregated-list.csv` otherwise.
+
+The scripts that rewrite an `aggregated-list.csv` without exporting
+(`rebuild_list.py`, `rebuild_all.py`, `generate_all_aggregates.py`, a build
+without `--json-pages`) remove the `index.json` of its export when the CSV
+changes (`drop_export`), so a page never shows an export older than the CSV.
+
+Generation is incremental: the key hashes the items and the settings, and a
+folder whose `index.json` has the same key is not written again. Page and
+shard files left over from a larger export are removed; `index.json` is
+written last, so an interrupted export is redone on the next build.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import unicodedata
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+from atomic_io import write_bytes_atomic
+from download_covers import base_title
+from instrument import count, stage
+
+
+EXPORT_DIR = 'pages'
+INDEX_NAME = 'index.json'
+EXPORT_VERSION = 3
+DEFAULT_PAGE_SIZE = 50
+DEFAULT_SEARCH_SHARDS = 16
+
+_WORD_RE = re.compile(r"[^\W_]+")
+_YEAR_RE = re.compile(r" \(\d{4}\)$")
+_EXPORT_FILE_RE = re.compile(r"^(?:page|search)-\d+\.json$")
+
+
+@dataclass
+class ExportOptions:
+    # Folder of the global export; lists go to <root>/<theme>
+    root: Path
+    page_size: int = DEFAULT_PAGE_SIZE
+    shards: int = DEFAULT_SEARCH_SHARDS
+
+
+def search_key(title: str) -> str:
+    """Lower-case words of `title` without accents or punctuation.
+
+    js/list.js normalizes queries the same way (NFKD, marks dropped, lower
+    case, runs of letters and digits joined by one space).
+    """
+    text = unicodedata.normalize('NFKD', title)
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    return ' '.join(_WORD_RE.findall(text))
+
+
+def shard_of(key: str, shards: int) -> int:
+    return ord(key[0]) % shards if key else 0
+
+
+def search_shards(items: List[Dict[str, object]], shards: int) -> List[List[list]]:
+    out: List[List[list]] = [[] for _ in range(shards)]
+    for item in items:
+        title = str(item['Title'])
+        words = search_key(title).split(' ')
+        # The release year closing the title is not a word start of its own
+        starts = len(words) - 1 if len(words) > 1 and _YEAR_RE.search(title) else len(words)
+        for i in range(starts):
+            key = ' '.join(words[i:])
+            if key:
+                out[shard_of(key, shards)].append([key, item['Position'], title])
+    for entries in out:
+        entries.sort(key=lambda e: (e[0], e[1]))
+    return out
+
+
+def _int(value: object) -> int:
+    try:
+        return int(float(value))  # type: ignore[arg-type]
+    except (TypeError, ValueError, OverflowError):
+        return 0
+
+
+def theme_items(rows: Iterable[Dict[str, str]], agg_rows: List[Dict[str, object]], sources: List[Dict[str, str]],
+                covers: Dict[str, str]) -> Tuple[List[Dict[str, object]], Dict[str, int]]:
+    """Export items of one list, and the position of each (stripped) title.
+
+    `sources` are the list's `about.csv` rows, whose order the `Sources`
+    indexes refer to; `covers` maps base titles to cover codes.
+    """
+    by_file = {Path(s['GeneratedCsvPath']).name: i for i, s in enumerate(sources)}
+    # Display title, as aggregate_rows renders it -> (title, source positions)
+    titles: Dict[str, Tuple[str, Dict[int, int]]] = {}
+    seen: Dict[str, Dict[int, int]] = {}
+    for r in rows:
+        title = (r.get('Title') or '').strip()
+        if not title:
+            continue
+        positions = seen.get(title)
+        if positions is None:
+            date = r.get('ReleaseDate', '')
+            year = (date.split('-')[0] if date else '').strip()
+            positions = seen[title] = {}
+            titles[f"{title} ({year})" if year else title] = (title, positions)
+        src = by_file.get(r.get('SourceFile') or '')
+        if src is not None and src not in positions:
+            positions[src] = _int(r.get('Position'))
+
+    items: List[Dict[str, object]] = []
+    by_title: Dict[str, int] = {}
+    for row in agg_rows:
+        title, positions = titles.get(str(row['Title']), (str(row['Title']), {}))
+        by_title[title] = int(row['Position'])  # type: ignore[call-overload]
+        items.append({'Position': row['Position'], 'Title': row['Title'], 'TotalScore': row['TotalScore'],
+                      'ListsAppeared': row['ListsAppeared'], 'CoverImageId': covers.get(base_title(title), ''),
+                      'Sources': sorted([i, p] for i, p in positions.items())})
+    return items, by_title
+
+
+def global_items(totals: Dict[str, list], agg_rows: List[Dict[str, object]],
+                 themes: List[Tuple[str, Dict[str, int], Dict[str, str]]]) -> List[Dict[str, object]]:
+    """Export items of the global list.
+
+    `totals` and `agg_rows` are the merged totals and their
+    `generate_all_aggregates.finalize` rows; `themes` holds, in list order,
+    each list's name, title positions and cover codes. `Sources` indexes
+    refer to that order.
+    """
+    # finalize sorts the totals stably by score: the same order gives the
+    # title behind each row
+    ordered = sorted(totals, key=lambda t: totals[t][0], reverse=True)
+    lists: Dict[str, List[List[int]]] = {}
+    for i, (_, positions, _) in enumerate(themes):
+        for title, position in positions.items():
+            lists.setdefault(title, []).append([i, position])
+    items: List[Dict[str, object]] = []
+    for position, (title, row) in enumerate(zip(ordered, agg_rows), start=1):
+        key = base_title(title)
+        cover = next((c[key] for _, _, c in themes if key in c), '')
+        items.append({'Position': position, 'Title': row['Title'], 'TotalScore': row['TotalScore'],
+                      'ListsAppeared': row['ListsAppeared'], 'CoverImageId': cover,
+                      'Sources': lists.get(title.strip(), [])})
+    return items
+
+
+def _render(data: object) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def write_export(out_dir: Path, meta: Dict[str, object], items: List[Dict[str, object]],
+                 options: ExportOptions) -> bool:
+    """Write the pages, search shards and index of one list; False when unchanged."""
+    page_size = max(1, options.page_size)
+    shards = max(1, options.shards)
+    key = hashlib.sha256(_render([EXPORT_VERSION, page_size, shards, meta, items])).hexdigest()
+    index_path = out_dir / INDEX_NAME
+    try:
+        with index_path.open('r', encoding='utf-8') as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = None
+    if isinstance(previous, dict) and previous.get('key') == key:
+        count('exports_unchanged')
+        return False
+
+    with stage('export'):
+        out_dir.mkdir(parents=True, exist_ok=True)
+        names = set()
+        pages = [items[i:i + page_size] for i in range(0, len(items), page_size)] or [[]]
+        for n, page in enumerate(pages, start=1):
+            names.add(f"page-{n}.json")
+            write_bytes_atomic(out_dir / f"page-{n}.json", _render({'page': n, 'items': page}))
+        for i, entries in enumerate(search_shards(items, shards)):
+            names.add(f"search-{i}.json")
+            write_bytes_atomic(out_dir / f"search-{i}.json", _render(entries))
+        for name in os.listdir(out_dir):
+            if _EXPORT_FILE_RE.match(name) and name not in names:
+                os.unlink(out_dir / name)
+        write_bytes_atomic(index_path, _render({**meta, 'total': len(items), 'pageSize': page_size,
+                                                'pages': len(pages), 'searchShards': shards, 'key': key}))
+    count('exports_written')
+    return True
+
+
+def drop_export(out_dir: Path) -> bool:
+    """Remove the `index.json` of the export in `out_dir`; False when there is none.
+
+    Pages then read the CSV until the folder is exported again.
+    """
+    try:
+        os.unlink(out_dir / INDEX_NAME)
+    except FileNotFoundError:
+        return False
+    count('exports_dropped')
+    return True
+
+
+def remove_stale_exports(options: ExportOptions, themes: Iterable[str]) -> List[str]:
+    """Remove the export folders of lists that are gone."""
+    keep = set(themes)
+    removed: List[str] = []
+    try:
+        entries = list(os.scandir(options.root))
+    except FileNotFoundError:
+        return removed
+    for entry in entries:
+        if entry.is_dir() and entry.name not in keep and os.path.exists(os.path.join(entry.path, INDEX_NAME)):
+            shutil.rmtree(entry.path)
+            removed.append(entry.name)
+    return removed
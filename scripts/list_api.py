@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+"""
+Local read-only HTTP API over the aggregated lists.
+
+Routes (GET and HEAD):
+- `/list/_manifest.json`, `/api/manifest.json`: the manifest used by the pages
+  (the file written by `generate-manifest.mjs`, or the same shape computed
+  from the folders when it is missing);
+- `/list/<theme>/aggregated-list.csv`, `/list/<theme>/about.csv`: the raw files,
+  so `index.html` / `list.html` can be pointed at the service unchanged;
+- `/api/lists/<theme>.json` / `.csv`: the aggregated ranking (JSON also
+  carries the sources from `about.csv`);
+- `/api/games/<GameId>.json` / `.csv` and `/api/titles/<title>.json` / `.csv`:
+  every theme and source ranking one game (latest snapshots), answered from
+  the corpus database of `corpus_db.py`.
+
+Manifest and list payloads are rendered at startup together with their
+gzip (and brotli, when the `brotli` package is installed) encodings. Game
+views are rendered on first request and kept in an LRU; lookups that find
+nothing are not cached. Every representation has a strong ETag (a hash of the
+body, suffixed per encoding); a matching `If-None-Match` gets
+`304 Not Modified`.
+
+At most once per `--check-interval` seconds, a request first stats the list
+files: the payloads of a list whose `aggregated-list.csv` or `about.csv`
+changed are rendered again, and the manifest follows a changed
+`_manifest.json` or set of lists. The corpus database is rebuilt when
+`corpus_db.db_is_current` finds its files changed, which also empties the LRU.
+The server runs these checks, and the database builds, in a worker thread
+(`ListApi.prepare`), so other clients are still served meanwhile; requests
+arriving during a check wait for that one instead of starting their own.
+
+A request that fails (an unreadable list file, a database error) gets
+`500 Internal Server Error` and is logged; a malformed or oversized request
+line gets `400 Bad Request`.
+
+Usage examples:
+- Serve on http://127.0.0.1:8000:   python scripts/list_api.py
+- Other address:                   python scripts/list_api.py --host 0.0.0.0 --port 8080
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import gzip
+import hashlib
+import io
+import json
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+from corpus_db import DB_FILE_NAME, CorpusDB, build_db, db_is_current
+from rebuild_all import stat_entry
+from rebuild_list import list_available_lists, script_root_list_dir
+
+try:
+    import brotli  # type: ignore[import-not-found]
+except ImportError:  # optional
+    brotli = None
+
+
+MIN_COMPRESS_SIZE = 256
+DEFAULT_LRU_SIZE = 1024
+DEFAULT_CHECK_INTERVAL = 1.0
+MAX_HEADER_LINES = 100
+CONTENT_TYPES = {'json': 'application/json; charset=utf-8', 'csv': 'text/csv; charset=utf-8'}
+REASONS = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           500: 'Internal Server Error'}
+GAME_PREFIXES = ('/api/games/', '/api/titles/')
+
+
+@dataclass
+class Payload:
+    body: bytes
+    content_type: str
+    etag: str                     # strong ETag of the identity body
+    encodings: Dict[str, bytes]   # 'br' / 'gzip' -> compressed body
+
+    @classmethod
+    def build(cls, body: bytes, content_type: str) -> 'Payload':
+        encodings: Dict[str, bytes] = {}
+        if len(body) >= MIN_COMPRESS_SIZE:
+            candidates = {'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                candidates['br'] = brotli.compress(body, quality=11)
+            encodings = {name: data for name, data in candidates.items() if len(data) < len(body)}
+        return cls(body, content_type, '"%s"' % hashlib.sha256(body).hexdigest()[:32], encodings)
+
+    def etag_for(self, encoding: Optional[str]) -> str:
+        # Each encoding is a different representation, so it gets its own tag
+        return self.etag if encoding is None else f'{self.etag[:-1]}-{encoding}"'
+
+    def matches(self, if_none_match: str) -> bool:
+        tags = {t.strip() for t in if_none_match.split(',')}
+        if '*' in tags:
+            return True
+        known = {self.etag_for(None), *(self.etag_for(e) for e in self.encodings)}
+        return any((t[2:] if t.startswith('W/') else t) in known for t in tags)
+
+
+def render_csv(fieldnames: List[str], rows: List[Dict[str, object]]) -> bytes:
+    buf = io.StringIO(newline='')
+    writer = csv.DictWriter(buf, fieldnames=fieldnames, extrasaction='ignore')
+    writer.writeheader()
+    writer.writerows(rows)
+    return buf.getvalue().encode('utf-8')
+
+
+def render_json(data: object) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def read_csv_rows(path: Path) -> List[Dict[str, str]]:
+    with path.open('r', encoding='utf-8', newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def _int(value: str) -> object:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def parse_accept_encoding(header: str) -> List[str]:
+    accepted: List[str] = []
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        if params.strip().startswith('q='):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if name and q > 0:
+            accepted.append(name.strip().lower())
+    return accepted
+
+
+class LRUCache:
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.items: 'OrderedDict[str, Optional[Payload]]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_create(self, key: str, create: Callable[[], Optional[Payload]]) -> Optional[Payload]:
+        if key in self.items:
+            self.items.move_to_end(key)
+            self.hits += 1
+            return self.items[key]
+        self.misses += 1
+        value = create()
+        if value is None:
+            # Not cached: the key may exist once the database is rebuilt, and
+            # arbitrary missing keys would evict the views worth keeping
+            return None
+        self.items[key] = value
+        if len(self.items) > self.capacity:
+            self.items.popitem(last=False)
+        return value
+
+
+class ListApi:
+    """Routes requests to precomputed payloads; independent of the transport."""
+
+    def __init__(self, root: Path, db_path: Optional[Path] = None, lru_size: int = DEFAULT_LRU_SIZE,
+                 check_interval: float = DEFAULT_CHECK_INTERVAL) -> None:
+        self.root = root
+        self.db_path = db_path or root / DB_FILE_NAME
+        self.static: Dict[str, Payload] = {}
+        self.games = LRUCache(lru_size)
+        self.check_interval = check_interval
+        self._db: Optional[CorpusDB] = None
+        # theme -> (stats of its files, payloads); manifest the same way
+        self._themes: Dict[str, Tuple[tuple, Dict[str, Payload]]] = {}
+        self._manifest: Optional[Tuple[tuple, Payload]] = None
+        self._checked = time.monotonic()
+        # The check running in a worker thread, shared by concurrent requests
+        self._pending: Optional[asyncio.Task] = None
+        self.load()
+
+    def theme_payloads(self, list_dir: Path) -> Dict[str, Payload]:
+        theme = list_dir.name
+        agg_path = list_dir / 'aggregated-list.csv'
+        payloads: Dict[str, Payload] = {}
+        raw = agg_path.read_bytes()
+        rows = read_csv_rows(agg_path)
+        payloads[f'/list/{theme}/aggregated-list.csv'] = Payload.build(raw, CONTENT_TYPES['csv'])
+        payloads[f'/api/lists/{theme}.csv'] = payloads[f'/list/{theme}/aggregated-list.csv']
+        sources: List[Dict[str, str]] = []
+        about_path = list_dir / 'about.csv'
+        if about_path.exists():
+            payloads[f'/list/{theme}/about.csv'] = Payload.build(about_path.read_bytes(), CONTENT_TYPES['csv'])
+            sources = read_csv_rows(about_path)
+        payloads[f'/api/lists/{theme}.json'] = Payload.build(render_json({
+            'name': theme,
+            'sources': sources,
+            'games': [{k: _int(v) if k != 'Title' else v for k, v in r.items()} for r in rows],
+        }), CONTENT_TYPES['json'])
+        return payloads
+
+    def load(self) -> int:
+        """Render the payloads of new or changed files; the number of lists rendered."""
+        static: Dict[str, Payload] = {}
+        themes: Dict[str, Tuple[tuple, Dict[str, Payload]]] = {}
+        rendered = 0
+        for list_dir in list_available_lists(self.root):
+            stamp = (stat_entry(list_dir / 'aggregated-list.csv'), stat_entry(list_dir / 'about.csv'))
+            if stamp[0] is None:
+                continue
+            theme = list_dir.name
+            previous = self._themes.get(theme)
+            if previous is not None and previous[0] == stamp:
+                payloads = previous[1]
+            else:
+                payloads = self.theme_payloads(list_dir)
+                rendered += 1
+            themes[theme] = (stamp, payloads)
+            static.update(payloads)
+
+        manifest_path = self.root / '_manifest.json'
+        stamp = (stat_entry(manifest_path), tuple(sorted(themes)))
+        if self._manifest is not None and self._manifest[0] == stamp:
+            manifest = self._manifest[1]
+        elif stamp[0] is not None:
+            manifest = Payload.build(manifest_path.read_bytes(), CONTENT_TYPES['json'])
+        else:
+            manifest = Payload.build(render_json({'lists': sorted(themes)}), CONTENT_TYPES['json'])
+        static['/list/_manifest.json'] = static['/api/manifest.json'] = manifest
+        self._manifest = (stamp, manifest)
+        self._themes = themes
+        self.static = static
+        return rendered
+
+    def refresh(self) -> None:
+        """Pick up rebuilt lists and snapshots, at most once per `check_interval`."""
+        now = time.monotonic()
+        if now - self._checked < self.check_interval:
+            return
+        self._checked = now
+        self.load()
+        if self._db is not None and not db_is_current(self.root, self.db_path):
+            self._db.close()
+            self._db = None
+            self.games.items.clear()
+
+    def _check(self, need_db: bool) -> Tuple[bool, Optional[CorpusDB]]:
+        # Blocking part of a refresh, run in a worker thread: renders changed
+        # lists and opens (building it if needed) a database to swap in. The
+        # open one is left to the event loop, which may be reading it
+        self.load()
+        stale = self._db is not None and not db_is_current(self.root, self.db_path)
+        if not need_db or (self._db is not None and not stale):
+            return stale, None
+        if not db_is_current(self.root, self.db_path):
+            build_db(self.root, self.db_path)
+        return stale, CorpusDB(self.db_path)
+
+    async def _run_check(self, need_db: bool) -> None:
+        try:
+            stale, db = await asyncio.to_thread(self._check, need_db)
+            if stale and self._db is not None:
+                self._db.close()
+                self._db = None
+                self.games.items.clear()
+            if db is not None:
+                if self._db is None:
+                    self._db = db
+                else:
+                    db.close()
+        finally:
+            self._pending = None
+
+    async def prepare(self, target: str) -> None:
+        """Do off the event loop what `lookup` would do first for `target`:
+        the refresh when one is due, and opening or building the database
+        for a game view."""
+        need_db = unquote(urlsplit(target).path).startswith(GAME_PREFIXES)
+        while True:
+            due = time.monotonic() - self._checked >= self.check_interval
+            if self._pending is None:
+                if not due and not (need_db and self._db is None):
+                    return
+                self._checked = time.monotonic()
+                self._pending = asyncio.get_running_loop().create_task(self._run_check(need_db))
+            await asyncio.shield(self._pending)
+            if not need_db or self._db is not None:
+                return
+
+    @property
+    def db(self) -> CorpusDB:
+        if self._db is None:
+            if not db_is_current(self.root, self.db_path):
+                build_db(self.root, self.db_path)
+            self._db = CorpusDB(self.db_path)
+        return self._db
+
+    def game_payload(self, kind: str, key: str, fmt: str) -> Optional[Payload]:
+        if kind == 'games':
+            try:
+                rows = self.db.game_rankings(game_id=int(key))
+            except ValueError:
+                return None
+        else:
+            rows = self.db.game_rankings(title=key)
+        if not rows:
+            return None
+        if fmt == 'csv':
+            return Payload.build(render_csv(list(rows[0]), rows), CONTENT_TYPES['csv'])
+        return Payload.build(render_json({'gameId': rows[0]['game_id'], 'title': rows[0]['title'],
+                                          'rankings': rows}), CONTENT_TYPES['json'])
+
+    def lookup(self, path: str, refresh: bool = True) -> Optional[Payload]:
+        if refresh:
+            self.refresh()
+        payload = self.static.get(path)
+        if payload is not None:
+            return payload
+        for kind in ('games', 'titles'):
+            prefix = f'/api/{kind}/'
+            if path.startswith(prefix):
+                key, dot, fmt = path[len(prefix):].rpartition('.')
+                if not dot or fmt not in CONTENT_TYPES or not key:
+                    return None
+                return self.games.get_or_create(f'{kind}/{key}.{fmt}', lambda: self.game_payload(kind, key, fmt))
+        return None
+
+    def respond(self, method: str, target: str, headers: Dict[str, str],
+                refresh: bool = True) -> Tuple[int, Dict[str, str], bytes]:
+        """Status, headers and body; `refresh` off when `prepare` ran first."""
+        if method not in ('GET', 'HEAD'):
+            return 405, {'Allow': 'GET, HEAD', 'Content-Type': 'text/plain'}, b'Method Not Allowed\n'
+        payload = self.lookup(unquote(urlsplit(target).path), refresh)
+        if payload is None:
+            return 404, {'Content-Type': 'text/plain'}, b'Not Found\n'
+
+        encoding: Optional[str] = None
+        accepted = parse_accept_encoding(headers.get('accept-encoding', ''))
+        for name in ('br', 'gzip'):
+            if name in payload.encodings and name in accepted:
+                encoding = name
+                break
+        out_headers = {
+            'Content-Type': payload.content_type,
+            'ETag': payload.etag_for(encoding),
+            'Cache-Control': 'no-cache',
+            'Vary': 'Accept-Encoding',
+        }
+        if 'if-none-match' in headers and payload.matches(headers['if-none-match']):
+            return 304, out_headers, b''
+        if encoding is not None:
+            out_headers['Content-Encoding'] = encoding
+            return 200, out_headers, payload.encodings[encoding]
+        return 200, out_headers, payload.body
+
+
+def encode_response(status: int, headers: Dict[str, str], body: bytes, head_only: bool, keep_alive: bool) -> bytes:
+    lines = [f'HTTP/1.1 {status} {REASONS.get(status, "")}']
+    lines.extend(f'{name}: {value}' for name, value in headers.items())
+    if status != 304:
+        lines.append(f'Content-Length: {len(body)}')
+    if not keep_alive:
+        lines.append('Connection: close')
+    head = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+    return head if head_only or status == 304 else head + body
+
+
+async def read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, str, Dict[str, str]]]:
+    """Method, target, version and headers; None at the end of the stream.
+
+    Raises ValueError for a malformed request or a line over the stream limit.
+    """
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    parts = request_line.decode('latin-1').split()
+    if len(parts) != 3:
+        raise ValueError('malformed request line')
+    method, target, version = parts
+    headers: Dict[str, str] = {}
+    for _ in range(MAX_HEADER_LINES):
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    return method, target, version, headers
+
+
+async def handle_connection(api: ListApi, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        while True:
+            try:
+                request = await read_request(reader)
+            except ValueError:
+                writer.write(encode_response(400, {'Content-Type': 'text/plain'}, b'Bad Request\n', False, False))
+                break
+            if request is None:
+                break
+            method, target, version, headers = request
+            connection = headers.get('connection', '').lower()
+            keep_alive = connection != 'close' and (version != 'HTTP/1.0' or connection == 'keep-alive')
+            try:
+                await api.prepare(target)
+                status, out_headers, body = api.respond(method, target, headers, refresh=False)
+            except Exception as exc:
+                # One failing request never takes the connection down unanswered
+                print(f"Error serving {method} {target}: {exc.__class__.__name__}: {exc}", file=sys.stderr, flush=True)
+                status, out_headers, body = 500, {'Content-Type': 'text/plain'}, b'Internal Server Error\n'
+                keep_alive = False
+            writer.write(encode_response(status, out_headers, body, method == 'HEAD', keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(api: ListApi, host: str, port: int, ready: Optional[Callable[[int], None]] = None) -> None:
+    server = await asyncio.start_server(lambda r, w: handle_connection(api, r, w), host, port)
+    bound_port = server.sockets[0].getsockname()[1]
+    if ready is not None:
+        ready(bound_port)
+    async with server:
+        await server.serve_forever()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Serve the aggregated lists over HTTP')
+    parser.add_argument('--root', default=str(script_root_list_dir()), help='Root folder containing lists (default: list)')
+    parser.add_argument('--db', help=f'Corpus database (default: <root>/{DB_FILE_NAME}, built when missing or stale)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000, help='Port (0 picks a free one)')
+    parser.add_argument('--lru-size', type=int, default=DEFAULT_LRU_SIZE, help='Cached game views')
+    parser.add_argument('--check-interval', type=float, default=DEFAULT_CHECK_INTERVAL,
+                        help='Seconds between checks for changed lists and snapshots (0: every request)')
+    args = parser.parse_args()
+
+    root = Path(args.root)
+    if not root.is_dir():
+        print(f"Invalid root: {root}", file=sys.stderr)
+        sys.exit(1)
+    api = ListApi(root, Path(args.db) if args.db else None, args.lru_size, args.check_interval)
+    encodings = 'br, gzip' if brotli is not None else 'gzip'
+
+    def ready(port: int) -> None:
+        print(f"Serving {len(api.static)} payloads ({encodings}) on http://{args.host}:{port}", flush=True)
+
+    try:
+        asyncio.run(serve(api, args.host, args.port, ready))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Rebuild `aggregated-list.csv` and `about.csv` for every list under `list/`
+without prompting, skipping lists whose inputs did not change since the last
+run.
+
+The same logic as `rebuild_list.py` is used per list (latest CSV per source).
+A build cache kept at `list/.buildcache.json` records, for every list, the
+chosen source CSVs (path, size, mtime and SHA-256 of the content) and the
+size/mtime of the outputs written. On the next run a list is only rebuilt when:
+- the set of chosen source CSVs changed (new snapshot, new/removed source);
+- the content hash of a chosen CSV changed (hashes are only recomputed when
+  size or mtime differ from the cached values);
+- one of the outputs was removed or modified by hand.
+
+Usage examples:
+- Rebuild what changed:        python scripts/rebuild_all.py
+- Rebuild everything:          python scripts/rebuild_all.py --force
+- Use 8 worker processes:      python scripts/rebuild_all.py --jobs 8
+- Custom lists root:           python scripts/rebuild_all.py --root list
+"""
+
+from __future__ import annotations
+
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from instrument import add_arguments, session_from_args, stage
+from rebuild_list import (
+    SourcePick,
+    get_index,
+    list_available_lists,
+    pick_sources_for_list,
+    rebuild,
+    script_root_list_dir,
+)
+
+
+BUILD_CACHE_NAME = '.buildcache.json'
+CACHE_VERSION = 1
+OUTPUT_NAMES = ('aggregated-list.csv', 'about.csv')
+
+
+@dataclass
+class RebuildSummary:
+    rebuilt: List[str] = field(default_factory=list)
+    skipped: List[str] = field(default_factory=list)
+    empty: List[str] = field(default_factory=list)
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open('rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_build_cache(root: Path) -> Dict[str, Dict[str, object]]:
+    path = root / BUILD_CACHE_NAME
+    try:
+        with path.open('r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get('version') != CACHE_VERSION:
+        return {}
+    lists = data.get('lists')
+    return lists if isinstance(lists, dict) else {}
+
+
+def save_build_cache(root: Path, lists: Dict[str, Dict[str, object]]) -> Path:
+    path = root / BUILD_CACHE_NAME
+    payload = {'version': CACHE_VERSION, 'lists': dict(sorted(lists.items()))}
+    tmp = path.with_name(path.name + '.tmp')
+    with tmp.open('w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=1, sort_keys=True)
+    tmp.replace(path)
+    return path
+
+
+def stat_entry(path: Path) -> Optional[Dict[str, int]]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def fingerprint_sources(list_dir: Path, picks: List[SourcePick],
+                        previous: List[Dict[str, object]]) -> List[Dict[str, object]]:
+    # Reuse the cached hash when size and mtime are unchanged
+    known = {str(e.get('path')): e for e in previous}
+    out: List[Dict[str, object]] = []
+    for p in picks:
+        rel_path = p.csv_path.relative_to(list_dir).as_posix()
+        st = stat_entry(p.csv_path) or {'size': -1, 'mtime_ns': -1}
+        prev = known.get(rel_path)
+        if prev and prev.get('size') == st['size'] and prev.get('mtime_ns') == st['mtime_ns']:
+            sha = prev.get('sha256')
+        else:
+            sha = file_sha256(p.csv_path)
+        out.append({'name': p.name, 'path': rel_path, 'sha256': sha, **st})
+    return out
+
+
+def fingerprint_outputs(list_dir: Path) -> Dict[str, Optional[Dict[str, int]]]:
+    return {name: stat_entry(list_dir / name) for name in OUTPUT_NAMES}
+
+
+def sources_key(sources: List[Dict[str, object]]) -> List[tuple]:
+    return [(s['name'], s['path'], s['sha256']) for s in sources]
+
+
+def is_up_to_date(list_dir: Path, entry: Dict[str, object], sources: List[Dict[str, object]]) -> bool:
+    if sources_key(list(entry.get('sources') or [])) != sources_key(sources):
+        return False
+    outputs = fingerprint_outputs(list_dir)
+    if any(st is None for st in outputs.values()):
+        return False
+    return outputs == entry.get('outputs')
+
+
+def rebuild_picks(job: Tuple[Path, List[SourcePick]]) -> Path:
+    list_dir, picks = job
+    rebuild(list_dir, picks)
+    return list_dir
+
+
+def map_in_order(fn: Callable, items: List, jobs: int) -> Iterator:
+    # Results are yielded in input order whatever the number of workers
+    if jobs <= 1:
+        yield from map(fn, items)
+        return
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as ex:
+        yield from ex.map(fn, items, chunksize=1)
+
+
+def rebuild_all(root: Optional[Path] = None, force: bool = False, verbose: bool = False,
+                jobs: int = 1) -> RebuildSummary:
+    root = root or script_root_list_dir()
+    cache = {} if force else load_build_cache(root)
+    new_cache: Dict[str, Dict[str, object]] = {}
+    summary = RebuildSummary()
+
+    # Scanning and hashing is cheap; only the stale lists go to the workers
+    stale: List[Tuple[Path, List[SourcePick]]] = []
+    stale_sources: Dict[str, List[Dict[str, object]]] = {}
+    for list_dir in list_available_lists(root):
+        with stage('scan', theme=list_dir.name):
+            picks = pick_sources_for_list(list_dir)
+        if not picks:
+            summary.empty.append(list_dir.name)
+            continue
+        entry = cache.get(list_dir.name) or {}
+        with stage('fingerprint', theme=list_dir.name):
+            sources = fingerprint_sources(list_dir, picks, list(entry.get('sources') or []))
+        if entry and is_up_to_date(list_dir, entry, sources):
+            summary.skipped.append(list_dir.name)
+            new_cache[list_dir.name] = {'sources': sources, 'outputs': entry['outputs']}
+            continue
+        stale.append((list_dir, picks))
+        stale_sources[list_dir.name] = sources
+
+    for list_dir in map_in_order(rebuild_picks, stale, jobs):
+        summary.rebuilt.append(list_dir.name)
+        new_cache[list_dir.name] = {'sources': stale_sources[list_dir.name],
+                                    'outputs': fingerprint_outputs(list_dir)}
+        if verbose:
+            print(f"Rebuilt: {list_dir.name}")
+
+    if new_cache != cache or force:
+        save_build_cache(root, new_cache)
+    get_index(root).save()
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Rebuild every list whose sources changed')
+    parser.add_argument('--root', default=str(script_root_list_dir()), help='Root folder containing lists (default: list)')
+    parser.add_argument('--force', action='store_true', help='Ignore the build cache and rebuild every list')
+    parser.add_argument('--jobs', type=int, default=1, help='Number of worker processes (default: 1)')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Print each rebuilt list')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    root = Path(args.root)
+    if not root.exists() or not root.is_dir():
+        print(f"Invalid root: {root}", file=sys.stderr)
+        sys.exit(1)
+
+    with session_from_args(args):
+        summary = rebuild_all(root, force=args.force, verbose=args.verbose, jobs=args.jobs)
+    print(f"Rebuilt {len(summary.rebuilt)} lists, {len(summary.skipped)} up to date, "
+          f"{len(summary.empty)} without sources.")
+
+
+if __name__ == '__main__':
+    main()
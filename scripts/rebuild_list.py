@@ -11,7 +11,7 @@ Source detection:
 - Otherwise, top-level CSVs are grouped by the inferred source name from the
   pattern "<source> - <timestamp>.csv" and the newest CSV of each group is used.
 
-Outputs:
+Outputs (written atomically, and left untouched when the content is unchanged):
 - `aggregated-list.csv` columns: Position, Title, TotalScore, ListsAppeared
 - `about.csv` columns: SourceName, SourceURL, SourceId, GeneratedCsvPath
   - SourceName/URL/Id are preserved from an existing `about.csv` when present;
@@ -22,92 +22,61 @@ Outputs:
 
 from __future__ import annotations
 
+import argparse
 import csv
-import re
 import sys
-from collections import defaultdict
-from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict, Iterable, List, Optional, Tuple
 
-
-TIMESTAMP_RE = re.compile(r" - (\d{4})-(\d{2})-(\d{2})_(\d{2})-(\d{2})-(\d{2})\.csv$")
-
-
-@dataclass
-class SourcePick:
-    name: str                 # source name (e.g., 'ign', 'gamesradar+')
-    csv_path: Path            # absolute path to the chosen CSV
+from atomic_io import write_csv_atomic
+from instrument import add_arguments, count, session_from_args, stage
+from source_index import (
+    TIMESTAMP_RE,
+    SourcePick,
+    get_index,
+    parse_source_from_filename,
+    parse_timestamp_from_filename,
+)
+
+# The source_index names are re-exported: they used to live here and the
+# other scripts still import them from this module
+__all__ = [
+    'TIMESTAMP_RE',
+    'SourcePick',
+    'get_index',
+    'parse_source_from_filename',
+    'parse_timestamp_from_filename',
+    'script_root_list_dir',
+    'latest_csv_in_dir',
+    'pick_sources_for_list',
+    'read_source_rows',
+    'aggregate_rows',
+    'write_aggregated',
+    'load_existing_about',
+    'about_rows',
+    'write_about',
+    'read_picks_rows',
+    'rebuild',
+    'list_available_lists',
+    'prompt_choice',
+    'main',
+    'rebuild_interactive',
+]
 
 
 def script_root_list_dir() -> Path:
     return Path(__file__).resolve().parent.parent / 'list'
 
 
-def parse_source_from_filename(filename: str) -> Optional[str]:
-    name = Path(filename).name
-    if not name.lower().endswith('.csv'):
-        return None
-    stem = name[:-4]
-    if ' - ' in stem:
-        return stem.split(' - ', 1)[0].strip()
-    return None
-
-
-def parse_timestamp_from_filename(filename: str) -> Optional[Tuple[int, int, int, int, int, int]]:
-    m = TIMESTAMP_RE.search(filename)
-    if not m:
-        return None
-    return tuple(int(x) for x in m.groups())  # type: ignore[return-value]
-
-
 def latest_csv_in_dir(dir_path: Path) -> Optional[Path]:
-    files = [p for p in dir_path.iterdir() if p.is_file() and p.suffix.lower() == '.csv']
-    files = [p for p in files if p.name.lower() not in {'aggregated-list.csv', 'about.csv'}]
-    if not files:
-        return None
-
     # Prefer files with a timestamp in the filename; otherwise fall back to mtime
-    with_ts = [p for p in files if parse_timestamp_from_filename(p.name)]
-    if with_ts:
-        return max(with_ts, key=lambda p: parse_timestamp_from_filename(p.name))
-    # Fallback to mtime when no timestamped files are found
-    return max(files, key=lambda p: p.stat().st_mtime)
+    return get_index(dir_path.parent.parent).latest_in_dir(dir_path)
 
 
 def pick_sources_for_list(list_dir: Path) -> List[SourcePick]:
-    # Case 1: source-per-subfolder
-    source_dirs = [p for p in list_dir.iterdir() if p.is_dir()]
-    picks: List[SourcePick] = []
-    if source_dirs:
-        for sdir in sorted(source_dirs, key=lambda p: p.name.lower()):
-            latest = latest_csv_in_dir(sdir)
-            if latest is None:
-                continue
-            picks.append(SourcePick(name=sdir.name, csv_path=latest))
-        if picks:
-            return picks
-
-    # Case 2: top-level CSVs (no subfolders)
-    files = [p for p in list_dir.iterdir() if p.is_file() and p.suffix.lower() == '.csv']
-    files = [p for p in files if p.name.lower() not in {'aggregated-list.csv', 'about.csv'}]
-    groups: Dict[str, List[Path]] = defaultdict(list)
-    for f in files:
-        src = parse_source_from_filename(f.name)
-        if not src:
-            continue
-        groups[src].append(f)
-    for src_name, paths in groups.items():
-        # Choose the most recent by timestamp, falling back to mtime
-        with_ts = [p for p in paths if parse_timestamp_from_filename(p.name)]
-        if with_ts:
-            chosen = max(with_ts, key=lambda p: parse_timestamp_from_filename(p.name))
-        else:
-            chosen = max(paths, key=lambda p: p.stat().st_mtime)
-        picks.append(SourcePick(name=src_name, csv_path=chosen))
-    # Sort by name for deterministic output
-    picks.sort(key=lambda x: x.name.lower())
-    return picks
+    # Subfolder per source, or top-level CSVs grouped by source name; sorted
+    # by name for deterministic output (see source_index.py)
+    return get_index(list_dir.parent).picks(list_dir)
 
 
 def read_source_rows(csv_path: Path) -> Iterable[Dict[str, str]]:
@@ -118,57 +87,78 @@ def read_source_rows(csv_path: Path) -> Iterable[Dict[str, str]]:
 
 
 def aggregate_rows(rows: Iterable[Dict[str, str]]) -> List[Dict[str, object]]:
-    agg: Dict[str, Dict[str, object]] = {}
-    for r in rows:
-        title = r.get('Title', '').strip()
-        if not title:
-            continue
-        # Score may come as string/float/int - normalize to int
-        score_val = r.get('Score', '0')
-        try:
-            score = int(float(score_val))
-        except Exception:
-            score = 0
-        entry = agg.setdefault(title, {'TotalScore': 0, 'ListsAppeared': 0, 'ReleaseYear': None, 'SeenSources': set()})
-        entry['TotalScore'] = int(entry['TotalScore']) + score
-        # Count appearances per source file; caller ensures uniqueness per source
-        src_marker = r.get('SourceFile') or ''
-        if src_marker not in entry['SeenSources']:
-            entry['SeenSources'].add(src_marker)
-            entry['ListsAppeared'] = int(entry['ListsAppeared']) + 1
-        if entry['ReleaseYear'] is None:
-            date = r.get('ReleaseDate', '')
-            year = (date.split('-')[0] if date else '').strip()
-            entry['ReleaseYear'] = year or ''
+    # Title -> [TotalScore, ListsAppeared, ReleaseYear, last source id, source
+    # ids seen]. Source files are coded as ints; rows of one source usually
+    # come together, so the set is only created for titles in several sources
+    agg: Dict[str, list] = {}
+    source_ids: Dict[str, int] = {}
+    with stage('aggregate'):
+        for r in rows:
+            title = r.get('Title', '').strip()
+            if not title:
+                continue
+            # Score may come as string/float/int - normalize to int
+            score_val = r.get('Score', '0')
+            try:
+                score = int(float(score_val))
+            except Exception:
+                score = 0
+                count('invalid_scores')
+            # Count appearances per source file; caller ensures uniqueness per source
+            src_marker = r.get('SourceFile') or ''
+            src = source_ids.get(src_marker)
+            if src is None:
+                src = source_ids[src_marker] = len(source_ids)
+            entry = agg.get(title)
+            if entry is None:
+                date = r.get('ReleaseDate', '')
+                year = (date.split('-')[0] if date else '').strip()
+                agg[title] = [score, 1, year, src, None]
+                continue
+            entry[0] += score
+            if src != entry[3]:
+                seen = entry[4]
+                if seen is None:
+                    seen = entry[4] = {entry[3]}
+                if src not in seen:
+                    seen.add(src)
+                    entry[1] += 1
+                entry[3] = src
 
     out: List[Dict[str, object]] = []
-    for title, data in agg.items():
-        year = str(data.get('ReleaseYear') or '').strip()
-        disp_title = f"{title} ({year})" if year else title
-        out.append({
-            'Title': disp_title,
-            'TotalScore': int(data['TotalScore']),
-            'ListsAppeared': int(data['ListsAppeared']),
-        })
-    out.sort(key=lambda x: x['TotalScore'], reverse=True)
-    # Add Position
-    for i, row in enumerate(out, start=1):
-        row['Position'] = i
+    with stage('sort'):
+        for title, (total, lists, year, _, _) in agg.items():
+            disp_title = f"{title} ({year})" if year else title
+            out.append({
+                'Title': disp_title,
+                'TotalScore': total,
+                'ListsAppeared': lists,
+            })
+        out.sort(key=lambda x: x['TotalScore'], reverse=True)
+        # Add Position
+        for i, row in enumerate(out, start=1):
+            row['Position'] = i
     return out
 
 
-def write_aggregated(list_dir: Path, agg_rows: List[Dict[str, object]]) -> Path:
+def write_aggregated(list_dir: Path, agg_rows: List[Dict[str, object]], export_dir: Optional[Path] = None) -> Path:
+    # Written atomically, and not at all when the content is unchanged. A new
+    # content makes the list's JSON export stale: it is dropped, from
+    # `export_dir` or from where build_site.py puts it by default
     out_path = list_dir / 'aggregated-list.csv'
-    with out_path.open('w', encoding='utf-8', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=['Position', 'Title', 'TotalScore', 'ListsAppeared'])
-        writer.writeheader()
-        for row in agg_rows:
-            writer.writerow({
+    with stage('write'):
+        changed = write_csv_atomic(out_path, ['Position', 'Title', 'TotalScore', 'ListsAppeared'], (
+            {
                 'Position': row['Position'],
                 'Title': row['Title'],
                 'TotalScore': row['TotalScore'],
                 'ListsAppeared': row['ListsAppeared'],
-            })
+            }
+            for row in agg_rows
+        ))
+    if changed:
+        from json_export import EXPORT_DIR, drop_export
+        drop_export(export_dir or list_dir.parent.parent / EXPORT_DIR / list_dir.name)
     return out_path
 
 
@@ -186,7 +176,7 @@ def load_existing_about(list_dir: Path) -> Dict[str, Dict[str, str]]:
     return out
 
 
-def write_about(list_dir: Path, picks: List[SourcePick]) -> Path:
+def about_rows(list_dir: Path, picks: List[SourcePick]) -> List[Dict[str, str]]:
     prev = load_existing_about(list_dir)
     rows: List[Dict[str, str]] = []
     for p in picks:
@@ -200,17 +190,43 @@ def write_about(list_dir: Path, picks: List[SourcePick]) -> Path:
             'GeneratedCsvPath': rel_path,
         })
     rows.sort(key=lambda r: r['SourceName'].lower())
+    return rows
+
+
+def write_about(list_dir: Path, picks: List[SourcePick], rows: Optional[List[Dict[str, str]]] = None) -> Path:
+    if rows is None:
+        rows = about_rows(list_dir, picks)
     out_path = list_dir / 'about.csv'
-    with out_path.open('w', encoding='utf-8', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=['SourceName', 'SourceURL', 'SourceId', 'GeneratedCsvPath'])
-        writer.writeheader()
-        for r in rows:
-            writer.writerow(r)
+    with stage('write'):
+        write_csv_atomic(out_path, ['SourceName', 'SourceURL', 'SourceId', 'GeneratedCsvPath'], rows)
     return out_path
 
 
+def read_picks_rows(picks: List[SourcePick]) -> List[Dict[str, str]]:
+    # Read rows from the chosen sources; mark the source filename for counting
+    combined_rows: List[Dict[str, str]] = []
+    for p in picks:
+        with stage('read'):
+            start = len(combined_rows)
+            for r in read_source_rows(p.csv_path):
+                r = dict(r)
+                r['SourceFile'] = p.csv_path.name
+                combined_rows.append(r)
+        count('files_read')
+        count('rows_parsed', len(combined_rows) - start)
+    return combined_rows
+
+
+def rebuild(list_dir: Path, picks: List[SourcePick]) -> Tuple[Path, Path]:
+    with stage('rebuild', theme=list_dir.name):
+        agg_rows = aggregate_rows(read_picks_rows(picks))
+        agg_path = write_aggregated(list_dir, agg_rows)
+        about_path = write_about(list_dir, picks)
+    return agg_path, about_path
+
+
 def list_available_lists(root: Path) -> List[Path]:
-    return sorted([p for p in root.iterdir() if p.is_dir()], key=lambda p: p.name.lower())
+    return get_index(root).lists()
 
 
 def prompt_choice(options: List[Path]) -> Optional[int]:
@@ -232,12 +248,21 @@ def prompt_choice(options: List[Path]) -> Optional[int]:
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser(description='Interactively rebuild one list')
+    add_arguments(parser)
+    args = parser.parse_args()
+    with session_from_args(args):
+        rebuild_interactive()
+
+
+def rebuild_interactive() -> None:
     root = script_root_list_dir()
     if not root.exists():
         print(f"Error: 'list' folder not found at {root}", file=sys.stderr)
         sys.exit(1)
 
-    lists = list_available_lists(root)
+    with stage('scan'):
+        lists = list_available_lists(root)
     if not lists:
         print('No lists found.')
         sys.exit(0)
@@ -248,23 +273,15 @@ def main() -> None:
         return
     list_dir = lists[idx]
 
-    picks = pick_sources_for_list(list_dir)
+    with stage('scan', theme=list_dir.name):
+        picks = pick_sources_for_list(list_dir)
     if not picks:
         print(f"No sources found in {list_dir}.")
         return
 
-    # Read rows from the chosen sources; mark the source filename for counting
-    combined_rows: List[Dict[str, str]] = []
-    for p in picks:
-        for r in read_source_rows(p.csv_path):
-            r = dict(r)
-            r['SourceFile'] = p.csv_path.name
-            combined_rows.append(r)
-
-    agg_rows = aggregate_rows(combined_rows)
-    agg_path = write_aggregated(list_dir, agg_rows)
-    about_path = write_about(list_dir, picks)
+    agg_path, about_path = rebuild(list_dir, picks)
 
+    get_index(root).save()
     print(f"Written: {agg_path}")
     print(f"Written: {about_path}")
 
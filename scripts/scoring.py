@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Pluggable scoring strategies, re-ranking every theme in one vectorized pass.
+
+A strategy maps each corpus row to a weight (a NumPy array over the selected
+rows); a theme's ranking sums the weights per title, with the same rules as
+`aggregate_rows` (grouping by stripped title, release year of the first row,
+ListsAppeared = distinct source files, ties in first-seen order). The corpus
+is parsed once (`corpus_columns.py`), the (theme, title) grouping is computed
+once, and every strategy then costs a single `bincount`.
+
+Built-in strategies:
+- `score`: the precomputed `Score` column (identical to `aggregate_rows`);
+- `borda`: `list size - Position + 1` within each source CSV;
+- `normalized`: `Score` divided by the top score of the same source CSV, so
+  every source contributes at most 1 per game;
+- `recency`: `Score` halved every `half_life_days` of snapshot age, relative
+  to the newest snapshot (files without a timestamp are not decayed);
+- `source_weight`: `Score * (1 + ln(Count))`, with the number of datasets a
+  source appears in from `all_sources.csv` (unknown sources count 1).
+
+New strategies are registered with `@register_strategy('name')`.
+
+Rank correlation between strategies (Spearman's rho and Kendall's tau on the
+positions of each theme) is averaged over the themes.
+
+Usage examples:
+- Compare all strategies:       python scripts/scoring.py
+- Pick strategies:              python scripts/scoring.py --strategies score borda recency
+- Write every ranking as CSV:   python scripts/scoring.py --out-dir /tmp/rankings
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import math
+import sys
+import time
+from dataclasses import dataclass, field
+from itertools import combinations
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from aggregate_kernel import factorize, group_totals, year_of
+from atomic_io import write_csv_atomic
+from corpus_columns import CORPUS_FILE_NAME, Corpus, build_corpus, corpus_is_current, load_corpus
+from rebuild_list import script_root_list_dir
+
+
+Strategy = Callable[['ScoringContext'], np.ndarray]
+STRATEGIES: Dict[str, Strategy] = {}
+SECONDS_PER_DAY = 86400
+
+
+def register_strategy(name: str) -> Callable[[Strategy], Strategy]:
+    def decorator(fn: Strategy) -> Strategy:
+        STRATEGIES[name] = fn
+        return fn
+    return decorator
+
+
+@dataclass
+class ScoringContext:
+    """Selected corpus rows and per-row columns shared by all strategies."""
+    corpus: Corpus
+    rows: np.ndarray                         # indices of the selected rows
+    source_counts: Dict[str, int] = field(default_factory=dict)
+    half_life_days: float = 365.0
+
+    def __post_init__(self) -> None:
+        self.snapshot = self.corpus.snapshot[self.rows].astype(np.int64)
+        self.position = self.corpus.position[self.rows].astype(np.int64)
+        self.score = self.corpus.score[self.rows].astype(np.float64)
+
+    def per_snapshot(self, values: np.ndarray) -> np.ndarray:
+        # Broadcast a per-snapshot array onto the selected rows
+        return values[self.snapshot]
+
+    def snapshot_sizes(self) -> np.ndarray:
+        return np.bincount(self.snapshot, minlength=self.corpus.snapshot_count)
+
+    def snapshot_max_score(self) -> np.ndarray:
+        top = np.zeros(self.corpus.snapshot_count, dtype=np.float64)
+        np.maximum.at(top, self.snapshot, self.score)
+        return top
+
+
+@register_strategy('score')
+def score_strategy(ctx: ScoringContext) -> np.ndarray:
+    return ctx.score
+
+
+@register_strategy('borda')
+def borda_strategy(ctx: ScoringContext) -> np.ndarray:
+    size = ctx.per_snapshot(ctx.snapshot_sizes())
+    # Rows without a position are ranked last
+    position = np.where(ctx.position > 0, ctx.position, size)
+    return np.maximum(size - position + 1, 0).astype(np.float64)
+
+
+@register_strategy('normalized')
+def normalized_strategy(ctx: ScoringContext) -> np.ndarray:
+    top = ctx.per_snapshot(ctx.snapshot_max_score())
+    return np.divide(ctx.score, top, out=np.zeros_like(ctx.score), where=top > 0)
+
+
+@register_strategy('recency')
+def recency_strategy(ctx: ScoringContext) -> np.ndarray:
+    stamps = ctx.corpus.snapshot_timestamp.astype(np.float64)
+    known = stamps >= 0
+    newest = stamps[known].max() if known.any() else 0.0
+    age_days = np.where(known, (newest - stamps) / SECONDS_PER_DAY, 0.0)
+    decay = 0.5 ** (age_days / ctx.half_life_days)
+    return ctx.score * ctx.per_snapshot(decay)
+
+
+@register_strategy('source_weight')
+def source_weight_strategy(ctx: ScoringContext) -> np.ndarray:
+    names = ctx.corpus.dictionaries['source'].to_list()
+    weights = np.asarray([1.0 + math.log(max(1, ctx.source_counts.get(n.lower(), 1))) for n in names])
+    return ctx.score * ctx.per_snapshot(weights[ctx.corpus.snapshot_source])
+
+
+def load_source_counts(path: Path) -> Dict[str, int]:
+    """Lower-cased SourceName -> Count from `all_sources.csv`."""
+    if not path.exists():
+        return {}
+    counts: Dict[str, int] = {}
+    with path.open('r', encoding='utf-8', newline='') as f:
+        for r in csv.DictReader(f):
+            name = (r.get('SourceName') or '').strip().lower()
+            try:
+                counts[name] = int(r.get('Count') or 0)
+            except ValueError:
+                continue
+    return counts
+
+
+def spearman(a: np.ndarray, b: np.ndarray) -> float:
+    """Spearman's rho of two rankings given as distinct positions."""
+    n = a.size
+    if n < 2:
+        return float('nan')
+    d = (a - b).astype(np.float64)
+    return 1.0 - 6.0 * float(np.dot(d, d)) / (n * (n * n - 1))
+
+
+def kendall_tau(a: np.ndarray, b: np.ndarray) -> float:
+    """Kendall's tau of two rankings given as distinct positions (no ties, so tau-a)."""
+    n = a.size
+    if n < 2:
+        return float('nan')
+    a = a.astype(np.int64)
+    b = b.astype(np.int64)
+    s = 0
+    for i in range(n - 1):
+        s += int(np.sum(np.sign(a[i + 1:] - a[i]) * np.sign(b[i + 1:] - b[i])))
+    return s / (n * (n - 1) / 2)
+
+
+@dataclass
+class Reranking:
+    """Per (theme, title) group: display title, ListsAppeared, and per strategy totals and positions."""
+    themes: List[str]
+    theme: np.ndarray                        # theme code per group
+    titles: List[str]                        # display title per group
+    lists: np.ndarray
+    totals: Dict[str, np.ndarray]
+    positions: Dict[str, np.ndarray]         # 1-based position within the theme
+    order: Dict[str, np.ndarray]             # group indices sorted by theme, then position
+
+    def ranking(self, strategy: str, theme: str) -> List[Dict[str, object]]:
+        """One theme's ranking, shaped like `aggregate_rows` output."""
+        code = self.themes.index(theme)
+        order = self.order[strategy]
+        groups = order[self.theme[order] == code]
+        totals = self.totals[strategy]
+        integral = bool(np.all(totals == np.round(totals)))
+        return [{'Title': self.titles[g],
+                 'TotalScore': int(totals[g]) if integral else round(float(totals[g]), 4),
+                 'ListsAppeared': int(self.lists[g]),
+                 'Position': int(self.positions[strategy][g])}
+                for g in groups.tolist()]
+
+    def correlations(self) -> List[Dict[str, object]]:
+        """Mean / min Spearman and Kendall per strategy pair over themes with 2+ games."""
+        by_theme = np.argsort(self.theme, kind='stable')
+        theme_sorted = self.theme[by_theme]
+        starts = np.searchsorted(theme_sorted, np.arange(len(self.themes)), side='left')
+        stops = np.searchsorted(theme_sorted, np.arange(len(self.themes)), side='right')
+        out: List[Dict[str, object]] = []
+        for s1, s2 in combinations(list(self.totals), 2):
+            rhos: List[float] = []
+            taus: List[float] = []
+            for start, stop in zip(starts.tolist(), stops.tolist()):
+                if stop - start < 2:
+                    continue
+                groups = by_theme[start:stop]
+                rhos.append(spearman(self.positions[s1][groups], self.positions[s2][groups]))
+                taus.append(kendall_tau(self.positions[s1][groups], self.positions[s2][groups]))
+            out.append({'A': s1, 'B': s2, 'Themes': len(rhos),
+                        'SpearmanMean': round(float(np.mean(rhos)), 4) if rhos else '',
+                        'SpearmanMin': round(float(np.min(rhos)), 4) if rhos else '',
+                        'KendallMean': round(float(np.mean(taus)), 4) if taus else '',
+                        'KendallMin': round(float(np.min(taus)), 4) if taus else ''})
+        return out
+
+
+def rerank(corpus: Corpus, strategies: Sequence[str], mask: Optional[np.ndarray] = None,
+           source_counts: Optional[Dict[str, int]] = None, half_life_days: float = 365.0) -> Reranking:
+    """Rank every theme under each strategy, sharing one grouping pass.
+
+    `mask` selects corpus rows and defaults to the latest snapshots, i.e. the
+    rows `rebuild_list.py` aggregates.
+    """
+    unknown = [s for s in strategies if s not in STRATEGIES]
+    if unknown:
+        raise ValueError(f"Unknown strategies: {', '.join(unknown)} (known: {', '.join(STRATEGIES)})")
+    if mask is None:
+        mask = corpus.latest_row_mask()
+    empty = corpus.dictionaries['title'].code('')
+    if empty >= 0:
+        mask = mask & (corpus.title != empty)
+    rows = np.flatnonzero(mask)
+    ctx = ScoringContext(corpus, rows, source_counts or {}, half_life_days)
+
+    # Group on (theme, title); themes are dense codes so the key stays an int64
+    row_theme = ctx.per_snapshot(corpus.snapshot_theme.astype(np.int64))
+    row_title = corpus.title[rows].astype(np.int64)
+    n_titles = len(corpus.dictionaries['title'])
+    codes, first_row = factorize(row_theme * n_titles + row_title)
+    n_groups = first_row.size
+
+    paths = corpus.dictionaries['path'].to_list()
+    file_ids: Dict[str, int] = {}
+    snap_file = np.asarray([file_ids.setdefault(paths[p].rsplit('/', 1)[-1], len(file_ids))
+                            for p in corpus.snapshot_path.tolist()], dtype=np.int64)
+    _, lists = group_totals(codes, np.zeros(rows.size), ctx.per_snapshot(snap_file), n_groups)
+
+    group_theme = row_theme[first_row]
+    all_titles = corpus.dictionaries['title'].to_list()
+    years = [year_of(d) for d in corpus.dictionaries['release_date'].to_list()]
+    first_title = row_title[first_row].tolist()
+    first_date = corpus.release_date[rows][first_row].tolist()
+    titles: List[str] = []
+    for t, d in zip(first_title, first_date):
+        title, year = all_titles[t], years[d]
+        titles.append(f"{title} ({year})" if year else title)
+
+    totals: Dict[str, np.ndarray] = {}
+    positions: Dict[str, np.ndarray] = {}
+    orders: Dict[str, np.ndarray] = {}
+    group_ids = np.arange(n_groups)
+    for name in strategies:
+        weights = np.asarray(STRATEGIES[name](ctx), dtype=np.float64)
+        total = np.bincount(codes, weights=weights, minlength=n_groups)
+        # By theme, then total descending, then first seen (groups are numbered in first-seen order)
+        order = np.lexsort((group_ids, -total, group_theme))
+        theme_sorted = group_theme[order]
+        starts = np.searchsorted(theme_sorted, theme_sorted, side='left')
+        position = np.empty(n_groups, dtype=np.int64)
+        position[order] = np.arange(n_groups) - starts + 1
+        totals[name], positions[name], orders[name] = total, position, order
+
+    themes = corpus.dictionaries['theme'].to_list()
+    return Reranking(themes, group_theme, titles, lists, totals, positions, orders)
+
+
+def ensure_corpus(root: Path, corpus_path: Optional[Path] = None) -> Corpus:
+    # Rebuilt when a snapshot was added, removed or edited since it was compiled
+    corpus_path = corpus_path or root / CORPUS_FILE_NAME
+    if not corpus_is_current(root, corpus_path):
+        build_corpus(root, corpus_path)
+    return load_corpus(corpus_path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Re-rank every theme under several scoring strategies')
+    parser.add_argument('--root', default=str(script_root_list_dir()), help='Root folder containing lists (default: list)')
+    parser.add_argument('--corpus', help=f'Columnar corpus (default: <root>/{CORPUS_FILE_NAME}, built when missing)')
+    parser.add_argument('--strategies', nargs='+', default=list(STRATEGIES), help='Strategies to compute (default: all)')
+    parser.add_argument('--half-life', type=float, default=365.0, help='Half-life of the recency strategy, in days')
+    parser.add_argument('--out-dir', help='Write <out-dir>/<strategy>/<theme>.csv and correlations.csv')
+    args = parser.parse_args()
+
+    root = Path(args.root)
+    if not root.is_dir():
+        print(f"Invalid root: {root}", file=sys.stderr)
+        sys.exit(1)
+    corpus = ensure_corpus(root, Path(args.corpus) if args.corpus else None)
+    counts = load_source_counts(root.parent / 'all_sources.csv')
+
+    start = time.perf_counter()
+    try:
+        result = rerank(corpus, args.strategies, source_counts=counts, half_life_days=args.half_life)
+    except ValueError as exc:
+        print(str(exc), file=sys.stderr)
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+    correlations = result.correlations()
+    n_themes = len(set(result.theme.tolist()))
+    print(f"Ranked {n_themes} themes under {len(args.strategies)} strategies in {elapsed * 1000:.1f} ms")
+    for c in correlations:
+        print(f"{c['A']:>14} vs {c['B']:<14} spearman {c['SpearmanMean']:>7} (min {c['SpearmanMin']:>7})  "
+              f"kendall {c['KendallMean']:>7} (min {c['KendallMin']:>7})")
+
+    if args.out_dir:
+        out_dir = Path(args.out_dir)
+        fields = ['Position', 'Title', 'TotalScore', 'ListsAppeared']
+        for name in args.strategies:
+            (out_dir / name).mkdir(parents=True, exist_ok=True)
+            for theme in sorted(set(result.themes[t] for t in result.theme.tolist())):
+                write_csv_atomic(out_dir / name / f"{theme}.csv", fields, result.ranking(name, theme))
+        write_csv_atomic(out_dir / 'correlations.csv', list(correlations[0]) if correlations else ['A', 'B'],
+                         correlations)
+        print(f"Written: {out_dir}")
+
+
+if __name__ == '__main__':
+    main()
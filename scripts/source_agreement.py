@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+How closely outlets agree: rank correlation between every pair of sources.
+
+`all_sources.csv` says which outlets appear in which themes; this measures
+how similarly they rank the games they have in common. For every theme, the
+latest snapshot of each source (as `rebuild_list.pick_sources_for_list`
+picks it) gives a sparse source x game matrix of positions, and for every
+pair of sources in the theme:
+- `Overlap`: the number of games both list;
+- `Spearman`: Spearman's rho of the two rankings of those games (positions
+  re-ranked among the shared games);
+- `Kendall`: Kendall's tau-a of the same rankings.
+Correlations need at least 2 shared games and are left empty otherwise.
+
+Pairs are then combined across themes per outlet (by `SourceName` of
+`about.csv`, as in `all_sources.csv`): `Themes` shared, total `Overlap`, and
+the correlations averaged over themes weighted by overlap.
+
+Every pair of a theme is computed at once. Per source, the order of each pair
+of games it lists is a sign matrix (+1, -1, or 0 when it lacks either game);
+the dot products of these matrices give concordant minus discordant pairs
+(Kendall) for all source pairs, and the same matrices times the presence of
+the other source give each source's ranks among the shared games (Spearman).
+Games listed by a single source are dropped first, and large themes are
+processed in blocks of games to bound memory. With `scoring.spearman` /
+`scoring.kendall_tau` per pair the result is the same (`--check`).
+
+Results are cached per theme in `list/.agreement-cache.json` with the
+fingerprints of its chosen CSVs (as `rebuild_all.py`), so only themes with a
+new or changed snapshot are computed again.
+
+Usage examples:
+- Summary of the most / least agreeing outlets:  python scripts/source_agreement.py
+- Write every outlet pair:                       python scripts/source_agreement.py --out agreement.csv
+- Per theme pairs as well:                       python scripts/source_agreement.py --per-theme pairs.csv
+- Ignore the cache:                              python scripts/source_agreement.py --force
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import math
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from atomic_io import write_bytes_atomic, write_csv_atomic
+from instrument import add_arguments, count, session_from_args, stage
+from rebuild_all import fingerprint_sources, sources_key
+from rebuild_list import SourcePick, get_index, load_existing_about, script_root_list_dir
+
+
+CACHE_NAME = '.agreement-cache.json'
+CACHE_VERSION = 1
+# Elements of one block of sign matrices (sources x games x games)
+BLOCK_ELEMENTS = 1 << 22
+DEFAULT_MIN_OVERLAP = 5
+PAIR_FIELDS = ['SourceA', 'SourceB', 'Themes', 'Overlap', 'Spearman', 'Kendall']
+THEME_FIELDS = ['Theme', 'SourceA', 'SourceB', 'Overlap', 'Spearman', 'Kendall']
+
+
+@dataclass
+class ThemeMatrix:
+    """Positions of the games listed by 2+ sources of one theme."""
+    sources: List[str]
+    games: List[str]
+    positions: np.ndarray                    # sources x games, 0 where not listed
+    present: np.ndarray                      # sources x games, bool
+
+
+@dataclass
+class AgreementSummary:
+    themes: List[str] = field(default_factory=list)
+    computed: List[str] = field(default_factory=list)
+    # Per theme: [SourceA, SourceB, Overlap, Spearman, Kendall] (None when undefined)
+    pairs: Dict[str, List[list]] = field(default_factory=dict)
+    # With check: pairs differing from scoring.spearman / kendall_tau
+    mismatches: int = 0
+
+
+def read_positions(csv_path: Path) -> Dict[str, int]:
+    """Stripped title -> position; the first row of a title wins, rows without a position are skipped."""
+    out: Dict[str, int] = {}
+    with csv_path.open('r', encoding='utf-8', newline='') as f:
+        for r in csv.DictReader(f):
+            title = (r.get('Title') or '').strip()
+            try:
+                position = int(float(r.get('Position') or ''))
+            except (ValueError, OverflowError):
+                count('invalid_positions')
+                continue
+            if title and title not in out:
+                out[title] = position
+    return out
+
+
+def source_names(list_dir: Path, picks: List[SourcePick]) -> List[str]:
+    # SourceName from about.csv, as all_sources.csv names the outlets
+    about = load_existing_about(list_dir)
+    return [(about.get(p.name.strip().lower(), {}).get('SourceName') or p.name).strip() for p in picks]
+
+
+def theme_matrix(names: List[str], rankings: List[Dict[str, int]]) -> ThemeMatrix:
+    # Sparse (source, game, position) triplets first; only games shared by
+    # two sources or more make it into the dense matrix
+    game_ids: Dict[str, int] = {}
+    src: List[int] = []
+    game: List[int] = []
+    pos: List[int] = []
+    for s, ranking in enumerate(rankings):
+        for title, position in ranking.items():
+            src.append(s)
+            game.append(game_ids.setdefault(title, len(game_ids)))
+            pos.append(position)
+    src_a = np.asarray(src, dtype=np.int64)
+    game_a = np.asarray(game, dtype=np.int64)
+    shared = np.bincount(game_a, minlength=len(game_ids)) >= 2
+    keep = shared[game_a]
+    columns = np.full(len(game_ids), -1, dtype=np.int64)
+    columns[shared] = np.arange(int(shared.sum()))
+    positions = np.zeros((len(names), int(shared.sum())), dtype=np.float64)
+    present = np.zeros(positions.shape, dtype=bool)
+    positions[src_a[keep], columns[game_a[keep]]] = np.asarray(pos, dtype=np.float64)[keep]
+    present[src_a[keep], columns[game_a[keep]]] = True
+    titles = list(game_ids)
+    return ThemeMatrix(names, [titles[g] for g in np.flatnonzero(shared).tolist()], positions, present)
+
+
+def agreement(matrix: ThemeMatrix) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Overlap, Spearman and Kendall for every pair of sources (NaN below 2 shared games)."""
+    positions, present = matrix.positions, matrix.present
+    n_sources, n_games = positions.shape
+    pres = present.astype(np.float64)
+    overlap = pres @ pres.T
+    concordance = np.zeros((n_sources, n_sources))
+    # rank[a, b, i]: games listed by both a and b that a ranks above game i
+    rank = np.zeros((n_sources, n_sources, n_games))
+    block = max(1, BLOCK_ELEMENTS // max(1, n_sources * n_games))
+    for start in range(0, n_games, block):
+        rows = slice(start, start + block)
+        # sign[s, i, j] = sign(position of i - position of j) where s lists both
+        sign = np.sign(positions[:, rows, None] - positions[:, None, :])
+        sign *= present[:, rows, None] & present[:, None, :]
+        flat = sign.reshape(n_sources, -1)
+        concordance += flat @ flat.T
+        rank[:, :, rows] = np.einsum('aij,bj->abi', (sign > 0).astype(np.float64), pres)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Each unordered pair of games is counted twice in the concordance
+        kendall = np.where(overlap >= 2, concordance / (overlap * (overlap - 1)), np.nan)
+        common = pres[:, None, :] * pres[None, :, :]
+        d = (rank - rank.transpose(1, 0, 2)) * common
+        spearman = np.where(overlap >= 2, 1.0 - 6.0 * (d * d).sum(axis=2) / (overlap * (overlap * overlap - 1)),
+                            np.nan)
+    return overlap, spearman, kendall
+
+
+def pair_rows(matrix: ThemeMatrix) -> List[list]:
+    overlap, spearman, kendall = agreement(matrix)
+    a, b = np.triu_indices(len(matrix.sources), k=1)
+    names = matrix.sources
+    return [[names[i], names[j], int(n), None if math.isnan(rho) else round(rho, 6),
+             None if math.isnan(tau) else round(tau, 6)]
+            for i, j, n, rho, tau in zip(a.tolist(), b.tolist(), overlap[a, b].tolist(), spearman[a, b].tolist(),
+                                         kendall[a, b].tolist())]
+
+
+def check_pairs(matrix: ThemeMatrix, rows: List[list]) -> int:
+    """Compare with scoring.spearman / kendall_tau pair by pair; returns the mismatches."""
+    from scoring import kendall_tau, spearman
+
+    index = {name: i for i, name in enumerate(matrix.sources)}
+    bad = 0
+    for a_name, b_name, n, rho, tau in rows:
+        a, b = index[a_name], index[b_name]
+        both = matrix.present[a] & matrix.present[b]
+        if n < 2:
+            continue
+        # Ranks among the shared games (positions are assumed distinct)
+        ra = np.argsort(np.argsort(matrix.positions[a, both], kind='stable'), kind='stable')
+        rb = np.argsort(np.argsort(matrix.positions[b, both], kind='stable'), kind='stable')
+        if abs(spearman(ra, rb) - rho) > 1e-6 or abs(kendall_tau(ra, rb) - tau) > 1e-6:
+            bad += 1
+    return bad
+
+
+def load_cache(root: Path) -> Dict[str, Dict[str, object]]:
+    try:
+        with (root / CACHE_NAME).open('r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get('version') != CACHE_VERSION:
+        return {}
+    themes = data.get('themes')
+    return themes if isinstance(themes, dict) else {}
+
+
+def save_cache(root: Path, themes: Dict[str, Dict[str, object]]) -> Path:
+    path = root / CACHE_NAME
+    write_bytes_atomic(path, json.dumps({'version': CACHE_VERSION, 'themes': dict(sorted(themes.items()))},
+                                        indent=1, ensure_ascii=False).encode('utf-8'))
+    return path
+
+
+def compute_agreement(root: Optional[Path] = None, force: bool = False, check: bool = False) -> AgreementSummary:
+    """Pairs of every theme, reusing the cached ones whose chosen CSVs are unchanged."""
+    root = root or script_root_list_dir()
+    index = get_index(root)
+    cache = {} if force else load_cache(root)
+    fresh: Dict[str, Dict[str, object]] = {}
+    result = AgreementSummary()
+
+    with stage('scan'):
+        list_dirs = index.lists()
+    for list_dir in list_dirs:
+        theme = list_dir.name
+        picks = index.picks(list_dir)
+        if len(picks) < 2:
+            continue
+        entry = cache.get(theme) or {}
+        sources = fingerprint_sources(list_dir, picks, list(entry.get('sources') or []))
+        names = source_names(list_dir, picks)
+        if sources_key(list(entry.get('sources') or [])) == sources_key(sources) and entry.get('names') == names \
+                and not check:
+            count('themes_cached')
+            rows = list(entry.get('pairs') or [])
+        else:
+            with stage('read'):
+                rankings = [read_positions(p.csv_path) for p in picks]
+                count('files_read', len(picks))
+            with stage('agreement'):
+                matrix = theme_matrix(names, rankings)
+                rows = pair_rows(matrix)
+            if check:
+                result.mismatches += check_pairs(matrix, rows)
+            result.computed.append(theme)
+        fresh[theme] = {'sources': sources, 'names': names, 'pairs': rows}
+        result.themes.append(theme)
+        result.pairs[theme] = rows
+
+    if fresh != cache:
+        save_cache(root, fresh)
+    index.save()
+    return result
+
+
+def outlet_pairs(pairs: Dict[str, List[list]]) -> List[Dict[str, object]]:
+    """Pairs combined per outlet across themes; correlations weighted by overlap."""
+    acc: Dict[Tuple[str, str], list] = {}
+    for rows in pairs.values():
+        for a, b, n, rho, tau in rows:
+            key = (a, b) if a.casefold() <= b.casefold() else (b, a)
+            # themes, overlap, weight, weighted rho, weighted tau
+            entry = acc.setdefault(key, [0, 0, 0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += n
+            if rho is not None and tau is not None:
+                entry[2] += n
+                entry[3] += n * rho
+                entry[4] += n * tau
+    out: List[Dict[str, object]] = []
+    for (a, b), (themes, overlap, weight, rho, tau) in sorted(acc.items(), key=lambda kv: (kv[0][0].casefold(),
+                                                                                           kv[0][1].casefold())):
+        out.append({'SourceA': a, 'SourceB': b, 'Themes': themes, 'Overlap': overlap,
+                    'Spearman': round(rho / weight, 4) if weight else '',
+                    'Kendall': round(tau / weight, 4) if weight else ''})
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Rank correlation between every pair of sources sharing a theme')
+    parser.add_argument('--root', default=str(script_root_list_dir()), help='Root folder containing lists (default: list)')
+    parser.add_argument('--out', help='Write the outlet pairs as CSV')
+    parser.add_argument('--per-theme', help='Write the pairs of every theme as CSV')
+    parser.add_argument('--min-overlap', type=int, default=DEFAULT_MIN_OVERLAP,
+                        help=f'Shared games needed to appear in the summary (default: {DEFAULT_MIN_OVERLAP})')
+    parser.add_argument('--top', type=int, default=10, help='Pairs shown at each end of the summary (default: 10)')
+    parser.add_argument('--force', action='store_true', help='Ignore the cache and compute every theme')
+    parser.add_argument('--check', action='store_true',
+                        help='Compute every theme and compare with scoring.spearman / kendall_tau')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    root = Path(args.root)
+    if not root.exists() or not root.is_dir():
+        print(f"Invalid root: {root}", file=sys.stderr)
+        sys.exit(1)
+
+    start = time.perf_counter()
+    with session_from_args(args):
+        result = compute_agreement(root, args.force, args.check)
+        outlets = outlet_pairs(result.pairs)
+    elapsed = time.perf_counter() - start
+    n_pairs = sum(len(rows) for rows in result.pairs.values())
+    print(f"{n_pairs} source pairs in {len(result.themes)} themes ({len(result.computed)} computed, "
+          f"{len(result.themes) - len(result.computed)} cached), {len(outlets)} outlet pairs in {elapsed:.2f} s")
+    if args.check:
+        print(f"Checked against scoring.spearman / kendall_tau: {result.mismatches} pairs differ")
+
+    ranked = sorted((o for o in outlets if o['Overlap'] >= args.min_overlap and o['Spearman'] != ''),
+                    key=lambda o: o['Spearman'], reverse=True)
+    if ranked and args.top > 0:
+        for label, part in (('Most', ranked[:args.top]), ('Least', ranked[::-1][:args.top])):
+            print(f"{label} agreeing (overlap >= {args.min_overlap}):")
+            for o in part:
+                print(f"  {o['SourceA']:>24} / {o['SourceB']:<24} spearman {o['Spearman']:>7}  "
+                      f"kendall {o['Kendall']:>7}  overlap {o['Overlap']:>4} in {o['Themes']} themes")
+
+    if args.out:
+        write_csv_atomic(Path(args.out), PAIR_FIELDS, outlets)
+        print(f"Written: {args.out}")
+    if args.per_theme:
+        write_csv_atomic(Path(args.per_theme), THEME_FIELDS,
+                         ({'Theme': theme, **dict(zip(THEME_FIELDS[1:], ['' if v is None else v for v in row]))}
+                          for theme, rows in result.pairs.items() for row in rows))
+        print(f"Written: {args.per_theme}")
+
+
+if __name__ == '__main__':
+    main()
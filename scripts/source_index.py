@@ -0,0 +1,275 @@
+"""
+Shared discovery of lists, sources and source snapshots under `list/`.
+
+The index maps list -> source -> snapshots (oldest first) using the rules of
+`rebuild_list.py`:
+- each subfolder of a list is a source, holding its snapshots; when no
+  subfolder holds a CSV, top-level CSVs are grouped by the source name in
+  "<source> - <timestamp>.csv";
+- snapshots are ordered by the timestamp in the filename; files without a
+  timestamp are only considered when a source has no timestamped file, and
+  are then ordered by modification time.
+
+Every directory listing is cached together with the directory mtime, and is
+only re-read when that mtime changes (adding, removing or renaming a file
+updates it). Two changes leave that mtime alone, so the listing also keeps
+the size and mtime of the files it picks from: every file without a
+timestamp (their mtimes order them, and one edited in place may become the
+latest) and the newest timestamped file of each source. A listing is read
+again when one of them differs, and while it was taken less than `RACY_NS`
+after the directory mtime: a file added in the same mtime tick would not show.
+Filename timestamps are parsed once per name. The cache can be persisted in
+`list/.sourceindex.json` so a new run only re-lists the directories that
+changed since the previous one.
+"""
+
+from __future__ import annotations
+
+import bisect
+import calendar
+import json
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from atomic_io import write_text_atomic
+from instrument import count
+
+
+TIMESTAMP_RE = re.compile(r" - (\d{4})-(\d{2})-(\d{2})_(\d{2})-(\d{2})-(\d{2})\.csv$")
+SKIP_NAMES = {'aggregated-list.csv', 'about.csv'}
+INDEX_NAME = '.sourceindex.json'
+INDEX_VERSION = 2
+# Listings taken this soon after the directory mtime are not trusted
+RACY_NS = 2_000_000_000
+
+Timestamp = Tuple[int, int, int, int, int, int]
+
+
+@dataclass
+class SourcePick:
+    name: str                 # source name (e.g., 'ign', 'gamesradar+')
+    csv_path: Path            # absolute path to the chosen CSV
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    path: Path
+    timestamp: Optional[Timestamp]
+    mtime: float = 0.0
+
+    @property
+    def time(self) -> float:
+        # Epoch seconds of the filename timestamp, or the file mtime without one
+        return float(calendar.timegm(self.timestamp + (0, 0, 0))) if self.timestamp else self.mtime
+
+
+@dataclass
+class SourceHistory:
+    name: str
+    snapshots: List[Snapshot]  # oldest first
+    _times: List[float] = field(default_factory=list, init=False, repr=False, compare=False)
+
+    @property
+    def latest(self) -> Snapshot:
+        return self.snapshots[-1]
+
+    @property
+    def times(self) -> List[float]:
+        # Ascending, as snapshots are ordered by time
+        if not self._times:
+            self._times = [s.time for s in self.snapshots]
+        return self._times
+
+    def as_of(self, when: float) -> Optional[Snapshot]:
+        """Newest snapshot taken at or before `when` (epoch seconds), by binary search."""
+        i = bisect.bisect_right(self.times, when)
+        return self.snapshots[i - 1] if i else None
+
+
+def parse_source_from_filename(filename: str) -> Optional[str]:
+    name = Path(filename).name
+    if not name.lower().endswith('.csv'):
+        return None
+    stem = name[:-4]
+    if ' - ' in stem:
+        return stem.split(' - ', 1)[0].strip()
+    return None
+
+
+@lru_cache(maxsize=None)
+def parse_timestamp_from_filename(filename: str) -> Optional[Timestamp]:
+    m = TIMESTAMP_RE.search(filename)
+    if not m:
+        return None
+    return tuple(int(x) for x in m.groups())  # type: ignore[return-value]
+
+
+def _stat(path: Path) -> Optional[List[int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def order_snapshots(dir_path: Path, names: List[str], mtimes: Dict[str, float]) -> List[Snapshot]:
+    timestamped = [(ts, n) for n in names for ts in [parse_timestamp_from_filename(n)] if ts]
+    if timestamped:
+        return [Snapshot(dir_path / n, ts) for ts, n in sorted(timestamped)]
+    return [Snapshot(dir_path / n, None, mtimes.get(n, 0.0))
+            for n in sorted(names, key=lambda n: (mtimes.get(n, 0.0), n))]
+
+
+class SourceIndex:
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.path = root / INDEX_NAME
+        # directory key -> {'mtime_ns', 'listed_ns', 'csv', 'subdirs', 'mtimes', 'stats'}
+        self.dirs: Dict[str, Dict[str, object]] = {}
+        self.dirty = False
+        self.listed = 0
+
+    @classmethod
+    def load(cls, root: Path) -> 'SourceIndex':
+        index = cls(root)
+        try:
+            with index.path.open('r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return index
+        if isinstance(data, dict) and data.get('version') == INDEX_VERSION:
+            index.dirs = data.get('dirs') or {}
+        return index
+
+    def save(self) -> Optional[Path]:
+        if not self.dirty:
+            return None
+        payload = {'version': INDEX_VERSION, 'dirs': dict(sorted(self.dirs.items()))}
+        write_text_atomic(self.path, json.dumps(payload, separators=(',', ':')))
+        self.dirty = False
+        return self.path
+
+    def _key(self, dir_path: Path) -> str:
+        try:
+            return dir_path.relative_to(self.root).as_posix()
+        except ValueError:
+            return str(dir_path)
+
+    def is_current(self, dir_path: Path, entry: Dict[str, object], mtime_ns: int) -> bool:
+        if entry.get('mtime_ns') != mtime_ns or int(entry.get('listed_ns') or 0) - mtime_ns < RACY_NS:  # type: ignore[call-overload]
+            return False
+        stats: Dict[str, List[int]] = entry.get('stats') or {}  # type: ignore[assignment]
+        return all(_stat(dir_path / name) == st for name, st in stats.items())
+
+    def scan(self, dir_path: Path) -> Dict[str, object]:
+        """Listing of one directory, re-read only when it or a file it picks from changed."""
+        key = self._key(dir_path)
+        try:
+            mtime_ns = dir_path.stat().st_mtime_ns
+        except OSError:
+            self.dirs.pop(key, None)
+            return {'mtime_ns': -1, 'csv': [], 'subdirs': [], 'mtimes': {}, 'stats': {}}
+        entry = self.dirs.get(key)
+        if entry is not None and self.is_current(dir_path, entry, mtime_ns):
+            return entry
+
+        listed_ns = time.time_ns()
+        csv_names: List[str] = []
+        subdirs: List[str] = []
+        mtimes: Dict[str, float] = {}
+        stats: Dict[str, List[int]] = {}
+        # source -> (timestamp, name) of its newest timestamped file
+        newest: Dict[str, Tuple[Timestamp, str]] = {}
+        with os.scandir(dir_path) as it:
+            for e in it:
+                if e.is_dir():
+                    subdirs.append(e.name)
+                elif e.is_file() and e.name.lower().endswith('.csv') and e.name.lower() not in SKIP_NAMES:
+                    csv_names.append(e.name)
+                    ts = parse_timestamp_from_filename(e.name)
+                    if ts:
+                        source = parse_source_from_filename(e.name) or ''
+                        if source not in newest or newest[source] < (ts, e.name):
+                            newest[source] = (ts, e.name)
+                    else:
+                        st = e.stat()
+                        mtimes[e.name] = st.st_mtime
+                        stats[e.name] = [st.st_size, st.st_mtime_ns]
+        for _, name in newest.values():
+            st_entry = _stat(dir_path / name)
+            if st_entry is not None:
+                stats[name] = st_entry
+        entry = {'mtime_ns': mtime_ns, 'listed_ns': listed_ns, 'csv': sorted(csv_names), 'subdirs': sorted(subdirs),
+                 'mtimes': mtimes, 'stats': dict(sorted(stats.items()))}
+        self.dirs[key] = entry
+        self.dirty = True
+        self.listed += 1
+        count('dirs_listed')
+        return entry
+
+    def lists(self) -> List[Path]:
+        entry = self.scan(self.root)
+        return [self.root / name for name in sorted(entry['subdirs'], key=str.lower)]  # type: ignore[arg-type]
+
+    def snapshots_in_dir(self, dir_path: Path) -> List[Snapshot]:
+        entry = self.scan(dir_path)
+        return order_snapshots(dir_path, entry['csv'], entry['mtimes'])  # type: ignore[arg-type]
+
+    def latest_in_dir(self, dir_path: Path) -> Optional[Path]:
+        snapshots = self.snapshots_in_dir(dir_path)
+        return snapshots[-1].path if snapshots else None
+
+    def sources(self, list_dir: Path) -> List[SourceHistory]:
+        entry = self.scan(list_dir)
+        histories: List[SourceHistory] = []
+        # Case 1: source-per-subfolder
+        for name in sorted(entry['subdirs'], key=str.lower):  # type: ignore[arg-type]
+            snapshots = self.snapshots_in_dir(list_dir / name)
+            if snapshots:
+                histories.append(SourceHistory(name, snapshots))
+        if histories:
+            return histories
+
+        # Case 2: top-level CSVs grouped by source name
+        groups: Dict[str, List[str]] = {}
+        for name in entry['csv']:  # type: ignore[union-attr]
+            src = parse_source_from_filename(name)
+            if src:
+                groups.setdefault(src, []).append(name)
+        for src, names in groups.items():
+            histories.append(SourceHistory(src, order_snapshots(list_dir, names, entry['mtimes'])))  # type: ignore[arg-type]
+        histories.sort(key=lambda h: h.name.lower())
+        return histories
+
+    def picks(self, list_dir: Path) -> List[SourcePick]:
+        return [SourcePick(name=h.name, csv_path=h.latest.path) for h in self.sources(list_dir)]
+
+    def picks_as_of(self, list_dir: Path, when: float) -> List[SourcePick]:
+        """The snapshot each source had at `when`; sources not published yet are left out."""
+        picks: List[SourcePick] = []
+        for h in self.sources(list_dir):
+            snapshot = h.as_of(when)
+            if snapshot is not None:
+                picks.append(SourcePick(name=h.name, csv_path=snapshot.path))
+        return picks
+
+    def timeline(self, list_dir: Path) -> List[float]:
+        """Distinct snapshot times of a list, ascending: the moments its aggregate changed."""
+        return sorted({t for h in self.sources(list_dir) for t in h.times})
+
+
+_INDEXES: Dict[str, SourceIndex] = {}
+
+
+def get_index(root: Path) -> SourceIndex:
+    """Process-wide index for `root`, loaded from its persisted file once."""
+    key = str(root)
+    index = _INDEXES.get(key)
+    if index is None:
+        index = _INDEXES[key] = SourceIndex.load(root)
+    return index
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Rebuild a list's aggregated ranking as it stood at a given moment.
+
+For each source the snapshot in effect at the requested time is the newest one
+taken at or before it (by the timestamp in the filename, or the file mtime
+when there is none); sources without a snapshot by then are left out. The
+choice is a binary search over the per-source timelines of the shared source
+index (`source_index.py`), so no directory is re-listed.
+
+Parsed snapshots are kept in an LRU cache (checked against size and mtime),
+so sweeping a list over all of its historical dates reads each CSV once.
+
+Dates are `YYYY-MM-DD` (end of that day), `YYYY-MM-DD_HH-MM-SS` (as in the
+filenames) or ISO `YYYY-MM-DDTHH:MM:SS`, all UTC.
+
+Usage examples:
+- Print a list as of a date:          python scripts/time_travel.py --list best_games_of_2020 --as-of 2023-07-01
+- Write it to a folder:               python scripts/time_travel.py --list best_games_of_2020 --as-of 2023-07-01 --out-dir /tmp/asof
+- Every historical version of a list: python scripts/time_travel.py --list best_games_of_2020 --sweep --out-dir /tmp/history
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import os
+import re
+import sys
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from atomic_io import write_csv_atomic
+from rebuild_list import (
+    SourcePick,
+    aggregate_rows,
+    get_index,
+    script_root_list_dir,
+)
+
+
+AGG_FIELDS = ['Position', 'Title', 'TotalScore', 'ListsAppeared']
+DATE_RE = re.compile(r"^(\d{4})-(\d{2})-(\d{2})(?:[T_ ](\d{2})[:-](\d{2})[:-](\d{2}))?$")
+DEFAULT_CACHE_SIZE = 4096
+
+
+def parse_as_of(text: str) -> float:
+    """Epoch seconds (UTC) for a date or date-time; a bare date means the end of that day."""
+    m = DATE_RE.match(text.strip())
+    if not m:
+        raise ValueError(f"Invalid date: {text!r} (expected YYYY-MM-DD or YYYY-MM-DD_HH-MM-SS)")
+    y, mo, d, hh, mm, ss = m.groups()
+    if hh is None:
+        hh, mm, ss = '23', '59', '59'
+    # datetime rejects out-of-range fields (2023-02-30, hour 25) instead of
+    # rolling them over
+    try:
+        when = datetime(int(y), int(mo), int(d), int(hh), int(mm), int(ss), tzinfo=timezone.utc)
+    except ValueError:
+        raise ValueError(f"Invalid date: {text!r} (expected YYYY-MM-DD or YYYY-MM-DD_HH-MM-SS)") from None
+    return when.timestamp()
+
+
+def format_time(when: float) -> str:
+    return time.strftime('%Y-%m-%d_%H-%M-%S', time.gmtime(when))
+
+
+class SnapshotCache:
+    """LRU of parsed source CSVs, each row tagged with its `SourceFile`."""
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_SIZE) -> None:
+        self.max_entries = max_entries
+        self.entries: 'OrderedDict[Path, Tuple[Tuple[int, int], List[Dict[str, str]]]]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def rows(self, csv_path: Path) -> List[Dict[str, str]]:
+        st = os.stat(csv_path)
+        key = (st.st_size, st.st_mtime_ns)
+        entry = self.entries.get(csv_path)
+        if entry is not None and entry[0] == key:
+            self.entries.move_to_end(csv_path)
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        with csv_path.open('r', encoding='utf-8', newline='') as f:
+            rows = [dict(r, SourceFile=csv_path.name) for r in csv.DictReader(f)]
+        self.entries[csv_path] = (key, rows)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return rows
+
+    def picks_rows(self, picks: List[SourcePick]) -> List[Dict[str, str]]:
+        # Same rows, in the same order, as rebuild_list.read_picks_rows
+        out: List[Dict[str, str]] = []
+        for p in picks:
+            out.extend(self.rows(p.csv_path))
+        return out
+
+
+_DEFAULT_CACHE = SnapshotCache()
+
+
+def aggregate_as_of(list_dir: Path, when: float,
+                    cache: Optional[SnapshotCache] = None) -> Tuple[List[Dict[str, object]], List[SourcePick]]:
+    """Aggregated rows of `list_dir` at `when` (epoch seconds), and the snapshots used."""
+    cache = cache or _DEFAULT_CACHE
+    picks = get_index(list_dir.parent).picks_as_of(list_dir, when)
+    return aggregate_rows(cache.picks_rows(picks)), picks
+
+
+def sweep(list_dir: Path, cache: Optional[SnapshotCache] = None
+          ) -> Iterator[Tuple[float, List[Dict[str, object]], List[SourcePick]]]:
+    """Every version of a list: one aggregate per distinct snapshot time, oldest first."""
+    cache = cache or _DEFAULT_CACHE
+    for when in get_index(list_dir.parent).timeline(list_dir):
+        agg_rows, picks = aggregate_as_of(list_dir, when, cache)
+        yield when, agg_rows, picks
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Rebuild a list as it stood at a given date')
+    parser.add_argument('--root', default=str(script_root_list_dir()), help='Root folder containing lists (default: list)')
+    parser.add_argument('--list', required=True, help='List folder name')
+    when_group = parser.add_mutually_exclusive_group(required=True)
+    when_group.add_argument('--as-of', help='Date (YYYY-MM-DD) or date-time (YYYY-MM-DD_HH-MM-SS), UTC')
+    when_group.add_argument('--sweep', action='store_true', help='Rebuild the list at every snapshot date')
+    parser.add_argument('--out-dir', help='Write CSVs here instead of printing (the list folder is never modified)')
+    args = parser.parse_args()
+
+    root = Path(args.root)
+    list_dir = root / args.list
+    if not list_dir.is_dir():
+        print(f"Invalid list: {list_dir}", file=sys.stderr)
+        sys.exit(1)
+    out_dir = Path(args.out_dir) if args.out_dir else None
+    if out_dir is not None:
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+    if args.sweep:
+        cache = SnapshotCache()
+        start = time.perf_counter()
+        versions = 0
+        for when, agg_rows, picks in sweep(list_dir, cache):
+            versions += 1
+            top = agg_rows[0]['Title'] if agg_rows else ''
+            print(f"{format_time(when)}  sources {len(picks):>3}  games {len(agg_rows):>4}  top: {top}")
+            if out_dir is not None:
+                write_csv_atomic(out_dir / f"{args.list} - {format_time(when)}.csv", AGG_FIELDS, agg_rows)
+        print(f"{versions} versions in {time.perf_counter() - start:.2f}s "
+              f"({cache.misses} CSV reads, {cache.hits} cache hits)", file=sys.stderr)
+        get_index(root).save()
+        return
+
+    try:
+        when = parse_as_of(args.as_of)
+    except ValueError as exc:
+        print(str(exc), file=sys.stderr)
+        sys.exit(1)
+    agg_rows, picks = aggregate_as_of(list_dir, when)
+    get_index(root).save()
+    if not picks:
+        print(f"No source of {args.list} has a snapshot by {args.as_of}.", file=sys.stderr)
+        sys.exit(1)
+    if out_dir is not None:
+        out_path = out_dir / 'aggregated-list.csv'
+        write_csv_atomic(out_path, AGG_FIELDS, agg_rows)
+        print(f"Written: {out_path} ({len(picks)} sources)")
+        return
+    writer = csv.DictWriter(sys.stdout, fieldnames=AGG_FIELDS, extrasaction='ignore', lineterminator='\n')
+    writer.writeheader()
+    writer.writerows(agg_rows)
+
+
+if __name__ == '__main__':
+    main()
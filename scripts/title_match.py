@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Resolve title variants across sources to one canonical title.
+
+`aggregate_rows` keys on the exact `Title`, so "Pokémon Red/Blue" and
+"Pokemon Red and Blue" are counted as two games. `TitleIndex` keeps a
+catalogue of canonical titles (the first spelling seen) and resolves each
+incoming row, in order:
+1. exact title already in the catalogue: unchanged, as today;
+2. same `GameId` as a catalogue entry;
+3. same normalized key (accents, case, punctuation, "&" / "/" as "and", a
+   leading "The" and a trailing "Version" are ignored);
+4. trigram similarity of the normalized keys (Jaccard >= `threshold`).
+
+Steps 2 to 4 only merge compatible titles: release years at most one year
+apart, no conflicting GameIds, and for step 4 the same numbers (digits and
+roman numerals), so "Final Fantasy VII" never absorbs "Final Fantasy VIII".
+
+Step 4 does not compare titles pairwise. Trigrams are put in one fixed order
+(rare characters first); two titles can only reach the threshold if they
+share one of the first n - ceil(threshold * n) + 1 trigrams of each
+(prefix filtering), so the inverted index holds only those, bucketed by the
+number of trigrams of the entry, and a lookup reads the buckets of its own
+prefix within the length bounds of the threshold before verifying the few
+candidates exactly. The result is the same as a full scan; with 300,000
+titles a lookup takes well under a millisecond, against about 300 ms for a
+pairwise scan (`benchmarks/bench_titles.py`).
+
+Every merge is only a proposal: a shared `GameId` also links a game to its
+renamed release or to a follow-up ("Dragon Age: Dreadwolf" and "The
+Veilguard", "The Walking Dead" and "Season One"). This script and
+`build_site.py --fuzzy-titles` write them to `list/.title-merges.csv` without
+changing any list. A copy of that report with the wrong rows deleted is
+applied by `build_site.py --apply-merges <file>` (`load_approved`,
+`apply_approved`), which renames exactly those titles.
+
+Usage examples:
+- Review the merges:            python scripts/title_match.py
+- Stricter similarity:          python scripts/title_match.py --threshold 0.9
+- Write the report elsewhere:   python scripts/title_match.py --out merges.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import math
+import re
+import sys
+import unicodedata
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from atomic_io import write_csv_atomic
+from rebuild_list import list_available_lists, pick_sources_for_list, read_picks_rows, script_root_list_dir
+
+
+REPORT_NAME = '.title-merges.csv'
+REPORT_FIELDS = ['Theme', 'SourceFile', 'Title', 'CanonicalTitle', 'Reason', 'Similarity']
+DEFAULT_THRESHOLD = 0.85
+YEAR_TOLERANCE = 1
+
+_QUOTES = str.maketrans({'’': "'", '‘': "'", 'ʼ': "'", '`': "'"})
+_AND_RE = re.compile(r"\s*(?:&|/|\+)\s*")
+_APOSTROPHE_RE = re.compile(r"'")
+_PUNCT_RE = re.compile(r"[^\w\s]+")
+_SPACE_RE = re.compile(r"\s+")
+_ROMAN_RE = re.compile(r"^(?:x{0,3})(?:ix|iv|v?i{0,3})$")
+
+
+def normalize_title(title: str) -> str:
+    """Key under which spelling variants of one title compare equal."""
+    text = unicodedata.normalize('NFKD', title.translate(_QUOTES))
+    text = ''.join(c for c in text if not unicodedata.combining(c)).casefold()
+    text = _AND_RE.sub(' and ', text)
+    text = _APOSTROPHE_RE.sub('', text)
+    text = _SPACE_RE.sub(' ', _PUNCT_RE.sub(' ', text).replace('_', ' ')).strip()
+    if text.startswith('the '):
+        text = text[4:]
+    if text.endswith(' version'):
+        text = text[:-8]
+    return text
+
+
+def trigrams(key: str) -> FrozenSet[str]:
+    padded = f"  {key} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+# Rough frequency of each character in titles; rare characters come first in
+# the global trigram order, so the trigrams indexed and probed are rare ones
+_CHAR_RANK = {c: i + 1 for i, c in enumerate(reversed(' etaoinshrdlcumwfgypbvkjxqz'))}
+
+
+def gram_order(gram: str) -> Tuple[int, str]:
+    return sum(_CHAR_RANK.get(c, 0) for c in gram), gram
+
+
+def prefix_length(n: int, threshold: float) -> int:
+    # A set of n trigrams can only reach Jaccard >= threshold with a set that
+    # shares one of its first n - ceil(threshold * n) + 1 trigrams in any
+    # fixed global order (prefix filtering)
+    return n - math.ceil(threshold * n - 1e-9) + 1 if n else 0
+
+
+def numbers(key: str) -> FrozenSet[str]:
+    # Sequel markers: "2" / "ii" and "3" / "iii" are kept apart on purpose,
+    # as sources rarely mix the two spellings
+    return frozenset(t for t in key.split() if t.isdigit() or (_ROMAN_RE.match(t) and t))
+
+
+def release_year(date: Optional[str]) -> Optional[int]:
+    head = (date or '').strip().split('-')[0]
+    return int(head) if head.isdigit() else None
+
+
+@dataclass
+class Match:
+    title: str
+    reason: str
+    similarity: float
+
+
+class TitleIndex:
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD) -> None:
+        self.threshold = threshold
+        # One slot per canonical title
+        self.titles: List[str] = []
+        self.grams: List[FrozenSet[str]] = []
+        self.numbers: List[FrozenSet[str]] = []
+        self.years: List[Optional[int]] = []
+        self.game_ids: List[Optional[str]] = []
+        self.by_title: Dict[str, int] = {}
+        # (title, year, GameId) of a variant -> its match
+        self.aliases: Dict[Tuple[str, Optional[int], Optional[str]], Match] = {}
+        self.by_key: Dict[str, List[int]] = {}
+        self.by_game_id: Dict[str, int] = {}
+        # trigram -> number of trigrams of the entry -> entries
+        self.postings: Dict[str, Dict[int, List[int]]] = {}
+        self._keys: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+    def key(self, title: str) -> str:
+        key = self._keys.get(title)
+        if key is None:
+            key = self._keys[title] = normalize_title(title)
+        return key
+
+    def add(self, title: str, year: Optional[int] = None, game_id: Optional[str] = None) -> int:
+        entry = len(self.titles)
+        key = self.key(title)
+        grams = trigrams(key)
+        self.titles.append(title)
+        self.grams.append(grams)
+        self.numbers.append(numbers(key))
+        self.years.append(year)
+        self.game_ids.append(game_id)
+        self.by_title[title] = entry
+        self.by_key.setdefault(key, []).append(entry)
+        if game_id:
+            self.by_game_id.setdefault(game_id, entry)
+        # Only the prefix of each entry is indexed, see prefix_length()
+        n = len(grams)
+        for g in sorted(grams, key=gram_order)[:prefix_length(n, self.threshold)]:
+            self.postings.setdefault(g, {}).setdefault(n, []).append(entry)
+        return entry
+
+    def compatible(self, entry: int, year: Optional[int], game_id: Optional[str]) -> bool:
+        other_year = self.years[entry]
+        if year is not None and other_year is not None and abs(year - other_year) > YEAR_TOLERANCE:
+            return False
+        other_id = self.game_ids[entry]
+        return not (game_id and other_id and game_id != other_id)
+
+    def similar(self, key: str, year: Optional[int], game_id: Optional[str]) -> Tuple[Optional[int], float]:
+        grams = trigrams(key)
+        n = len(grams)
+        if not n:
+            return None, 0.0
+        postings = self.postings
+        probe = sorted(grams, key=gram_order)[:prefix_length(n, self.threshold)]
+        # Length filter: Jaccard >= t needs t * n <= len(other) <= n / t
+        lengths = range(math.ceil(self.threshold * n - 1e-9), int(n / self.threshold + 1e-9) + 1)
+        seen = set()
+        best, best_sim = None, 0.0
+        nums = numbers(key)
+        all_grams = self.grams
+        for g in probe:
+            buckets = postings.get(g)
+            if not buckets:
+                continue
+            for length in lengths:
+                for entry in buckets.get(length, ()):
+                    if entry in seen:
+                        continue
+                    seen.add(entry)
+                    shared = len(grams & all_grams[entry])
+                    sim = shared / (n + length - shared)
+                    if sim >= self.threshold and sim > best_sim and self.numbers[entry] == nums \
+                            and self.compatible(entry, year, game_id):
+                        best, best_sim = entry, sim
+        return best, best_sim
+
+    def resolve(self, title: str, year: Optional[int] = None, game_id: Optional[str] = None) -> Match:
+        """Canonical title for `title`, adding it to the catalogue when new."""
+        # A variant resolves the same way every time it is seen with the same
+        # year and GameId; another year or id may make the match incompatible
+        # (and add the title itself to the catalogue, hence checked first)
+        alias = (title, year, game_id)
+        match = self.aliases.get(alias)
+        if match is not None:
+            return match
+        entry = self.by_title.get(title)
+        if entry is not None:
+            return Match(title, 'exact', 1.0)
+        match = self.match(title, year, game_id)
+        if match is None:
+            self.add(title, year, game_id)
+            return Match(title, 'new', 1.0)
+        self.aliases[alias] = match
+        return match
+
+    def match(self, title: str, year: Optional[int], game_id: Optional[str]) -> Optional[Match]:
+        if game_id:
+            entry = self.by_game_id.get(game_id)
+            if entry is not None and self.compatible(entry, year, game_id):
+                return Match(self.titles[entry], 'game_id', 1.0)
+        key = self.key(title)
+        for entry in self.by_key.get(key, ()):
+            if self.compatible(entry, year, game_id):
+                return Match(self.titles[entry], 'normalized', 1.0)
+        entry, sim = self.similar(key, year, game_id)
+        if entry is not None:
+            return Match(self.titles[entry], 'trigram', sim)
+        return None
+
+
+def resolve_rows(index: TitleIndex, rows: Iterable[Dict[str, str]], theme: str,
+                 merges: List[Dict[str, object]]) -> List[Dict[str, str]]:
+    """Rewrite the titles of `rows` to their canonical titles, recording merges."""
+    out: List[Dict[str, str]] = []
+    for r in rows:
+        title = r.get('Title', '').strip()
+        if title:
+            match = index.resolve(title, release_year(r.get('ReleaseDate')), (r.get('GameId') or '').strip() or None)
+            if match.title != title:
+                merges.append({'Theme': theme, 'SourceFile': r.get('SourceFile', ''), 'Title': title,
+                               'CanonicalTitle': match.title, 'Reason': match.reason,
+                               'Similarity': round(match.similarity, 3)})
+                r = {**r, 'Title': match.title}
+        out.append(r)
+    return out
+
+
+def write_report(path: Path, merges: List[Dict[str, object]]) -> Path:
+    write_csv_atomic(path, REPORT_FIELDS, merges)
+    return path
+
+
+def load_approved(path: Path) -> Dict[str, str]:
+    """Title -> canonical title of the rows kept in a reviewed report."""
+    approved: Dict[str, str] = {}
+    with path.open('r', encoding='utf-8', newline='') as f:
+        for r in csv.DictReader(f):
+            title = (r.get('Title') or '').strip()
+            canonical = (r.get('CanonicalTitle') or '').strip()
+            if title and canonical and title != canonical:
+                approved[title] = canonical
+    return approved
+
+
+def apply_approved(rows: Iterable[Dict[str, str]], approved: Dict[str, str]) -> List[Dict[str, str]]:
+    """`rows` with the approved titles renamed; other rows are passed through."""
+    out: List[Dict[str, str]] = []
+    for r in rows:
+        canonical = approved.get((r.get('Title') or '').strip())
+        out.append({**r, 'Title': canonical} if canonical else r)
+    return out
+
+
+def match_all(root: Path, threshold: float = DEFAULT_THRESHOLD) -> Tuple[TitleIndex, List[Dict[str, object]]]:
+    index = TitleIndex(threshold)
+    merges: List[Dict[str, object]] = []
+    for list_dir in list_available_lists(root):
+        resolve_rows(index, read_picks_rows(pick_sources_for_list(list_dir)), list_dir.name, merges)
+    return index, merges
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Report the title variants merged by fuzzy matching')
+    parser.add_argument('--root', default=str(script_root_list_dir()), help='Root folder containing lists (default: list)')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f'Minimum trigram Jaccard similarity (default: {DEFAULT_THRESHOLD})')
+    parser.add_argument('--out', help=f'Report CSV (default: <root>/{REPORT_NAME})')
+    args = parser.parse_args()
+
+    root = Path(args.root)
+    if not root.exists() or not root.is_dir():
+        print(f"Invalid root: {root}", file=sys.stderr)
+        sys.exit(1)
+
+    index, merges = match_all(root, args.threshold)
+    path = write_report(Path(args.out) if args.out else root / REPORT_NAME, merges)
+    distinct = {(str(m['Title']), str(m['CanonicalTitle'])): str(m['Reason']) for m in merges}
+    by_reason: Dict[str, int] = {}
+    for (title, canonical), reason in sorted(distinct.items()):
+        by_reason[reason] = by_reason.get(reason, 0) + 1
+        print(f"{title}  ->  {canonical}  [{reason}]")
+    print(f"{len(index)} canonical titles; {len(distinct)} variants merged "
+          f"({', '.join(f'{k}: {v}' for k, v in sorted(by_reason.items())) or 'none'}) in {len(merges)} rows.")
+    print(f"Report: {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+"""
+Check every CSV under `list/` and report malformed data before it reaches the
+aggregates.
+
+`generate_all_aggregates.py` stops at the first score that is not a number
+and `rebuild_list.aggregate_rows` counts it as 0; this reports every such row
+instead, with its file and line. Checks, per file (run in parallel):
+- source CSVs: the header (`Position,Title,ReleaseDate,ExternalId,Score,
+  GameId,CoverImageId`), rows with too many or too few fields, empty titles,
+  positions that are not positive integers, scores `int(float(score))`
+  cannot convert (`abc`, but also `inf`, `nan` or `1e400`), release dates
+  that are not YYYY-MM-DD, non-integer GameId / ExternalId, duplicate
+  positions and titles, positions that are not 1..n, and scores that rise
+  while the position gets worse;
+- `aggregated-list.csv`: the header, integer columns, duplicate positions and
+  titles, and TotalScore ordered by position;
+and across files:
+- `about.csv`: the header, duplicate sources, `GeneratedCsvPath` entries that
+  point to no file (the path is resolved as the pages resolve it: inside the
+  theme folder, or inside the folder of its source), entries that are not the
+  latest snapshot of their source, and sources missing from the file;
+- GameId conflicts: a GameId given different titles, or a title given
+  different GameIds, across all source CSVs.
+
+Problems that make the data unusable (a crash or a silent 0 in the scripts)
+are errors, the others warnings. The report is JSON: totals per severity and
+per check, then every issue as `{severity, check, file, line, message}` with
+`file` relative to the root and `line` the line in the file (0 for the whole
+file).
+
+Results are cached per file in `list/.validate-cache.json` with the file's
+size, mtime and SHA-256, so a later run only checks the files whose content
+changed (the about.csv and GameId checks are always redone from the cached
+per-file data).
+
+Usage examples:
+- Check everything:             python scripts/validate_lists.py
+- Write the JSON report:        python scripts/validate_lists.py --out report.json
+- Fail on warnings too:         python scripts/validate_lists.py --strict
+- Ignore the cache:             python scripts/validate_lists.py --force --jobs 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import concurrent.futures
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from atomic_io import write_bytes_atomic
+from instrument import add_arguments, count, session_from_args, stage
+from rebuild_list import get_index, script_root_list_dir
+
+
+CACHE_NAME = '.validate-cache.json'
+CACHE_VERSION = 2
+REPORT_VERSION = 1
+ERROR = 'error'
+WARNING = 'warning'
+
+SOURCE_FIELDS = ['Position', 'Title', 'ReleaseDate', 'ExternalId', 'Score', 'GameId', 'CoverImageId']
+# Without these a source CSV cannot be aggregated at all
+SOURCE_REQUIRED = ('Position', 'Title', 'Score')
+AGGREGATED_FIELDS = ['Position', 'Title', 'TotalScore', 'ListsAppeared']
+ABOUT_FIELDS = ['SourceName', 'SourceURL', 'SourceId', 'GeneratedCsvPath']
+AGGREGATED_NAME = 'aggregated-list.csv'
+ABOUT_NAME = 'about.csv'
+
+_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+_INT_RE = re.compile(r"^-?\d+$")
+
+Issue = Dict[str, object]
+
+
+@dataclass
+class ValidationSummary:
+    files: int = 0
+    checked: int = 0
+    cached: int = 0
+    issues: List[Issue] = field(default_factory=list)
+
+    @property
+    def errors(self) -> int:
+        return sum(1 for i in self.issues if i['severity'] == ERROR)
+
+    @property
+    def warnings(self) -> int:
+        return sum(1 for i in self.issues if i['severity'] == WARNING)
+
+    def report(self) -> Dict[str, object]:
+        return {'version': REPORT_VERSION, 'files': self.files, 'checked': self.checked, 'cached': self.cached,
+                'counts': {ERROR: self.errors, WARNING: self.warnings},
+                'checks': dict(sorted(Counter(str(i['check']) for i in self.issues).items())),
+                'issues': self.issues}
+
+
+def issue(severity: str, check: str, file: str, line: int, message: str) -> Issue:
+    return {'severity': severity, 'check': check, 'file': file, 'line': line, 'message': message}
+
+
+def file_kind(name: str) -> str:
+    if name == ABOUT_NAME:
+        return 'about'
+    if name == AGGREGATED_NAME:
+        return 'aggregated'
+    return 'source'
+
+
+def list_csv_files(root: Path) -> List[str]:
+    """Every CSV under `root` as a POSIX path relative to it, skipping dot files and folders."""
+    out: List[str] = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+        rel = Path(dirpath).relative_to(root)
+        for name in sorted(filenames):
+            if name.lower().endswith('.csv') and not name.startswith('.'):
+                out.append((rel / name).as_posix())
+    return out
+
+
+def _score(value: Optional[str]) -> Optional[int]:
+    # The conversion the aggregates apply: inf, nan or 1e400 make it raise
+    try:
+        return int(float(value))  # type: ignore[arg-type]
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def _header_issues(rel: str, header: List[str], expected: List[str], required) -> List[Issue]:
+    out: List[Issue] = []
+    missing = [f for f in expected if f not in header]
+    for name in missing:
+        out.append(issue(ERROR if name in required else WARNING, 'header', rel, 1, f"Missing column {name!r}"))
+    extra = [f for f in header if f not in expected]
+    if extra:
+        out.append(issue(WARNING, 'header', rel, 1, f"Unexpected columns: {', '.join(map(repr, extra))}"))
+    dupes = [f for f, n in Counter(header).items() if n > 1]
+    if dupes:
+        out.append(issue(ERROR, 'header', rel, 1, f"Repeated columns: {', '.join(map(repr, dupes))}"))
+    if not missing and not extra and not dupes and header != expected:
+        out.append(issue(WARNING, 'header', rel, 1, f"Columns out of order: {','.join(header)}"))
+    return out
+
+
+def _ranking_issues(rel: str, rows: List[Tuple[int, Optional[int], str, Optional[int]]], score_name: str) -> List[Issue]:
+    # rows: (line, position, stripped title, score) of the rows that parsed
+    out: List[Issue] = []
+    first_line: Dict[int, int] = {}
+    for line, position, _, _ in rows:
+        if position is None:
+            continue
+        if position in first_line:
+            out.append(issue(ERROR, 'duplicate_position', rel, line,
+                             f"Position {position} already on line {first_line[position]}"))
+        else:
+            first_line[position] = line
+    title_line: Dict[str, int] = {}
+    for line, _, title, _ in rows:
+        if not title:
+            continue
+        if title in title_line:
+            out.append(issue(WARNING, 'duplicate_title', rel, line,
+                             f"Title {title!r} already on line {title_line[title]}"))
+        else:
+            title_line[title] = line
+    positions = sorted(first_line)
+    if positions and positions != list(range(1, len(positions) + 1)):
+        out.append(issue(WARNING, 'position_gap', rel, 0,
+                         f"Positions are not 1..{len(positions)} (from {positions[0]} to {positions[-1]})"))
+    # A worse position should never score higher than a better one
+    ranked = sorted((p, s, line) for line, p, _, s in rows if p is not None and s is not None)
+    for (p1, s1, _), (p2, s2, line) in zip(ranked, ranked[1:]):
+        if s2 > s1 and p2 > p1:
+            out.append(issue(WARNING, 'score_order', rel, line,
+                             f"{score_name} {s2:g} at position {p2} is above {s1:g} at position {p1}"))
+    return out
+
+
+def check_source(rel: str, text: str) -> Tuple[List[Issue], List[List[str]]]:
+    """Issues of one source CSV, and its distinct [GameId, title] pairs."""
+    out: List[Issue] = []
+    reader = csv.reader(io.StringIO(text, newline=''))
+    header = next(reader, None)
+    if header is None:
+        return [issue(ERROR, 'header', rel, 1, 'Empty file')], []
+    out += _header_issues(rel, header, SOURCE_FIELDS, SOURCE_REQUIRED)
+    col = {name: i for i, name in reversed(list(enumerate(header)))}
+    rows: List[Tuple[int, Optional[int], str, Optional[int]]] = []
+    ids: Dict[Tuple[str, str], None] = {}
+
+    def get(values: List[str], name: str) -> Optional[str]:
+        i = col.get(name)
+        return values[i] if i is not None and i < len(values) else None
+
+    for values in reader:
+        line = reader.line_num
+        if not any(v.strip() for v in values):
+            continue
+        if len(values) != len(header):
+            out.append(issue(ERROR, 'row_length', rel, line, f"{len(values)} fields, header has {len(header)}"))
+        title = (get(values, 'Title') or '').strip()
+        if not title:
+            out.append(issue(ERROR, 'type', rel, line, 'Empty Title'))
+        raw_position = (get(values, 'Position') or '').strip()
+        position = int(raw_position) if _INT_RE.match(raw_position) and int(raw_position) > 0 else None
+        if position is None and 'Position' in col:
+            out.append(issue(ERROR, 'type', rel, line, f"Position {raw_position!r} is not a positive integer"))
+        raw_score = get(values, 'Score')
+        score = _score(raw_score)
+        if score is None and 'Score' in col:
+            out.append(issue(ERROR, 'type', rel, line, f"Score {raw_score!r} is not a finite number"))
+        date = (get(values, 'ReleaseDate') or '').strip()
+        if date and not _DATE_RE.match(date):
+            out.append(issue(WARNING, 'type', rel, line, f"ReleaseDate {date!r} is not YYYY-MM-DD"))
+        for name in ('GameId', 'ExternalId'):
+            value = (get(values, name) or '').strip()
+            if value and not _INT_RE.match(value):
+                out.append(issue(WARNING, 'type', rel, line, f"{name} {value!r} is not an integer"))
+        game_id = (get(values, 'GameId') or '').strip()
+        if game_id and title:
+            ids.setdefault((game_id, title), None)
+        rows.append((line, position, title, score))
+    out += _ranking_issues(rel, rows, 'Score')
+    return out, [list(k) for k in ids]
+
+
+def check_aggregated(rel: str, text: str) -> List[Issue]:
+    out: List[Issue] = []
+    reader = csv.DictReader(io.StringIO(text, newline=''))
+    header = reader.fieldnames
+    if header is None:
+        return [issue(ERROR, 'header', rel, 1, 'Empty file')]
+    out += _header_issues(rel, list(header), AGGREGATED_FIELDS, AGGREGATED_FIELDS)
+    rows: List[Tuple[int, Optional[int], str, Optional[int]]] = []
+    for r in reader:
+        line = reader.line_num
+        if None in r or any(v is None for v in r.values()):
+            out.append(issue(ERROR, 'row_length', rel, line, 'Field count differs from the header'))
+        values = {name: (r.get(name) or '').strip() for name in AGGREGATED_FIELDS}
+        bad = [name for name in ('Position', 'TotalScore', 'ListsAppeared')
+               if not _INT_RE.match(values[name]) or _score(values[name]) is None]
+        for name in bad:
+            out.append(issue(ERROR, 'type', rel, line, f"{name} {values[name]!r} is not an integer"))
+        if not values['Title']:
+            out.append(issue(ERROR, 'type', rel, line, 'Empty Title'))
+        position = int(values['Position']) if 'Position' not in bad else None
+        total = _score(values['TotalScore']) if 'TotalScore' not in bad else None
+        rows.append((line, position, values['Title'], total))
+    out += _ranking_issues(rel, rows, 'TotalScore')
+    return out
+
+
+def check_file(job: Tuple[str, str, str, Optional[str]]) -> Dict[str, object]:
+    """Worker: read, hash and check one file; the issues are skipped when the hash is `known`."""
+    root, rel, kind, known = job
+    path = os.path.join(root, rel)
+    with open(path, 'rb') as f:
+        data = f.read()
+        st = os.fstat(f.fileno())
+    entry: Dict[str, object] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns,
+                                'sha256': hashlib.sha256(data).hexdigest()}
+    if entry['sha256'] == known:
+        return entry
+    try:
+        text = data.decode('utf-8')
+    except UnicodeDecodeError as exc:
+        entry['issues'] = [issue(ERROR, 'encoding', rel, 0, f"Not UTF-8: {exc}")]
+        entry['ids'] = []
+        return entry
+    if kind == 'source':
+        entry['issues'], entry['ids'] = check_source(rel, text)
+    else:
+        entry['issues'], entry['ids'] = check_aggregated(rel, text), []
+    return entry
+
+
+def resolve_generated(list_dir: Path, rel_path: str) -> Optional[Path]:
+    # As js/list.js: inside the theme folder, or a bare file name inside the
+    # folder of its source ("<source> - <timestamp>.csv")
+    candidates = [list_dir / rel_path]
+    if '/' not in rel_path and ' - ' in rel_path:
+        candidates.append(list_dir / rel_path.split(' - ', 1)[0] / rel_path)
+    return next((p for p in candidates if p.is_file()), None)
+
+
+def check_about(root: Path, list_dir: Path, picks) -> List[Issue]:
+    rel = (list_dir / ABOUT_NAME).relative_to(root).as_posix()
+    path = list_dir / ABOUT_NAME
+    if not path.is_file():
+        if picks:
+            return [issue(WARNING, 'about_missing', list_dir.relative_to(root).as_posix(), 0,
+                          f"No about.csv for {len(picks)} sources")]
+        return []
+    out: List[Issue] = []
+    try:
+        with path.open('r', encoding='utf-8', newline='') as f:
+            reader = csv.DictReader(f)
+            header = list(reader.fieldnames or [])
+            rows = [(reader.line_num, r) for r in reader]
+    except (UnicodeDecodeError, csv.Error) as exc:
+        return [issue(ERROR, 'encoding', rel, 0, str(exc))]
+    out += _header_issues(rel, header, ABOUT_FIELDS, ('SourceName', 'GeneratedCsvPath'))
+    latest = {p.name.strip().lower(): p.csv_path for p in picks}
+    seen: Dict[str, int] = {}
+    for line, r in rows:
+        name = (r.get('SourceName') or '').strip()
+        generated = (r.get('GeneratedCsvPath') or '').strip()
+        if not name:
+            out.append(issue(ERROR, 'type', rel, line, 'Empty SourceName'))
+            continue
+        key = name.lower()
+        if key in seen:
+            out.append(issue(WARNING, 'about_duplicate', rel, line, f"Source {name!r} already on line {seen[key]}"))
+            continue
+        seen[key] = line
+        target = resolve_generated(list_dir, generated) if generated else None
+        if target is None:
+            out.append(issue(ERROR, 'about_missing_file', rel, line,
+                             f"GeneratedCsvPath {generated!r} of {name!r} points to no file"))
+        elif key in latest and target.resolve() != latest[key].resolve():
+            out.append(issue(WARNING, 'about_stale', rel, line,
+                             f"{name!r} uses {generated!r}, latest is {latest[key].relative_to(list_dir).as_posix()!r}"))
+    for key, csv_path in latest.items():
+        if key not in seen:
+            out.append(issue(WARNING, 'about_unlisted', rel, 0,
+                             f"Source {csv_path.relative_to(list_dir).as_posix()!r} is not in about.csv"))
+    return out
+
+
+def check_game_ids(entries: Dict[str, Dict[str, object]]) -> List[Issue]:
+    """A GameId with several titles, or a title with several GameIds, across source CSVs."""
+    titles: Dict[str, Dict[str, str]] = {}
+    game_ids: Dict[str, Dict[str, str]] = {}
+    for rel in sorted(entries):
+        for game_id, title in entries[rel].get('ids') or []:
+            titles.setdefault(game_id, {}).setdefault(title, rel)
+            game_ids.setdefault(title, {}).setdefault(game_id, rel)
+    out: List[Issue] = []
+    for game_id, seen in titles.items():
+        if len(seen) > 1:
+            first = next(iter(seen.values()))
+            out.append(issue(WARNING, 'game_id_titles', first, 0, f"GameId {game_id} has {len(seen)} titles: " +
+                             '; '.join(f"{t!r} ({f})" for t, f in seen.items())))
+    for title, seen in game_ids.items():
+        if len(seen) > 1:
+            first = next(iter(seen.values()))
+            out.append(issue(WARNING, 'title_game_ids', first, 0, f"Title {title!r} has {len(seen)} GameIds: " +
+                             '; '.join(f"{g} ({f})" for g, f in seen.items())))
+    return out
+
+
+def load_cache(root: Path) -> Dict[str, Dict[str, object]]:
+    try:
+        with (root / CACHE_NAME).open('r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get('version') != CACHE_VERSION:
+        return {}
+    files = data.get('files')
+    return files if isinstance(files, dict) else {}
+
+
+def save_cache(root: Path, files: Dict[str, Dict[str, object]]) -> Path:
+    path = root / CACHE_NAME
+    write_bytes_atomic(path, json.dumps({'version': CACHE_VERSION, 'files': dict(sorted(files.items()))},
+                                        ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+    return path
+
+
+def map_checks(work: List[Tuple[str, str, str, Optional[str]]], jobs: int) -> Iterator[Dict[str, object]]:
+    # Results in input order; files are small, so workers take them in chunks
+    if jobs <= 1 or len(work) <= 1:
+        yield from map(check_file, work)
+        return
+    with concurrent.futures.ProcessPoolExecutor(max_workers=min(jobs, len(work))) as ex:
+        yield from ex.map(check_file, work, chunksize=max(1, len(work) // (jobs * 4)))
+
+
+def validate(root: Optional[Path] = None, jobs: Optional[int] = None, force: bool = False) -> ValidationSummary:
+    """Check every CSV under `root`, only reading the files whose size or mtime changed."""
+    root = root or script_root_list_dir()
+    jobs = jobs or os.cpu_count() or 1
+    cache = {} if force else load_cache(root)
+    summary = ValidationSummary()
+    entries: Dict[str, Dict[str, object]] = {}
+
+    with stage('scan'):
+        files = list_csv_files(root)
+    summary.files = len(files)
+    work: List[Tuple[str, str, str, Optional[str]]] = []
+    for rel in files:
+        kind = file_kind(rel.rsplit('/', 1)[-1])
+        if kind == 'about':
+            continue
+        prev = cache.get(rel)
+        try:
+            st = os.stat(root / rel)
+        except OSError:
+            continue
+        if prev and prev.get('size') == st.st_size and prev.get('mtime_ns') == st.st_mtime_ns:
+            entries[rel] = prev
+        else:
+            work.append((str(root), rel, kind, str(prev['sha256']) if prev else None))
+
+    with stage('check'):
+        for (_, rel, _, _), entry in zip(work, map_checks(work, jobs)):
+            if 'issues' in entry:
+                summary.checked += 1
+            else:
+                # Same content under a new mtime
+                entry = {**cache[rel], **entry}
+            entries[rel] = entry
+    summary.cached = len(entries) - summary.checked
+    count('files_checked', summary.checked)
+    count('files_cached', summary.cached)
+
+    with stage('cross'):
+        for rel in sorted(entries):
+            summary.issues.extend(entries[rel].get('issues') or [])  # type: ignore[arg-type]
+        index = get_index(root)
+        for list_dir in index.lists():
+            summary.issues.extend(check_about(root, list_dir, index.picks(list_dir)))
+        summary.issues.extend(check_game_ids(entries))
+        index.save()
+
+    if entries != cache:
+        save_cache(root, entries)
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Check every CSV under list/ and report malformed data')
+    parser.add_argument('--root', default=str(script_root_list_dir()), help='Root folder containing lists (default: list)')
+    parser.add_argument('--out', help='Write the JSON report to this file')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1,
+                        help='Worker processes for the file checks (default: number of CPUs)')
+    parser.add_argument('--force', action='store_true', help='Ignore the cache and check every file')
+    parser.add_argument('--strict', action='store_true', help='Exit with status 1 on warnings too')
+    parser.add_argument('--show', type=int, default=20, help='Issues printed (default: 20, errors first)')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    root = Path(args.root)
+    if not root.exists() or not root.is_dir():
+        print(f"Invalid root: {root}", file=sys.stderr)
+        sys.exit(1)
+
+    with session_from_args(args):
+        summary = validate(root, args.jobs, args.force)
+    report = summary.report()
+    print(f"Validated {summary.files} CSVs ({summary.checked} checked, {summary.cached} cached): "
+          f"{summary.errors} errors, {summary.warnings} warnings")
+    for check, n in report['checks'].items():  # type: ignore[union-attr]
+        print(f"  {check:>20}: {n}")
+    shown = sorted(summary.issues, key=lambda i: i['severity'] != ERROR)[:max(0, args.show)]
+    for i in shown:
+        print(f"{i['severity']}: {i['file']}:{i['line']}: [{i['check']}] {i['message']}")
+    if args.out:
+        write_bytes_atomic(Path(args.out), json.dumps(report, indent=1, ensure_ascii=False).encode('utf-8'))
+        print(f"Written: {args.out}")
+    if summary.errors or (args.strict and summary.warnings):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+"""
+Keep the generated files up to date while source snapshots are added.
+
+After a full build (as `build_site.py`), the watcher waits for changes under
+`list/` and rebuilds only the lists they belong to: a new or edited CSV in
+`list/<theme>/...` rewrites that list's `aggregated-list.csv` and `about.csv`,
+then the root `aggregated-list.csv`, `all_sources.csv`, the cover worklist,
+the manifest and the build cache are written again from what is kept in
+memory for every other list (their compact partials, source names and cover
+codes). Source CSVs are parsed once and kept while their size and mtime are
+unchanged, so only the new snapshot is read.
+
+Changes are picked up with inotify on Linux (every theme and source folder is
+watched, new folders as they appear) and by polling elsewhere or with
+`--poll`: each tick stats the source folders and the chosen CSVs. Files
+starting with "." (the temporary files of atomic writes), `about.csv` and
+`aggregated-list.csv` are ignored, so the watcher's own writes do not wake
+it up. Events are debounced: a rebuild starts once no event arrived for
+`--debounce` ms (at most `--max-wait` ms after the first one), so copying a
+batch of snapshots rebuilds each list once.
+
+The cover worklist, build cache and source index are only read by the
+scripts; they are written once the watcher has been idle for a second, and
+on exit. On the current data a single new snapshot reaches the outputs
+about 40 ms after it is dropped, debounce included
+(`benchmarks/bench_watch.py`); every rebuild is logged with its duration.
+Fuzzy title merging is not available here, as it depends on every list.
+With `--json-pages`, the JSON exports of the rebuilt lists and of the global
+list are written again as well (see json_export.py).
+
+A list whose rebuild fails (a CSV that is not UTF-8, a file removed while it
+is read, ...) is logged with the file at fault and keeps its previous build;
+the other lists are still written, and the failed list is tried again with the
+next change.
+
+Usage examples:
+- Watch list/:                  python scripts/watch.py
+- Poll every 100 ms:            python scripts/watch.py --poll --interval 100
+- Trace the rebuilds:           python scripts/watch.py --trace watch.json
+- Keep the JSON exports fresh:  python scripts/watch.py --json-pages
+"""
+
+from __future__ import annotations
+
+import argparse
+import ctypes
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from build_site import SiteBuild, ThemeBuild, build_theme, read_pick, save_caches, write_site
+from instrument import add_arguments, count, session_from_args, stage
+from json_export import DEFAULT_PAGE_SIZE, DEFAULT_SEARCH_SHARDS, EXPORT_DIR, ExportOptions
+from rebuild_list import SourcePick, get_index, script_root_list_dir
+from source_index import SKIP_NAMES
+
+
+DEFAULT_DEBOUNCE_MS = 20
+DEFAULT_MAX_WAIT_MS = 500
+DEFAULT_INTERVAL_MS = 50
+# The worklist, build cache and index are written after this long without changes
+IDLE_FLUSH_SECONDS = 1.0
+
+# <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+_EVENT = struct.Struct('iIII')
+
+
+def is_source_name(name: str) -> bool:
+    """Whether a file name can be a source snapshot (and not an output)."""
+    lower = name.lower()
+    return not name.startswith('.') and lower.endswith('.csv') and lower not in SKIP_NAMES
+
+
+class InotifyWatcher:
+    """Themes changed under `root`, from inotify events (Linux only)."""
+
+    name = 'inotify'
+    MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+
+    def __init__(self, root: Path) -> None:
+        libc = ctypes.CDLL(None, use_errno=True)
+        # AttributeError where the C library has no inotify
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self.fd = fd
+        self.root = root
+        # watch descriptor -> (theme, source folder) parts relative to root
+        self.dirs: Dict[int, Tuple[str, ...]] = {}
+        self._add(root, ())
+        for entry in os.scandir(root):
+            if entry.is_dir() and not entry.name.startswith('.'):
+                self._add_theme(entry.name)
+
+    def _add(self, path: Path, parts: Tuple[str, ...]) -> None:
+        wd = self._add_watch(self.fd, os.fsencode(path), self.MASK)
+        if wd >= 0:
+            self.dirs[wd] = parts
+            count('dirs_watched')
+
+    def _add_theme(self, theme: str) -> None:
+        list_dir = self.root / theme
+        self._add(list_dir, (theme,))
+        try:
+            with os.scandir(list_dir) as it:
+                for entry in it:
+                    if entry.is_dir():
+                        self._add(list_dir / entry.name, (theme, entry.name))
+        except OSError:
+            pass
+
+    def all_themes(self) -> Set[str]:
+        return {e.name for e in os.scandir(self.root) if e.is_dir() and not e.name.startswith('.')}
+
+    def wait(self, timeout: Optional[float]) -> Set[str]:
+        """Themes changed within `timeout` seconds (forever when None)."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        changed: Set[str] = set()
+        if not ready:
+            return changed
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, size = _EVENT.unpack_from(data, offset)
+                name = os.fsdecode(data[offset + _EVENT.size:offset + _EVENT.size + size].split(b'\0', 1)[0])
+                offset += _EVENT.size + size
+                self._event(wd, mask, name, changed)
+        count('watch_events')
+        return changed
+
+    def _event(self, wd: int, mask: int, name: str, changed: Set[str]) -> None:
+        if mask & IN_Q_OVERFLOW:
+            # Events were dropped: rebuild everything, watch what appeared
+            for theme in self.all_themes():
+                self._add_theme(theme)
+                changed.add(theme)
+            return
+        if mask & IN_IGNORED:
+            self.dirs.pop(wd, None)
+            return
+        parts = self.dirs.get(wd)
+        if parts is None or not name:
+            return
+        created = mask & (IN_CREATE | IN_MOVED_TO)
+        if mask & IN_ISDIR:
+            if not parts:
+                if name.startswith('.'):
+                    return
+                if created:
+                    self._add_theme(name)
+                changed.add(name)
+            elif len(parts) == 1:
+                if created:
+                    self._add(self.root / parts[0] / name, (parts[0], name))
+                changed.add(parts[0])
+        elif parts and not mask & IN_CREATE and is_source_name(name):
+            # A new file is reported again when it is closed (IN_CLOSE_WRITE)
+            changed.add(parts[0])
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class PollWatcher:
+    """Themes changed under `root`, from stats every `interval` seconds."""
+
+    name = 'poll'
+
+    def __init__(self, root: Path, interval: float = DEFAULT_INTERVAL_MS / 1000) -> None:
+        self.root = root
+        self.interval = interval
+        self.index = get_index(root)
+        # theme -> (paths stat-ed each tick, their signature)
+        self.themes: Dict[str, Tuple[List[Path], tuple]] = {}
+        for list_dir in self.index.lists():
+            self._track(list_dir.name)
+
+    def _track(self, theme: str) -> tuple:
+        list_dir = self.root / theme
+        entry = self.index.scan(list_dir)
+        # Source folders and the chosen CSVs; the theme folder itself by its
+        # listing, as rewriting its outputs changes its mtime
+        paths = [list_dir / name for name in entry['subdirs']]  # type: ignore[union-attr]
+        paths += [p.csv_path for p in self.index.picks(list_dir)]
+        signature = self._signature(list_dir, paths)
+        self.themes[theme] = (paths, signature)
+        return signature
+
+    @staticmethod
+    def _signature(list_dir: Path, paths: List[Path]) -> tuple:
+        try:
+            names = tuple(sorted(n for n in os.listdir(list_dir) if not n.startswith('.') and n.lower() not in SKIP_NAMES))
+        except OSError:
+            return ()
+        stats = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                stats.append(None)
+            else:
+                stats.append((st.st_mtime_ns, st.st_size))
+        return names, tuple(stats)
+
+    def poll(self) -> Set[str]:
+        changed: Set[str] = set()
+        current = {d.name for d in self.index.lists()}
+        for theme in current.symmetric_difference(self.themes):
+            changed.add(theme)
+            if theme in current:
+                self._track(theme)
+            else:
+                del self.themes[theme]
+        for theme, (paths, signature) in list(self.themes.items()):
+            if self._signature(self.root / theme, paths) != signature:
+                changed.add(theme)
+                self._track(theme)
+        count('polls')
+        return changed
+
+    def wait(self, timeout: Optional[float]) -> Set[str]:
+        """Themes changed within `timeout` seconds (forever when None)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            changed = self.poll()
+            if changed:
+                return changed
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                return changed
+            time.sleep(self.interval if deadline is None else min(self.interval, deadline - now))
+
+    def close(self) -> None:
+        pass
+
+
+def make_watcher(root: Path, poll: bool = False, interval: float = DEFAULT_INTERVAL_MS / 1000):
+    if not poll and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(root)
+        except (OSError, AttributeError) as e:
+            print(f"inotify unavailable ({e}); polling instead", file=sys.stderr)
+    return PollWatcher(root, interval)
+
+
+class WarmSite:
+    """Every list's build kept in memory, so one list can be rebuilt alone."""
+
+    def __init__(self, root: Path, site_dir: Path, export: Optional[ExportOptions] = None) -> None:
+        self.root = root
+        self.site_dir = site_dir
+        self.export = export
+        self.index = get_index(root)
+        self.list_dirs: List[Path] = []
+        self.builds: Dict[str, ThemeBuild] = {}
+        # CSV path -> ((size, mtime_ns), rows, fingerprint)
+        self.files: Dict[str, Tuple[Tuple[int, int], List[Dict[str, str]], Dict[str, object]]] = {}
+        self.stale = False
+        # theme -> why its last rebuild failed; retried with the next rebuild
+        self.failed: Dict[str, str] = {}
+        self.reading: Optional[str] = None
+
+    def read(self, list_dir: Path, pick: SourcePick) -> Tuple[List[Dict[str, str]], Dict[str, object]]:
+        # build_theme only reads the rows, so the cached ones are shared
+        path = self.reading = str(pick.csv_path)
+        st = os.stat(path)
+        cached = self.files.get(path)
+        if cached is not None and cached[0] == (st.st_size, st.st_mtime_ns) and cached[2]['name'] == pick.name:
+            count('files_cached')
+            return cached[1], cached[2]
+        rows, fingerprint = read_pick(list_dir, pick)
+        self.files[path] = ((st.st_size, st.st_mtime_ns), rows, fingerprint)
+        return rows, fingerprint
+
+    def rebuild(self, themes: Optional[Set[str]] = None) -> SiteBuild:
+        """Rebuild `themes` (every list when None), then the site-wide outputs.
+
+        The cover worklist, build cache and source index are left to flush().
+        """
+        with stage('scan'):
+            self.list_dirs = list_dirs = self.index.lists()
+        names = {d.name for d in list_dirs}
+        for theme in set(self.builds) - names:
+            del self.builds[theme]
+        for theme in set(self.failed) - names:
+            del self.failed[theme]
+        if themes is not None:
+            themes = themes | set(self.failed)
+        for list_dir in list_dirs:
+            theme = list_dir.name
+            if themes is not None and theme not in themes and theme in self.builds:
+                continue
+            self.reading = None
+            # A list that fails never stops the watcher: it keeps its previous
+            # build (or is left out until it builds) and is retried next time
+            try:
+                with stage('theme', theme=theme):
+                    with stage('scan'):
+                        picks = self.index.picks(list_dir)
+                    self.builds[theme] = build_theme(list_dir, picks, read=self.read, export=self.export)
+            except Exception as exc:
+                self.failed[theme] = f"{self.reading or list_dir}: {exc.__class__.__name__}: {exc}"
+                count('themes_failed')
+                print(f"Could not rebuild {theme} ({self.failed[theme]}); "
+                      f"{'keeping its previous build' if theme in self.builds else 'left out'}",
+                      file=sys.stderr, flush=True)
+                continue
+            self.failed.pop(theme, None)
+        # Forget the CSVs of rebuilt lists that are no longer chosen
+        live = {str(p.csv_path) for d in list_dirs if (themes is None or d.name in themes) and d.name not in self.failed
+                for p in self.index.picks(d)}
+        prefixes = None if themes is None else tuple(str(self.root / t) + os.sep for t in themes)
+        for path in [p for p in self.files if p not in live and (prefixes is None or p.startswith(prefixes))]:
+            del self.files[path]
+        self.stale = True
+        return write_site(self.root, self.site_dir, [self.builds[d.name] for d in list_dirs if d.name in self.builds],
+                          caches=False, export=self.export)
+
+    def flush(self) -> None:
+        """Write the files that only the scripts read."""
+        if self.stale:
+            with stage('flush'):
+                save_caches(self.root, [self.builds[d.name] for d in self.list_dirs if d.name in self.builds])
+                self.index.save()
+            self.stale = False
+
+
+def watch(root: Path, site_dir: Path, watcher, debounce: float = DEFAULT_DEBOUNCE_MS / 1000,
+          max_wait: float = DEFAULT_MAX_WAIT_MS / 1000, updates: int = 0,
+          export: Optional[ExportOptions] = None) -> None:
+    """Rebuild on changes until interrupted, or after `updates` rebuilds."""
+    site = WarmSite(root, site_dir, export)
+    start = time.perf_counter()
+    with stage('initial'):
+        result = site.rebuild()
+        site.flush()
+    print(f"Built {len(result.themes)} lists in {(time.perf_counter() - start) * 1000:.0f} ms; "
+          f"watching {root} ({watcher.name})", flush=True)
+    done = 0
+    try:
+        while not updates or done < updates:
+            themes = watcher.wait(IDLE_FLUSH_SECONDS if site.stale else None)
+            if not themes:
+                site.flush()
+                continue
+            first = time.perf_counter()
+            while debounce:
+                left = max_wait - (time.perf_counter() - first)
+                more = watcher.wait(min(debounce, left)) if left > 0 else set()
+                if not more:
+                    break
+                themes |= more
+            built = time.perf_counter()
+            failed = set(site.failed)
+            try:
+                with stage('update'):
+                    site.rebuild(themes)
+            except Exception as exc:
+                # The site-wide outputs could not be written: they are
+                # written again in full with the next change
+                done += 1
+                print(f"Could not update the site after {', '.join(sorted(themes))}: "
+                      f"{exc.__class__.__name__}: {exc}", file=sys.stderr, flush=True)
+                continue
+            end = time.perf_counter()
+            done += 1
+            themes = (themes | failed) - set(site.failed)
+            if not themes:
+                continue
+            print(f"Rebuilt {', '.join(sorted(themes))} in {(end - built) * 1000:.1f} ms "
+                  f"({(end - first) * 1000:.1f} ms after the first event)", flush=True)
+    finally:
+        site.flush()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Rebuild the lists whose sources change, as they change')
+    parser.add_argument('--root', default=str(script_root_list_dir()), help='Root folder containing lists (default: list)')
+    parser.add_argument('--site-dir', help='Folder for the root aggregated-list.csv and all_sources.csv '
+                                           '(default: the parent of the root)')
+    parser.add_argument('--poll', action='store_true', help='Poll for changes instead of using inotify')
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL_MS,
+                        help=f'Polling interval in ms (default: {DEFAULT_INTERVAL_MS})')
+    parser.add_argument('--debounce', type=float, default=DEFAULT_DEBOUNCE_MS,
+                        help=f'Quiet time in ms before rebuilding (default: {DEFAULT_DEBOUNCE_MS})')
+    parser.add_argument('--max-wait', type=float, default=DEFAULT_MAX_WAIT_MS,
+                        help=f'Longest delay in ms before rebuilding during a burst (default: {DEFAULT_MAX_WAIT_MS})')
+    parser.add_argument('--updates', type=int, default=0, help='Exit after this many rebuilds (default: never)')
+    parser.add_argument('--json-pages', action='store_true', help=f'Also write paginated JSON exports to {EXPORT_DIR}/')
+    parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE,
+                        help=f'Games per JSON page (default: {DEFAULT_PAGE_SIZE})')
+    parser.add_argument('--search-shards', type=int, default=DEFAULT_SEARCH_SHARDS,
+                        help=f'Files the title search index is split into (default: {DEFAULT_SEARCH_SHARDS})')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    root = Path(args.root)
+    if not root.exists() or not root.is_dir():
+        print(f"Invalid root: {root}", file=sys.stderr)
+        sys.exit(1)
+
+    site_dir = Path(args.site_dir) if args.site_dir else root.parent
+    export = ExportOptions(site_dir / EXPORT_DIR, args.page_size, args.search_shards) if args.json_pages else None
+    watcher = make_watcher(root, args.poll, args.interval / 1000)
+    try:
+        with session_from_args(args):
+            watch(root, site_dir, watcher, args.debounce / 1000, args.max_wait / 1000, args.updates, export)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# The scripts import each other by module name, as when run from scripts/
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / 'scripts'))
+sys.path.insert(0, str(REPO_ROOT))
@@ -0,0 +1,34 @@
+import csv
+import shutil
+from pathlib import Path
+
+from changelog import compute_changes, full_totals
+
+REPO_LIST = Path(__file__).resolve().parent.parent / 'list'
+THEMES = ['best_games_of_1995', 'best_games_of_2001', 'best_games_of_2002']
+
+
+def test_incremental_totals_match_a_full_recount(tmp_path):
+    root = tmp_path / 'list'
+    for theme in THEMES:
+        shutil.copytree(REPO_LIST / theme, root / theme)
+    _, state = compute_changes(root)
+    assert state['global'] == full_totals(state)
+
+    # A new snapshot with other scores, and a theme removed
+    src = root / THEMES[0] / 'imdb'
+    with next(src.glob('*.csv')).open(encoding='utf-8', newline='') as f:
+        reader = csv.DictReader(f)
+        rows = [dict(r, Score='99') for r in list(reader)[:5]]
+    with (src / 'imdb - 2099-01-01_00-00-00.csv').open('w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=reader.fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+    shutil.rmtree(root / THEMES[2])
+
+    diff, state = compute_changes(root, state)
+    assert diff['themes'][THEMES[0]]['status'] == 'changed'
+    assert diff['themes'][THEMES[2]]['status'] == 'removed'
+    assert THEMES[1] not in diff['themes']
+    assert state['global'] == full_totals(state)
+    assert state['global'] == compute_changes(root)[1]['global']
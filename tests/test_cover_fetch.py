@@ -0,0 +1,35 @@
+import asyncio
+from pathlib import Path
+
+from cover_fetch import DownloadOptions, download_all
+
+
+async def _serve(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    line = await reader.readline()
+    while (await reader.readline()) not in (b'\r\n', b''):
+        pass
+    if b'/bad' in line:
+        writer.write(b'garbage\r\n\r\n')
+    else:
+        writer.write(b'HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok')
+    await writer.drain()
+    writer.close()
+
+
+def test_one_file_failing_does_not_stop_the_run(tmp_path: Path):
+    async def run():
+        server = await asyncio.start_server(_serve, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        (tmp_path / 'blocked').write_text('not a folder')
+        tasks = [(f'http://127.0.0.1:{port}/bad', tmp_path / 'a.jpg'),           # ValueError from the parser
+                 (f'http://127.0.0.1:{port}/ok', tmp_path / 'blocked' / 'b.jpg'),  # OSError from the write
+                 (f'http://127.0.0.1:{port}/ok', tmp_path / 'c.jpg')]
+        try:
+            return await download_all(tasks, DownloadOptions(retries=1, backoff=0.01), tmp_path / 'journal.jsonl')
+        finally:
+            server.close()
+
+    stats = asyncio.run(run())
+    assert (stats.downloaded, stats.failed) == (1, 2)
+    assert (tmp_path / 'c.jpg').read_bytes() == b'ok'
+    assert sorted(url.rsplit('/', 1)[-1] for url, _ in stats.errors) == ['bad', 'ok']
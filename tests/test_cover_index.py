@@ -0,0 +1,31 @@
+import hashlib
+import os
+
+from cover_index import CoverIndex
+
+
+def test_refresh_hashes_lazily(tmp_path):
+    (tmp_path / 'abc_big.jpg').write_bytes(b'one')
+    (tmp_path / 'abc_small.jpg').write_bytes(b'two')
+    index = CoverIndex(tmp_path)
+    assert index.refresh() == (2, 0)
+    assert all('sha256' not in e for e in index.covers['abc'].values())
+    assert index.covers['abc']['big']['bytes'] == 3
+
+    assert index.sha256('abc', 'big') == hashlib.sha256(b'one').hexdigest()
+    index.save()
+    reloaded = CoverIndex.load(tmp_path)
+    assert reloaded.covers['abc']['big']['sha256'] == hashlib.sha256(b'one').hexdigest()
+    assert 'sha256' not in reloaded.covers['abc']['small']
+
+
+def test_sha256_follows_a_replaced_file(tmp_path):
+    path = tmp_path / 'abc_big.jpg'
+    path.write_bytes(b'one')
+    index = CoverIndex(tmp_path)
+    index.refresh()
+    index.sha256('abc', 'big')
+    path.write_bytes(b'other')
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert index.sha256('abc', 'big') == hashlib.sha256(b'other').hexdigest()
@@ -0,0 +1,20 @@
+from json_export import ExportOptions, write_export
+from rebuild_list import write_aggregated
+
+
+def test_rewritten_csv_drops_its_export(tmp_path):
+    list_dir = tmp_path / 'list' / 'rpg'
+    list_dir.mkdir(parents=True)
+    export_dir = tmp_path / 'pages' / 'rpg'
+    rows = [{'Position': 1, 'Title': 'A', 'TotalScore': 10, 'ListsAppeared': 1}]
+    write_aggregated(list_dir, rows)
+    write_export(export_dir, {'name': 'rpg'}, rows, ExportOptions(tmp_path / 'pages'))
+    assert (export_dir / 'index.json').is_file()
+
+    # The same content is not written again and keeps the export
+    write_aggregated(list_dir, rows)
+    assert (export_dir / 'index.json').is_file()
+
+    write_aggregated(list_dir, [{**rows[0], 'TotalScore': 11}])
+    assert not (export_dir / 'index.json').exists()
+    assert (export_dir / 'page-1.json').is_file()
@@ -0,0 +1,107 @@
+import asyncio
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+from list_api import ListApi, LRUCache, handle_connection
+
+REPO_LIST = Path(__file__).resolve().parent.parent / 'list'
+THEME = 'best_games_of_1995'
+
+
+@pytest.fixture
+def root(tmp_path):
+    shutil.copytree(REPO_LIST / THEME, tmp_path / 'list' / THEME)
+    return tmp_path / 'list'
+
+
+def _bump(path: Path) -> None:
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+
+def test_lru_does_not_cache_misses():
+    cache = LRUCache(4)
+    assert cache.get_or_create('a', lambda: None) is None
+    assert 'a' not in cache.items
+
+
+def test_rebuilt_list_is_served(root):
+    api = ListApi(root, check_interval=0)
+    path = f'/list/{THEME}/aggregated-list.csv'
+    before = api.lookup(path)
+    agg = root / THEME / 'aggregated-list.csv'
+    agg.write_bytes(agg.read_bytes() + b'999,Late Entry (1995),1,1\n')
+    _bump(agg)
+    after = api.lookup(path)
+    assert after is not before and after.body.endswith(b'Late Entry (1995),1,1\n')
+    assert after.etag != before.etag
+    assert api.lookup(f'/api/lists/{THEME}.json').body.count(b'Late Entry') == 1
+    assert api.load() == 0
+
+
+def test_new_snapshot_rebuilds_database(root):
+    api = ListApi(root, check_interval=0)
+    assert api.lookup('/api/titles/Late Entry.json') is None
+    src = sorted((root / THEME).glob('*/*.csv'))[0]
+    text = src.read_text(encoding='utf-8')
+    newer = src.with_name(src.stem.split(' - ')[0] + ' - 2100-01-01_00-00-00.csv')
+    newer.write_text(text.rstrip('\n') + '\n999,Late Entry,1995-01-01,,1,,\n', encoding='utf-8')
+    payload = api.lookup('/api/titles/Late Entry.json')
+    assert payload is not None and b'Late Entry' in payload.body
+
+
+async def _get(port: int, request: bytes) -> bytes:
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(request)
+    await writer.drain()
+    data = await reader.read()
+    writer.close()
+    return data
+
+
+def _serve_and(api: ListApi, client):
+    async def run():
+        server = await asyncio.start_server(lambda r, w: handle_connection(api, r, w), '127.0.0.1', 0)
+        async with server:
+            return await client(server.sockets[0].getsockname()[1])
+    return asyncio.run(run())
+
+
+def test_failed_request_gets_500_and_server_keeps_serving(root):
+    api = ListApi(root, check_interval=0)
+    agg = root / THEME / 'aggregated-list.csv'
+    good = agg.read_bytes()
+    path = f'/list/{THEME}/aggregated-list.csv'
+
+    async def client(port):
+        agg.write_bytes(good + b'999,Caf\xe9,1,1\n')
+        _bump(agg)
+        failed = await _get(port, f'GET {path} HTTP/1.1\r\n\r\n'.encode())
+        oversized = await _get(port, b'GET /' + b'x' * 70000 + b' HTTP/1.1\r\n\r\n')
+        agg.write_bytes(good)
+        _bump(agg)
+        served = await _get(port, f'GET {path} HTTP/1.1\r\nConnection: close\r\n\r\n'.encode())
+        return failed, oversized, served
+
+    failed, oversized, served = _serve_and(api, client)
+    assert failed.startswith(b'HTTP/1.1 500 ')
+    assert oversized.startswith(b'HTTP/1.1 400 ')
+    assert served.startswith(b'HTTP/1.1 200 ') and served.endswith(good)
+
+
+def test_concurrent_requests_share_one_check(root, monkeypatch):
+    api = ListApi(root, check_interval=0)
+    checks = []
+    check = api._check
+    monkeypatch.setattr(api, '_check', lambda need_db: checks.append(need_db) or check(need_db))
+
+    async def run():
+        await asyncio.gather(*(api.prepare(f'/api/titles/T{i}.json') for i in range(8)))
+
+    asyncio.run(run())
+    assert checks == [True]
+    assert api._db is not None
+    assert api.respond('GET', '/api/titles/Missing.json', {}, refresh=False)[0] == 404
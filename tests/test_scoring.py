@@ -0,0 +1,31 @@
+import shutil
+from pathlib import Path
+
+import pytest
+
+from rebuild_list import aggregate_rows, pick_sources_for_list, read_picks_rows
+from scoring import ensure_corpus, rerank
+
+REPO_LIST = Path(__file__).resolve().parent.parent / 'list'
+THEMES = ['best_games_of_1995', 'best_games_of_2001']
+
+
+@pytest.fixture
+def root(tmp_path):
+    for theme in THEMES:
+        shutil.copytree(REPO_LIST / theme, tmp_path / 'list' / theme)
+    # An older snapshot with other scores, which the current build ignores
+    src = tmp_path / 'list' / THEMES[0] / 'imdb'
+    latest = next(src.glob('*.csv'))
+    header, *_, last = latest.read_text(encoding='utf-8').splitlines()
+    last = last.split(',')
+    last[header.split(',').index('Score')] = '1000'
+    (src / 'imdb - 2020-01-01_00-00-00.csv').write_text(f"{header}\n{','.join(last)}\n", encoding='utf-8')
+    return tmp_path / 'list'
+
+
+def test_score_strategy_matches_aggregate_rows(root):
+    result = rerank(ensure_corpus(root), ['score'])
+    for theme in THEMES:
+        expected = aggregate_rows(read_picks_rows(pick_sources_for_list(root / theme)))
+        assert result.ranking('score', theme) == expected
@@ -0,0 +1,51 @@
+import os
+import time
+
+from source_index import SourceIndex
+
+
+def _set_mtime(path, mtime_ns):
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_settled_listing_is_reused(tmp_path):
+    src = tmp_path / 'theme' / 'ign'
+    src.mkdir(parents=True)
+    (src / 'ign - 2024-01-01_00-00-00.csv').write_text('Position,Title\n')
+    _set_mtime(src, time.time_ns() - 10**10)
+    index = SourceIndex(tmp_path)
+    index.scan(src)
+    index.scan(src)
+    assert index.listed == 1
+
+
+def test_file_edited_in_place_is_picked(tmp_path):
+    src = tmp_path / 'theme' / 'ign'
+    src.mkdir(parents=True)
+    old = time.time_ns() - 10**10
+    for i, name in enumerate(['a - x.csv', 'b - x.csv']):
+        (src / name).write_text('Position,Title\n')
+        _set_mtime(src / name, old + i * 10**9)
+    dir_mtime = old + 2 * 10**9
+    _set_mtime(src, dir_mtime)
+    index = SourceIndex(tmp_path)
+    assert index.latest_in_dir(src).name == 'b - x.csv'
+
+    # Rewriting a file does not touch the directory mtime
+    (src / 'a - x.csv').write_text('Position,Title\n1,Edited\n')
+    _set_mtime(src, dir_mtime)
+    assert index.latest_in_dir(src).name == 'a - x.csv'
+
+
+def test_file_added_in_the_same_tick_is_listed(tmp_path):
+    src = tmp_path / 'theme' / 'ign'
+    src.mkdir(parents=True)
+    (src / 'ign - 2024-01-01_00-00-00.csv').write_text('Position,Title\n')
+    index = SourceIndex(tmp_path)
+    dir_mtime = src.stat().st_mtime_ns
+    assert len(index.snapshots_in_dir(src)) == 1
+
+    # A coarse clock gives the directory the same mtime after the addition
+    (src / 'ign - 2024-02-01_00-00-00.csv').write_text('Position,Title\n')
+    _set_mtime(src, dir_mtime)
+    assert index.latest_in_dir(src).name == 'ign - 2024-02-01_00-00-00.csv'
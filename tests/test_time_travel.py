@@ -0,0 +1,38 @@
+import shutil
+import time
+from pathlib import Path
+
+import pytest
+
+from rebuild_list import aggregate_rows, pick_sources_for_list, read_picks_rows
+from time_travel import SnapshotCache, aggregate_as_of, parse_as_of
+
+REPO_LIST = Path(__file__).resolve().parent.parent / 'list'
+THEME = 'best_games_of_1995'
+
+
+@pytest.fixture
+def list_dir(tmp_path):
+    shutil.copytree(REPO_LIST / THEME, tmp_path / 'list' / THEME)
+    return tmp_path / 'list' / THEME
+
+
+def test_as_of_now_is_the_current_build(list_dir):
+    # An older snapshot is ignored today but used at its own date
+    src = list_dir / 'imdb'
+    latest = next(src.glob('*.csv'))
+    header, first, *_ = latest.read_text(encoding='utf-8').splitlines()
+    (src / 'imdb - 2020-01-01_00-00-00.csv').write_text(f"{header}\n{first}\n", encoding='utf-8')
+
+    agg_rows, picks = aggregate_as_of(list_dir, time.time(), SnapshotCache())
+    assert picks == pick_sources_for_list(list_dir)
+    assert agg_rows == aggregate_rows(read_picks_rows(picks))
+
+    _, picks = aggregate_as_of(list_dir, parse_as_of('2020-01-01'), SnapshotCache())
+    assert [p.csv_path.name for p in picks] == ['imdb - 2020-01-01_00-00-00.csv']
+
+
+@pytest.mark.parametrize('text', ['2023-02-30', '2023-13-01', '2023-01-01_25-00-00', '2023-01'])
+def test_invalid_dates_are_rejected(text):
+    with pytest.raises(ValueError):
+        parse_as_of(text)
@@ -0,0 +1,10 @@
+from title_match import TitleIndex
+
+
+def test_variant_match_is_checked_per_year_and_game_id():
+    index = TitleIndex()
+    index.resolve('Resident Evil 4', 2005, '100')
+    assert index.resolve('RESIDENT EVIL 4', 2005, None).title == 'Resident Evil 4'
+    # Same spelling, but the remake: match() rejects the 2005 entry
+    assert index.resolve('RESIDENT EVIL 4', 2023, '200').title == 'RESIDENT EVIL 4'
+    assert index.resolve('RESIDENT EVIL 4', 2005, None).title == 'Resident Evil 4'
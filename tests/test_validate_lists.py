@@ -0,0 +1,51 @@
+from pathlib import Path
+
+import pytest
+
+from validate_lists import ERROR, check_aggregated, check_source, validate
+
+
+HEADER = 'Position,Title,ReleaseDate,ExternalId,Score,GameId,CoverImageId\n'
+
+
+def source_csv(*scores: str) -> str:
+    return HEADER + ''.join(f"{i},Game {i},2020-01-01,{i},{s},{i},co{i}\n" for i, s in enumerate(scores, start=1))
+
+
+def errors(issues):
+    return [i for i in issues if i['severity'] == ERROR]
+
+
+@pytest.mark.parametrize('score', ['inf', '-inf', 'nan', '1e400', 'abc', ''])
+def test_unconvertible_score_is_an_error(score):
+    issues, _ = check_source('t/s/s - 2024-01-01_00-00-00.csv', source_csv('3', score))
+    found = errors(issues)
+    assert [(i['check'], i['line']) for i in found] == [('type', 3)]
+    assert 'Score' in found[0]['message']
+
+
+def test_valid_scores_pass():
+    issues, ids = check_source('t/s/s - 2024-01-01_00-00-00.csv', source_csv('3', '2.5', '1'))
+    assert errors(issues) == []
+    assert ids == [['1', 'Game 1'], ['2', 'Game 2'], ['3', 'Game 3']]
+
+
+@pytest.mark.parametrize('total', ['inf', 'nan', '1e400', '1' * 400])
+def test_unconvertible_total_score_is_an_error(total):
+    text = f"Position,Title,TotalScore,ListsAppeared\n1,Game 1 (2020),{total},1\n"
+    found = errors(check_aggregated('t/aggregated-list.csv', text))
+    assert [(i['check'], i['line']) for i in found] == [('type', 2)]
+    assert 'TotalScore' in found[0]['message']
+
+
+def test_validate_reports_infinite_score_in_tree(tmp_path: Path):
+    source = tmp_path / 'theme' / 'src'
+    source.mkdir(parents=True)
+    (source / 'src - 2024-01-01_00-00-00.csv').write_text(source_csv('2', 'inf'), encoding='utf-8')
+    summary = validate(tmp_path, jobs=1)
+    assert summary.errors == 1
+    assert summary.issues[0]['file'] == 'theme/src/src - 2024-01-01_00-00-00.csv'
+
+    # Cached on the second run, with the same result
+    again = validate(tmp_path, jobs=1)
+    assert (again.checked, again.cached, again.errors) == (0, 1, 1)